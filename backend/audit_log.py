@@ -0,0 +1,238 @@
+"""
+Audit Log Pipeline
+Asynchronous, batched writer for AuditLog rows.
+
+Request handlers call record(), which only enqueues the event on a bounded in-process
+queue; a background thread drains the queue and writes the rows with a single
+multi-row INSERT every AUDIT_FLUSH_INTERVAL_MS or AUDIT_BATCH_SIZE rows, whichever
+comes first. When the queue is full, routine events (logins, reads) are dropped and
+counted, while critical events (admin actions) wait briefly for space; async handlers
+use record_audit_async() so that wait happens on a worker thread, not the event loop.
+Remaining events are flushed on shutdown.
+
+AuditContextMiddleware stores the client IP and user agent in a context variable so
+record() can attach them without every endpoint passing the Request around.
+"""
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import contextvars
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import insert
+
+from database import engine
+from models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "500"))
+# How long a critical event may block the request when the queue is full
+AUDIT_CRITICAL_TIMEOUT_SECONDS = float(os.getenv("AUDIT_CRITICAL_TIMEOUT_SECONDS", "1.0"))
+
+# (ip_address, user_agent) of the request being handled
+_request_client: contextvars.ContextVar = contextvars.ContextVar("audit_request_client", default=(None, None))
+
+
+class AuditContextMiddleware:
+    """ASGI middleware recording the client IP and user agent of each request for audit rows"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers") or []}
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            ip_address = forwarded.split(",")[0].strip()
+        else:
+            client = scope.get("client")
+            ip_address = client[0] if client else None
+
+        token = _request_client.set((ip_address[:45] if ip_address else None, headers.get("user-agent")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_client.reset(token)
+
+
+class AuditLogWriter:
+    """Bounded queue plus a background thread that bulk-inserts audit rows"""
+
+    def __init__(self, queue_size: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval_ms: int = AUDIT_FLUSH_INTERVAL_MS):
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._flushes = 0
+        self._max_depth = 0
+        self._last_flush: Optional[datetime] = None
+
+    # ==================== PRODUCER ====================
+
+    def record(self, action: str, resource_type: str, resource_id: Optional[int] = None,
+               user_id: Optional[int] = None, details: Optional[Dict[str, Any]] = None,
+               critical: bool = False) -> bool:
+        """Queue an audit event; returns False if it had to be dropped"""
+        ip_address, user_agent = _request_client.get()
+        row = {
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "created_at": datetime.utcnow()
+        }
+
+        try:
+            if critical:
+                self._queue.put(row, timeout=AUDIT_CRITICAL_TIMEOUT_SECONDS)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+            logger.warning(f"Audit queue full, dropped {action} on {resource_type} {resource_id}")
+            return False
+
+        with self._stats_lock:
+            self._enqueued += 1
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+        return True
+
+    # ==================== CONSUMER ====================
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer thread and flush everything still queued"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._write(batch)
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        """Block until a row arrives, then gather more until the batch is full or the interval elapses"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> int:
+        """Write everything currently queued, in batches; returns rows written"""
+        written = 0
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            with self._flush_lock, engine.begin() as connection:
+                connection.execute(insert(AuditLog), batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} audit rows: {e}")
+            with self._stats_lock:
+                self._failed += len(batch)
+            return 0
+
+        with self._stats_lock:
+            self._written += len(batch)
+            self._flushes += 1
+            self._last_flush = datetime.utcnow()
+        return len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "max_queue_depth": self._max_depth,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "flushes": self._flushes,
+                "avg_batch_size": round(self._written / self._flushes, 1) if self._flushes else 0.0,
+                "last_flush_at": self._last_flush,
+                "running": self._thread is not None and self._thread.is_alive()
+            }
+
+
+# Singleton instance
+_audit_writer = None
+
+def get_audit_writer() -> AuditLogWriter:
+    """Get or create audit log writer singleton"""
+    global _audit_writer
+
+    if _audit_writer is None:
+        _audit_writer = AuditLogWriter()
+
+    return _audit_writer
+
+def record_audit(action: str, resource_type: str, resource_id: Optional[int] = None,
+                 user_id: Optional[int] = None, details: Optional[Dict[str, Any]] = None,
+                 critical: bool = False) -> bool:
+    """Convenience wrapper used by request handlers"""
+    return get_audit_writer().record(action, resource_type, resource_id, user_id, details, critical)
+
+async def record_audit_async(action: str, resource_type: str, resource_id: Optional[int] = None,
+                             user_id: Optional[int] = None, details: Optional[Dict[str, Any]] = None,
+                             critical: bool = False) -> bool:
+    """record_audit() for async handlers; a critical event waits for queue space in a worker thread"""
+    if critical:
+        # to_thread copies the context, so the request's client IP and user agent are kept
+        return await asyncio.to_thread(record_audit, action, resource_type, resource_id, user_id, details, critical)
+    return record_audit(action, resource_type, resource_id, user_id, details, critical)
@@ -0,0 +1,311 @@
+"""
+Audit Log Storage
+Monthly partitioning, retention and filtered keyset queries for audit logs.
+
+New rows are written to the audit_logs table, which acts as the hot partition.
+Maintenance moves every completed month into its own audit_logs_YYYYMM table
+(partition-per-table, which works the same on SQLite and PostgreSQL). Each month
+table carries the same composite indexes. Once a month falls outside
+AUDIT_RETENTION_MONTHS it is written to a gzip-compressed JSONL archive and its
+table is dropped, which is far cheaper than deleting rows from one large table.
+
+Queries walk the hot table and then the partitions, newest first. Partitions
+outside the requested time range or older than the cursor are skipped, and the
+walk stops as soon as the page is full.
+"""
+
+import os
+import re
+import gzip
+import json
+import base64
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import (
+    Table, Column, MetaData, Index, select, delete, func, and_, or_, inspect, type_coerce, String
+)
+
+from database import engine
+from models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "12"))
+AUDIT_ARCHIVE_DIR = os.getenv(
+    "AUDIT_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "audit_archive")
+)
+MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("AUDIT_MAINTENANCE_INTERVAL", str(6 * 3600)))
+ARCHIVE_CHUNK_SIZE = 5000
+
+HOT_TABLE = AuditLog.__table__
+PARTITION_PATTERN = re.compile(r"^audit_logs_(\d{4})(\d{2})$")
+COLUMN_NAMES = [column.name for column in HOT_TABLE.columns]
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+def next_month(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return datetime(moment.year + 1, 1, 1)
+    return datetime(moment.year, moment.month + 1, 1)
+
+def months_before(moment: datetime, months: int) -> datetime:
+    year, month = moment.year, moment.month - months
+    while month <= 0:
+        month += 12
+        year -= 1
+    return datetime(year, month, 1)
+
+def partition_name(moment: datetime) -> str:
+    return f"audit_logs_{moment.year:04d}{moment.month:02d}"
+
+def encode_cursor(created_at_key: str, row_id: int) -> str:
+    """Opaque cursor from the stored created_at value and id of the last row"""
+    raw = json.dumps([str(created_at_key), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at_key, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at_key), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def _cursor_time(created_at_key: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(created_at_key).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class AuditLogStorage:
+    """Partition registry plus partition-aware queries and maintenance"""
+
+    def __init__(self):
+        self._metadata = MetaData()
+        self._tables: Dict[str, Table] = {}
+        self._partitions: Optional[List[Tuple[datetime, str]]] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== PARTITIONS ====================
+
+    def partition_table(self, name: str) -> Table:
+        """Table object for a month partition, with the hot table's columns and indexes"""
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                columns = [
+                    Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+                    for column in HOT_TABLE.columns
+                ]
+                table = Table(name, self._metadata, *columns)
+                Index(f"ix_{name}_created", table.c.created_at, table.c.id)
+                Index(f"ix_{name}_user_created", table.c.user_id, table.c.created_at, table.c.id)
+                Index(f"ix_{name}_action_created", table.c.action, table.c.created_at, table.c.id)
+                Index(f"ix_{name}_resource_created", table.c.resource_type, table.c.resource_id,
+                      table.c.created_at, table.c.id)
+                self._tables[name] = table
+            return table
+
+    def partitions(self, refresh: bool = False) -> List[Tuple[datetime, str]]:
+        """(month start, table name) of existing partitions, newest first"""
+        if self._partitions is None or refresh:
+            found = []
+            for name in inspect(engine).get_table_names():
+                match = PARTITION_PATTERN.match(name)
+                if match:
+                    found.append((datetime(int(match.group(1)), int(match.group(2)), 1), name))
+            self._partitions = sorted(found, reverse=True)
+        return self._partitions
+
+    def roll_partitions(self, now: Optional[datetime] = None) -> List[str]:
+        """Move every completed month out of the hot table into its partition"""
+        current = month_start(now or datetime.utcnow())
+        with engine.connect() as connection:
+            oldest = connection.execute(select(func.min(HOT_TABLE.c.created_at))).scalar()
+        if oldest is None:
+            return []
+
+        rolled = []
+        month = month_start(oldest)
+        while month < current:
+            upper = next_month(month)
+            in_month = and_(HOT_TABLE.c.created_at >= month, HOT_TABLE.c.created_at < upper)
+            table = self.partition_table(partition_name(month))
+
+            with engine.begin() as connection:
+                if connection.execute(select(HOT_TABLE.c.id).where(in_month).limit(1)).first() is None:
+                    month = upper
+                    continue
+                table.create(connection, checkfirst=True)
+                moved = connection.execute(
+                    table.insert().from_select(COLUMN_NAMES, select(*[HOT_TABLE.c[name] for name in COLUMN_NAMES]).where(in_month))
+                ).rowcount
+                connection.execute(delete(HOT_TABLE).where(in_month))
+
+            if moved:
+                rolled.append(table.name)
+                logger.info(f"Moved {moved} audit rows into {table.name}")
+            month = upper
+
+        self.partitions(refresh=True)
+        return rolled
+
+    def archive_expired(self, now: Optional[datetime] = None, retention_months: int = AUDIT_RETENTION_MONTHS) -> List[str]:
+        """Archive partitions older than the retention window to gzip JSONL, then drop them"""
+        cutoff = months_before(now or datetime.utcnow(), retention_months)
+
+        archived = []
+        for month, name in self.partitions(refresh=True):
+            if month >= cutoff:
+                continue
+            path = self.archive_partition(name)
+            table = self.partition_table(name)
+            with engine.begin() as connection:
+                table.drop(connection, checkfirst=True)
+            archived.append(path)
+            logger.info(f"Archived audit partition {name} to {path}")
+
+        self.partitions(refresh=True)
+        return archived
+
+    def archive_partition(self, name: str) -> str:
+        """Stream a partition to AUDIT_ARCHIVE_DIR/<name>.jsonl.gz and return the path"""
+        os.makedirs(AUDIT_ARCHIVE_DIR, exist_ok=True)
+        path = os.path.join(AUDIT_ARCHIVE_DIR, f"{name}.jsonl.gz")
+        # Late rows for an already archived month get a separate archive file
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(AUDIT_ARCHIVE_DIR, f"{name}-{suffix}.jsonl.gz")
+            suffix += 1
+        partial = path + ".part"
+        table = self.partition_table(name)
+
+        with engine.connect() as connection, gzip.open(partial, "wt", encoding="utf-8") as archive:
+            result = connection.execution_options(yield_per=ARCHIVE_CHUNK_SIZE).execute(
+                select(table).order_by(table.c.created_at, table.c.id)
+            )
+            for row in result.mappings():
+                archive.write(json.dumps(dict(row), default=str) + "\n")
+
+        os.replace(partial, path)
+        return path
+
+    def run_maintenance(self, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        return {"rolled": self.roll_partitions(now), "archived": self.archive_expired(now)}
+
+    # ==================== QUERIES ====================
+
+    def query(self, user_id: Optional[int] = None, action: Optional[str] = None,
+              resource_type: Optional[str] = None, resource_id: Optional[int] = None,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Newest-first page of audit rows matching the filters, plus the cursor for the next page"""
+        after = decode_cursor(cursor) if cursor else None
+        cursor_time = _cursor_time(after[0]) if after else None
+        rows: List[Dict[str, Any]] = []
+
+        tables = [(None, HOT_TABLE)] + [(month, self.partition_table(name)) for month, name in self.partitions()]
+        with engine.connect() as connection:
+            for month, table in tables:
+                if month is not None:
+                    # Prune partitions that cannot contain matching rows
+                    if since is not None and next_month(month) <= since:
+                        break
+                    if until is not None and month > until:
+                        continue
+                    if cursor_time is not None and month > cursor_time:
+                        continue
+                    # Partitions are newest first: once the page is full and this month ends
+                    # before its oldest row, no remaining partition can improve the page
+                    if len(rows) >= limit:
+                        boundary = _cursor_time(str(rows[-1]["created_at_key"]))
+                        if boundary is not None and next_month(month) <= boundary:
+                            break
+
+                rows.extend(self._query_table(connection, table, user_id, action, resource_type,
+                                              resource_id, since, until, after, limit))
+                # The hot table may still hold rows from months not yet rolled into partitions
+                rows.sort(key=lambda row: (str(row["created_at_key"]), row["id"]), reverse=True)
+                del rows[limit:]
+
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor(rows[-1]["created_at_key"], rows[-1]["id"])
+        for row in rows:
+            row.pop("created_at_key", None)
+        return rows, next_cursor
+
+    @staticmethod
+    def _query_table(connection, table: Table, user_id, action, resource_type, resource_id,
+                     since, until, after, limit) -> List[Dict[str, Any]]:
+        created_key = type_coerce(table.c.created_at, String).label("created_at_key")
+        conditions = []
+        if user_id is not None:
+            conditions.append(table.c.user_id == user_id)
+        if action:
+            conditions.append(table.c.action == action)
+        if resource_type:
+            conditions.append(table.c.resource_type == resource_type)
+        if resource_id is not None:
+            conditions.append(table.c.resource_id == resource_id)
+        if since is not None:
+            conditions.append(table.c.created_at >= since)
+        if until is not None:
+            conditions.append(table.c.created_at < until)
+        if after is not None:
+            # Compare against the stored representation so the cursor row itself is excluded exactly
+            # The leading <= keeps it an index range scan; the OR only breaks ties
+            stored = type_coerce(table.c.created_at, String)
+            conditions.append(stored <= after[0])
+            conditions.append(or_(stored < after[0], table.c.id < after[1]))
+
+        statement = select(table, created_key).where(*conditions).order_by(
+            table.c.created_at.desc(), table.c.id.desc()
+        ).limit(limit)
+        return [dict(row) for row in connection.execute(statement).mappings()]
+
+    # ==================== BACKGROUND ====================
+
+    def start(self):
+        """Run maintenance now and then every AUDIT_MAINTENANCE_INTERVAL seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintain_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _maintain_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_maintenance)
+            except Exception as e:
+                logger.error(f"Audit log maintenance failed: {e}")
+            await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+
+
+# Singleton instance
+_audit_storage = None
+
+def get_audit_storage() -> AuditLogStorage:
+    """Get or create audit log storage singleton"""
+    global _audit_storage
+
+    if _audit_storage is None:
+        _audit_storage = AuditLogStorage()
+
+    return _audit_storage
@@ -4,6 +4,7 @@ JWT-based authentication with role-based access control.
 """
 
 import os
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -16,6 +17,8 @@ from sqlalchemy.orm import Session
 from database import SessionLocal, get_db
 from models import User, Patient, Practitioner, Admin
 
+logger = logging.getLogger(__name__)
+
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "ayursutra-secret-key-change-in-production")
 ALGORITHM = "HS256"
@@ -97,14 +100,27 @@ def get_current_user(
         return user
     except HTTPException:
         raise
-    except Exception as e:
-        import traceback
-        with open("backend_error.log", "a") as f:
-            f.write(f"AUTH CRASH AT {datetime.utcnow()}:\n")
-            f.write(traceback.format_exc())
-            f.write("\n")
+    except Exception:
+        logger.exception("Authentication failed with an unexpected error")
         raise HTTPException(status_code=500, detail="Auth Internal Error")
 
+def get_user_from_token(token: Optional[str], db: Session) -> Optional[User]:
+    """
+    Resolve an active user from a raw JWT, for WebSocket and EventSource connections
+    where the token arrives as a query parameter instead of an Authorization header
+    """
+    if not token:
+        return None
+    try:
+        token_data = verify_token(token)
+    except HTTPException:
+        return None
+    
+    user = db.query(User).filter(User.email == token_data["email"]).first()
+    if user is None or not user.is_active:
+        return None
+    return user
+
 def get_current_patient(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current user as patient (role check)"""
     if current_user.role.value != "patient":
@@ -124,10 +140,10 @@ def get_current_patient(current_user: User = Depends(get_current_user), db: Sess
 
 def get_current_practitioner(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current user as practitioner (role check)"""
-    print(f"DEBUG AUTH: Checking practitioner access for {current_user.email} (Role: {current_user.role.value})")
+    logger.debug("Checking practitioner access for user %s (role %s)", current_user.id, current_user.role.value)
     
     if current_user.role.value != "practitioner":
-        print(f"DEBUG AUTH: DENIED. Role mismatch: {current_user.role.value} != practitioner")
+        logger.debug("Practitioner access denied for user %s: role %s", current_user.id, current_user.role.value)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Access denied. Practitioner role required. Current role: {current_user.role.value}"
@@ -135,13 +151,12 @@ def get_current_practitioner(current_user: User = Depends(get_current_user), db:
     
     practitioner = db.query(Practitioner).filter(Practitioner.user_id == current_user.id).first()
     if not practitioner:
-        print("DEBUG AUTH: DENIED. Practitioner profile not found.")
+        logger.debug("Practitioner access denied for user %s: no practitioner profile", current_user.id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Practitioner profile not found"
         )
     
-    print("DEBUG AUTH: SUCCESS. Practitioner access granted.")
     return practitioner
 
 def get_current_admin(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -0,0 +1,228 @@
+"""
+Availability Engine
+Finds the earliest free appointment slots across practitioners by expanding their weekly
+availability schedules into concrete time ranges and subtracting booked appointments.
+"""
+
+import os
+import heapq
+import logging
+import threading
+from datetime import datetime, date, time, timedelta, timezone
+from itertools import islice
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Session
+
+from models import Practitioner, User
+from scheduling_engine import SchedulingEngine, get_scheduling_engine, normalize_datetime
+
+logger = logging.getLogger(__name__)
+
+# Weekly schedules are entered as clinic wall-clock times
+SCHEDULE_TIMEZONE = ZoneInfo(os.getenv("SCHEDULE_TIMEZONE", "Asia/Kolkata"))
+# Offered slots start on multiples of this many minutes
+SLOT_STEP_MINUTES = 15
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# (start, end) as naive UTC datetimes
+TimeRange = Tuple[datetime, datetime]
+
+
+def parse_schedule_time(value: str) -> Optional[time]:
+    """Parse "09:00" / "9:00 AM" style schedule times"""
+    hours, _, minutes = (value or "").partition(":")
+    if hours.isdigit() and minutes.isdigit() and int(hours) < 24 and int(minutes) < 60:
+        return time(int(hours), int(minutes))
+
+    for fmt in ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p"):
+        try:
+            return datetime.strptime(value.strip().upper(), fmt).time()
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+def parse_weekly_schedule(schedule: Optional[Dict[str, Any]]) -> Dict[int, List[Tuple[time, time]]]:
+    """Weekday index -> sorted, merged (start, end) wall-clock ranges"""
+    template = {}
+    for weekday, day_name in enumerate(WEEKDAYS):
+        ranges = []
+        for slot in (schedule or {}).get(day_name) or []:
+            start = parse_schedule_time(slot.get("start_time", ""))
+            end = parse_schedule_time(slot.get("end_time", ""))
+            if start and end and start < end:
+                ranges.append((start, end))
+
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        if merged:
+            template[weekday] = merged
+    return template
+
+def _ceil_to_step(value: datetime) -> datetime:
+    remainder = (value.minute % SLOT_STEP_MINUTES) * 60 + value.second + value.microsecond / 1e6
+    if remainder == 0:
+        return value
+    return value + timedelta(seconds=SLOT_STEP_MINUTES * 60 - remainder)
+
+
+class AvailabilityEngine:
+    """
+    Expands weekly schedules (cached per practitioner and week) and merges each
+    practitioner's free slots with a heap to return the earliest N across all of them.
+    """
+
+    def __init__(self, scheduling_engine: Optional[SchedulingEngine] = None, tz: ZoneInfo = SCHEDULE_TIMEZONE):
+        self.scheduling = scheduling_engine or get_scheduling_engine()
+        self.tz = tz
+        self._templates: Dict[int, Dict[int, List[Tuple[time, time]]]] = {}
+        self._expanded: Dict[int, Dict[date, List[TimeRange]]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, practitioner_id: int):
+        """Drop cached schedules after a practitioner edits their availability"""
+        with self._lock:
+            self._templates.pop(practitioner_id, None)
+            self._expanded.pop(practitioner_id, None)
+
+    def has_schedule(self, practitioner_id: int) -> bool:
+        return practitioner_id in self._templates
+
+    def load_schedule(self, practitioner_id: int, schedule: Optional[Dict[str, Any]]):
+        template = parse_weekly_schedule(schedule)
+        with self._lock:
+            self._templates[practitioner_id] = template
+            self._expanded[practitioner_id] = {}
+
+    def expand_week(self, practitioner_id: int, week_start: date) -> List[TimeRange]:
+        """UTC ranges the practitioner works in the week starting on Monday week_start"""
+        weeks = self._expanded.setdefault(practitioner_id, {})
+        ranges = weeks.get(week_start)
+        if ranges is not None:
+            return ranges
+
+        ranges = []
+        template = self._templates.get(practitioner_id, {})
+        for offset in range(7):
+            day = week_start + timedelta(days=offset)
+            for start, end in template.get(offset, []):
+                ranges.append((self._to_utc(day, start), self._to_utc(day, end)))
+
+        with self._lock:
+            # Keep only the requested week and later ones; past weeks are never asked for again
+            for cached_week in [w for w in weeks if w < week_start - timedelta(days=7)]:
+                del weeks[cached_week]
+            weeks[week_start] = ranges
+        return ranges
+
+    def working_ranges(self, practitioner_id: int, window_start: datetime, window_end: datetime) -> Iterator[TimeRange]:
+        """Working ranges clipped to the window, in chronological order"""
+        local_start = window_start.replace(tzinfo=timezone.utc).astimezone(self.tz).date()
+        week_start = local_start - timedelta(days=local_start.weekday())
+
+        while True:
+            week_ranges = self.expand_week(practitioner_id, week_start)
+            for start, end in week_ranges:
+                if start >= window_end:
+                    return
+                if end > window_start:
+                    yield max(start, window_start), min(end, window_end)
+            week_start += timedelta(days=7)
+            if self._to_utc(week_start, time.min) >= window_end:
+                return
+
+    def free_slots(self, practitioner_id: int, window_start: datetime, window_end: datetime,
+                   duration_minutes: int) -> Iterator[Tuple[datetime, datetime]]:
+        """Free slots of the given duration, in chronological order"""
+        duration = timedelta(minutes=duration_minutes)
+
+        for range_start, range_end in self.working_ranges(practitioner_id, window_start, window_end):
+            cursor = range_start
+            booked = self.scheduling.booked_intervals(practitioner_id, range_start, range_end)
+            # Gaps between bookings; the sentinel closes the last gap at the range end
+            for _, booked_start, booked_end in booked + [(None, range_end, range_end)]:
+                slot_start = _ceil_to_step(cursor)
+                while slot_start + duration <= booked_start:
+                    yield slot_start, slot_start + duration
+                    slot_start += duration
+                cursor = max(cursor, booked_end)
+
+    def find_slots(self, practitioners: List[Dict[str, Any]], window_start: datetime, window_end: datetime,
+                   duration_minutes: int = 60, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Earliest `limit` free slots across practitioners.
+        Each practitioner dict needs an "id"; any other keys are copied into the results.
+        Schedules must already be loaded (see search for the database-backed entry point).
+        """
+        window_start = normalize_datetime(window_start)
+        window_end = normalize_datetime(window_end)
+
+        def slots_for(practitioner: Dict[str, Any]) -> Iterator[Tuple[datetime, int, datetime]]:
+            for start, end in self.free_slots(practitioner["id"], window_start, window_end, duration_minutes):
+                yield start, practitioner["id"], end
+
+        by_id = {p["id"]: p for p in practitioners}
+        merged = heapq.merge(*(slots_for(p) for p in practitioners))
+
+        return [
+            {**by_id[practitioner_id], "practitioner_id": practitioner_id, "start": start, "end": end}
+            for start, practitioner_id, end in islice(merged, limit)
+        ]
+
+    def search(self, db: Session, window_start: datetime, days: int = 7, duration_minutes: int = 60,
+               limit: int = 10, specialization: Optional[str] = None, max_fee: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Earliest free slots for practitioners matching the filters"""
+        self.scheduling.ensure_loaded(db)
+
+        query = db.query(
+            Practitioner.id, Practitioner.specializations, Practitioner.consultation_fee,
+            Practitioner.clinic_name, User.full_name
+        ).join(User, Practitioner.user_id == User.id)
+        if max_fee is not None:
+            query = query.filter(Practitioner.consultation_fee <= max_fee)
+
+        wanted = specialization.strip().lower() if specialization else None
+        practitioners = [
+            {
+                "id": practitioner_id,
+                "practitioner_name": full_name,
+                "clinic_name": clinic_name,
+                "consultation_fee": fee or 0.0,
+                "specializations": specializations or []
+            }
+            for practitioner_id, specializations, fee, clinic_name, full_name in query.all()
+            if not wanted or any(wanted in s.lower() for s in specializations or [])
+        ]
+
+        # Only schedules not already cached are read from the database
+        missing = [p["id"] for p in practitioners if not self.has_schedule(p["id"])]
+        if missing:
+            rows = db.query(Practitioner.id, Practitioner.availability_schedule).filter(Practitioner.id.in_(missing)).all()
+            for practitioner_id, schedule in rows:
+                self.load_schedule(practitioner_id, schedule)
+
+        window_start = max(normalize_datetime(window_start), datetime.utcnow())
+        return self.find_slots(practitioners, window_start, window_start + timedelta(days=days), duration_minutes, limit)
+
+    def _to_utc(self, day: date, wall_time: time) -> datetime:
+        local = datetime.combine(day, wall_time, tzinfo=self.tz)
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Singleton instance
+_availability_engine = None
+
+def get_availability_engine() -> AvailabilityEngine:
+    """Get or create availability engine singleton"""
+    global _availability_engine
+
+    if _availability_engine is None:
+        _availability_engine = AvailabilityEngine()
+
+    return _availability_engine
@@ -0,0 +1,136 @@
+"""
+Benchmark for partitioned audit log storage
+Loads synthetic audit rows spread over two years into a scratch SQLite database and
+compares OFFSET pagination on one table with keyset pagination and filtered
+queries over monthly partitions.
+
+Usage: python benchmark_audit_log.py [rows]   (e.g. 10000000 for the 10M-row run)
+"""
+
+import sys
+import os
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# Scratch database; must be configured before the backend modules are imported
+_scratch_dir = tempfile.mkdtemp(prefix="audit_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch_dir, 'audit.db')}"
+os.environ["AUDIT_ARCHIVE_DIR"] = os.path.join(_scratch_dir, "archive")
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert, select, text
+
+from database import engine
+from models import AuditLog
+from audit_storage import AuditLogStorage, encode_cursor
+
+SEED = 42
+BATCH_SIZE = 50000
+PAGE_SIZE = 50
+QUERIES = 50
+ACTIONS = ["login", "login_failed", "view_user", "view_patient_report", "list_patients",
+           "update_user", "deactivate_user", "impersonate_user"]
+USERS = 5000
+NOW = datetime(2026, 1, 15)
+SPAN_DAYS = 730
+
+
+def load_rows(count: int, rng: random.Random):
+    AuditLog.__table__.create(engine)
+    # Indexes are built once after the load rather than maintained row by row
+    for index in AuditLog.__table__.indexes:
+        index.drop(engine)
+    span = SPAN_DAYS * 86400
+    start = NOW - timedelta(days=SPAN_DAYS)
+    with engine.begin() as connection:
+        for offset in range(0, count, BATCH_SIZE):
+            # Ascending timestamps, as an append-only log would produce
+            batch = [{
+                "user_id": rng.randrange(1, USERS),
+                "action": rng.choice(ACTIONS),
+                "resource_type": "user",
+                "resource_id": rng.randrange(1, USERS),
+                "details": None,
+                "ip_address": "10.0.0.1",
+                "user_agent": "bench",
+                "created_at": start + timedelta(seconds=span * (offset + i) / count)
+            } for i in range(min(BATCH_SIZE, count - offset))]
+            connection.execute(insert(AuditLog), batch)
+    for index in AuditLog.__table__.indexes:
+        index.create(engine)
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def offset_page(page_offset: int):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(AuditLog.__table__).order_by(AuditLog.created_at.desc()).offset(page_offset).limit(PAGE_SIZE)
+        ).all()
+
+
+def report(label: str, seconds: float):
+    print(f"{label:<48} {seconds * 1000:>10.2f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(SEED)
+
+    print("=" * 64)
+    print(f"AUDIT LOG BENCHMARK ({count:,} rows over {SPAN_DAYS} days)")
+    print("=" * 64)
+
+    elapsed, _ = timed(lambda: load_rows(count, rng))
+    print(f"loaded in {elapsed:.1f}s ({count / elapsed:,.0f} rows/sec)\n")
+
+    storage = AuditLogStorage()
+
+    print("single table")
+    report("OFFSET page 1", timed(lambda: offset_page(0), QUERIES)[0])
+    report("OFFSET page at 10% depth", timed(lambda: offset_page(count // 10), 3)[0])
+    report("OFFSET page at 90% depth", timed(lambda: offset_page(count * 9 // 10), 3)[0])
+
+    # Cursor of the row at 90% depth, i.e. where a client paging through would be
+    with engine.connect() as connection:
+        row = connection.execute(text(
+            "SELECT CAST(created_at AS TEXT), id FROM audit_logs ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET :o"
+        ), {"o": count * 9 // 10}).first()
+    deep_cursor = encode_cursor(row[0], row[1])
+    report("keyset page 1", timed(lambda: storage.query(limit=PAGE_SIZE), QUERIES)[0])
+    report("keyset page at 90% depth", timed(lambda: storage.query(cursor=deep_cursor, limit=PAGE_SIZE), QUERIES)[0])
+
+    users = [rng.randrange(1, USERS) for _ in range(QUERIES)]
+    report("filter user_id", timed(lambda: storage.query(user_id=users[rng.randrange(QUERIES)], limit=PAGE_SIZE), QUERIES)[0])
+    window = (NOW - timedelta(days=400), NOW - timedelta(days=370))
+    report("filter action + 30 day range", timed(
+        lambda: storage.query(action="impersonate_user", since=window[0], until=window[1], limit=PAGE_SIZE), QUERIES
+    )[0])
+
+    print("\nmonthly partitions")
+    elapsed, rolled = timed(lambda: storage.roll_partitions(now=NOW))
+    report(f"roll {len(rolled)} months out of hot table", elapsed)
+    report("keyset page 1", timed(lambda: storage.query(limit=PAGE_SIZE), QUERIES)[0])
+    report("keyset page at 90% depth", timed(lambda: storage.query(cursor=deep_cursor, limit=PAGE_SIZE), QUERIES)[0])
+    report("filter user_id", timed(lambda: storage.query(user_id=users[rng.randrange(QUERIES)], limit=PAGE_SIZE), QUERIES)[0])
+    report("filter action + 30 day range", timed(
+        lambda: storage.query(action="impersonate_user", since=window[0], until=window[1], limit=PAGE_SIZE), QUERIES
+    )[0])
+
+    elapsed, archived = timed(lambda: storage.archive_expired(now=NOW, retention_months=12))
+    size = sum(os.path.getsize(path) for path in archived)
+    report(f"archive + drop {len(archived)} months ({size / 1e6:.1f} MB gz)", elapsed)
+    print(f"\nscratch data in {_scratch_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark for the AvailabilityEngine free-slot search
+Builds synthetic practitioners with weekly schedules and bookings in memory and
+compares the heap-merged search against expanding and sorting every slot.
+
+Usage: python benchmark_availability.py [practitioners] [weeks]
+"""
+
+import sys
+import os
+import time
+import random
+from datetime import datetime, timedelta
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scheduling_engine import SchedulingEngine
+from availability_engine import AvailabilityEngine, WEEKDAYS
+
+SEED = 42
+DURATION_MINUTES = 60
+LIMIT = 10
+
+
+def make_schedule(rng: random.Random) -> dict:
+    schedule = {}
+    for day in WEEKDAYS[:6]:
+        if rng.random() < 0.8:
+            start = rng.choice([8, 9, 10])
+            schedule[day] = [
+                {"start_time": f"{start:02d}:00", "end_time": f"{start + 3:02d}:00"},
+                {"start_time": f"{start + 5:02d}:00", "end_time": f"{start + 8:02d}:00"}
+            ]
+    return schedule
+
+
+def build(practitioner_count: int, weeks: int, window_start: datetime):
+    rng = random.Random(SEED)
+    scheduling = SchedulingEngine()
+    scheduling.loaded = True
+    engine = AvailabilityEngine(scheduling_engine=scheduling)
+
+    practitioners = []
+    appointment_id = 0
+    for practitioner_id in range(1, practitioner_count + 1):
+        schedule = make_schedule(rng)
+        engine.load_schedule(practitioner_id, schedule)
+        practitioners.append({"id": practitioner_id, "schedule": schedule})
+
+        # Book roughly 70% of each working hour
+        for start, end in engine.working_ranges(practitioner_id, window_start, window_start + timedelta(weeks=weeks)):
+            slot = start
+            while slot + timedelta(minutes=DURATION_MINUTES) <= end:
+                if rng.random() < 0.7:
+                    appointment_id += 1
+                    scheduling.sync_appointment(appointment_id, practitioner_id, slot, DURATION_MINUTES, "scheduled")
+                slot += timedelta(minutes=DURATION_MINUTES)
+
+    return engine, practitioners, appointment_id
+
+
+def full_scan(engine: AvailabilityEngine, practitioners: list, window_start: datetime, window_end: datetime) -> list:
+    """Reference: materialize every free slot, sort, take the first N"""
+    slots = []
+    for practitioner in practitioners:
+        for start, end in engine.free_slots(practitioner["id"], window_start, window_end, DURATION_MINUTES):
+            slots.append((start, practitioner["id"], end))
+    slots.sort()
+    return slots[:LIMIT]
+
+
+def bench(label: str, fn, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"{label:<40} {elapsed * 1000:>10.2f} ms/search")
+
+
+def main():
+    practitioner_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    window_start = datetime(2030, 1, 7)
+    window_end = window_start + timedelta(weeks=weeks)
+
+    print("=" * 60)
+    print(f"AVAILABILITY SEARCH BENCHMARK ({practitioner_count} practitioners x {weeks} weeks)")
+    print("=" * 60)
+
+    build_start = time.perf_counter()
+    engine, practitioners, bookings = build(practitioner_count, weeks, window_start)
+    print(f"Built {bookings:,} bookings in {time.perf_counter() - build_start:.2f}s")
+
+    merged = engine.find_slots(practitioners, window_start, window_end, DURATION_MINUTES, LIMIT)
+    expected = full_scan(engine, practitioners, window_start, window_end)
+    assert [(s["start"], s["practitioner_id"], s["end"]) for s in merged] == expected
+    print("✅ Heap merge matches full scan")
+    print()
+
+    def cold_search():
+        for practitioner in practitioners:
+            engine.load_schedule(practitioner["id"], practitioner["schedule"])
+        engine.find_slots(practitioners, window_start, window_end, DURATION_MINUTES, LIMIT)
+
+    bench("full scan + sort", lambda: full_scan(engine, practitioners, window_start, window_end), 3)
+    bench("heap merge (cold schedule cache)", cold_search, 3)
+    bench("heap merge (warm schedule cache)",
+          lambda: engine.find_slots(practitioners, window_start, window_end, DURATION_MINUTES, LIMIT), 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for the GeoIndex nearest-practitioner search
+Compares grid-indexed radius queries against a haversine full scan over all practitioners.
+
+Usage: python benchmark_geo_index.py [practitioners] [queries]
+"""
+
+import sys
+import os
+import time
+import random
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from geo_index import GeoIndex, haversine_km
+
+SEED = 42
+LIMIT = 50
+# Rough bounding box of India
+LAT_RANGE = (8.0, 34.0)
+LNG_RANGE = (68.0, 97.0)
+SPECIALIZATIONS = ["Abhyanga", "Shirodhara", "Panchakarma", "Nasya", "Basti"]
+
+
+def make_points(count: int, rng: random.Random) -> list:
+    points = []
+    for practitioner_id in range(1, count + 1):
+        points.append((
+            practitioner_id,
+            rng.uniform(*LAT_RANGE),
+            rng.uniform(*LNG_RANGE),
+            [rng.choice(SPECIALIZATIONS)],
+            rng.random() < 0.5
+        ))
+    return points
+
+
+def full_scan(points: list, lat: float, lng: float, radius_km: float, specialization: str = None) -> list:
+    """Reference: distance to every practitioner, then sort"""
+    matches = []
+    for practitioner_id, p_lat, p_lng, specializations, _ in points:
+        if specialization and specialization not in specializations:
+            continue
+        distance = haversine_km(lat, lng, p_lat, p_lng)
+        if distance <= radius_km:
+            matches.append((distance, practitioner_id))
+    matches.sort()
+    return [(practitioner_id, round(distance, 3)) for distance, practitioner_id in matches[:LIMIT]]
+
+
+def bench(label: str, fn, queries: list):
+    start = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {len(queries) / elapsed:>10,.0f} queries/sec  ({elapsed / len(queries) * 1000:.3f} ms/query)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(SEED)
+
+    print("=" * 60)
+    print(f"GEO INDEX BENCHMARK ({count:,} practitioners)")
+    print("=" * 60)
+
+    points = make_points(count, rng)
+    index = GeoIndex()
+    index.loaded = True
+    for practitioner_id, lat, lng, specializations, is_verified in points:
+        index.upsert(practitioner_id, lat, lng, specializations, is_verified)
+
+    for radius_km in (10, 50, 250):
+        queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE), radius_km) for _ in range(query_count)]
+
+        for lat, lng, radius in queries[:50]:
+            assert index.nearby(lat, lng, radius, LIMIT) == full_scan(points, lat, lng, radius)
+            assert index.nearby(lat, lng, radius, LIMIT, specialization="Nasya") == full_scan(points, lat, lng, radius, "Nasya")
+
+        print(f"\nradius {radius_km} km (results match full scan)")
+        bench("full scan", lambda lat, lng, radius: full_scan(points, lat, lng, radius), queries)
+        bench("grid index", lambda lat, lng, radius: index.nearby(lat, lng, radius, LIMIT), queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark for list response serialization
+Loads synthetic appointments into a scratch SQLite database and compares, for one
+page of rows, FastAPI's default path (ORM objects, per-object from_orm, then
+jsonable_encoder + json.dumps) with the fast path used by /appointments
+(column-only rows validated and dumped as one list through a TypeAdapter) and
+with orjson rendering of plain dicts.
+
+Usage: python benchmark_json_serialization.py [rows]   (default 10,000)
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# Scratch database; must be configured before the backend modules are imported
+_scratch_dir = tempfile.mkdtemp(prefix="json_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch_dir, 'appointments.db')}"
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert
+from fastapi.encoders import jsonable_encoder
+
+from database import engine, SessionLocal
+from models import Appointment, AppointmentStatus
+from schemas import AppointmentResponse
+from fast_json import list_response, model_columns, orjson, FastJSONResponse
+
+SEED = 42
+THERAPIES = ["Abhyanga", "Shirodhara", "Panchakarma", "Basti", "Nasya", "Virechana"]
+NOW = datetime(2026, 1, 15)
+REPEAT = 5
+
+
+def load_rows(count: int, rng: random.Random):
+    Appointment.__table__.create(engine)
+    statuses = list(AppointmentStatus)
+    with engine.begin() as connection:
+        connection.execute(insert(Appointment), [{
+            "patient_id": rng.randrange(1, 1000),
+            "practitioner_id": rng.randrange(1, 50),
+            "therapy_type": rng.choice(THERAPIES),
+            "scheduled_datetime": NOW - timedelta(minutes=rng.randrange(365 * 1440)),
+            "duration_minutes": 60,
+            "status": rng.choice(statuses),
+            "notes": "Follow-up session" if rng.random() < 0.3 else None,
+            "fee": round(rng.uniform(500, 3000), 2),
+            "payment_status": "pending",
+            "created_at": NOW
+        } for _ in range(count)])
+
+
+def default_path(db, count: int) -> bytes:
+    """What /appointments did: hydrate ORM objects, from_orm each, FastAPI encoder + stdlib json"""
+    appointments = db.query(Appointment).order_by(Appointment.scheduled_datetime.desc()).limit(count).all()
+    content = [AppointmentResponse.from_orm(appointment) for appointment in appointments]
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db, count: int) -> bytes:
+    """with_entities rows validated and dumped as one List[AppointmentResponse]"""
+    rows = db.query(Appointment).with_entities(*model_columns(Appointment, AppointmentResponse)).order_by(
+        Appointment.scheduled_datetime.desc()).limit(count).all()
+    return list_response(AppointmentResponse, rows).body
+
+
+def dict_path(db, count: int) -> bytes:
+    """with_entities rows as dicts, rendered by FastJSONResponse (orjson when installed)"""
+    rows = db.query(Appointment).with_entities(*model_columns(Appointment, AppointmentResponse)).order_by(
+        Appointment.scheduled_datetime.desc()).limit(count).all()
+    return FastJSONResponse([row._asdict() for row in rows]).body
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def report(label: str, seconds: float, baseline: float):
+    print(f"{label:<48} {seconds * 1000:>10.2f} ms  {baseline / seconds:>6.1f}x")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(SEED)
+
+    print("=" * 72)
+    print(f"JSON SERIALIZATION BENCHMARK ({count:,} appointments)")
+    print("=" * 72)
+    load_rows(count, rng)
+    print(f"orjson: {'available' if orjson is not None else 'not installed (stdlib json fallback)'}\n")
+
+    db = SessionLocal()
+    try:
+        # Warm up adapters and the SQLite page cache
+        default_path(db, count)
+        fast_path(db, count)
+        dict_path(db, count)
+
+        old_time, old = timed(lambda: default_path(db, count), REPEAT)
+        new_time, new = timed(lambda: fast_path(db, count), REPEAT)
+        dict_time, rendered = timed(lambda: dict_path(db, count), REPEAT)
+        assert json.loads(old) == json.loads(new), "fast path output differs from the default path"
+        assert len(json.loads(rendered)) == count
+
+        report("ORM + from_orm + jsonable_encoder + json", old_time, old_time)
+        report("with_entities + TypeAdapter.dump_json", new_time, old_time)
+        report("with_entities + FastJSONResponse", dict_time, old_time)
+        print(f"\n{len(new) / 1024:,.0f} KiB per response")
+    finally:
+        db.close()
+    print(f"scratch data in {_scratch_dir}")
+
+
+if __name__ == "__main__":
+    main()
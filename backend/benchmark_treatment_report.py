@@ -0,0 +1,139 @@
+"""
+Benchmark for the /reports/treatments aggregation
+Loads synthetic appointments into a scratch SQLite database and compares the
+previous per-therapy-type COUNT queries with the single grouped query over raw
+appointments and with the same report summed from the daily rollups.
+
+Usage: python benchmark_treatment_report.py [appointments]   (default 1,000,000)
+"""
+
+import sys
+import os
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# Scratch database; must be configured before the backend modules are imported
+_scratch_dir = tempfile.mkdtemp(prefix="treatment_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch_dir, 'treatments.db')}"
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert, func
+
+from database import engine, SessionLocal
+from models import (
+    Appointment, AppointmentStatus, Feedback, Practitioner, DailyPractitionerStats, DailyFeedbackStats, RollupWatermark
+)
+from report_queries import treatment_rows, treatment_rows_from_rollups, summarize_treatments, success_rate
+from report_rollups import ReportRollups
+
+SEED = 42
+BATCH_SIZE = 50000
+PRACTITIONERS = 200
+PATIENTS = 20000
+THERAPIES = ["Abhyanga", "Shirodhara", "Panchakarma", "Basti", "Nasya", "Virechana",
+             "Udvartana", "Pizhichil", "Kati Basti", "Marma Therapy", "Swedana", "Raktamokshana"]
+STATUSES = [AppointmentStatus.COMPLETED] * 6 + [AppointmentStatus.SCHEDULED] * 2 + [
+    AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]
+NOW = datetime(2026, 1, 15)
+SPAN_DAYS = 730
+WINDOWS = [30, 365]
+REPEAT = 5
+
+
+def load_rows(count: int, rng: random.Random):
+    Appointment.__table__.create(engine)
+    for index in Appointment.__table__.indexes:
+        index.drop(engine)
+    start = NOW - timedelta(days=SPAN_DAYS)
+    with engine.begin() as connection:
+        for offset in range(0, count, BATCH_SIZE):
+            batch = [{
+                "patient_id": rng.randrange(1, PATIENTS),
+                "practitioner_id": rng.randrange(1, PRACTITIONERS),
+                "therapy_type": rng.choice(THERAPIES),
+                "scheduled_datetime": start + timedelta(minutes=rng.randrange(SPAN_DAYS * 1440)),
+                "duration_minutes": 60,
+                "status": rng.choice(STATUSES),
+                "payment_status": "pending"
+            } for _ in range(min(BATCH_SIZE, count - offset))]
+            connection.execute(insert(Appointment), batch)
+    for index in Appointment.__table__.indexes:
+        index.create(engine)
+    # rebuild() also recomputes Practitioner.rating from feedback
+    for model in (Practitioner, Feedback, DailyPractitionerStats, DailyFeedbackStats, RollupWatermark):
+        model.__table__.create(engine)
+
+
+def per_type_counts(db, practitioner_id: int, since: datetime):
+    """The previous implementation: one grouped count, then a COUNT per therapy type"""
+    query = db.query(Appointment).filter(
+        Appointment.practitioner_id == practitioner_id,
+        Appointment.scheduled_datetime >= since
+    )
+    total = query.count()
+    completed = query.filter(Appointment.status == "completed").count()
+    distribution = []
+    for therapy_type, count in query.group_by(Appointment.therapy_type).with_entities(
+            Appointment.therapy_type, func.count(Appointment.id)).all():
+        type_completed = query.filter(
+            Appointment.therapy_type == therapy_type, Appointment.status == "completed"
+        ).count()
+        distribution.append({"type": therapy_type, "count": count,
+                             "success_rate": success_rate(type_completed, count)})
+    return {"total_treatments": total, "success_rate_overall": success_rate(completed, total),
+            "type_distribution": distribution}
+
+
+def timed(fn, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def report(label: str, seconds: float):
+    print(f"{label:<48} {seconds * 1000:>10.2f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(SEED)
+
+    print("=" * 64)
+    print(f"TREATMENT REPORT BENCHMARK ({count:,} appointments)")
+    print("=" * 64)
+
+    elapsed, _ = timed(lambda: load_rows(count, rng))
+    print(f"loaded in {elapsed:.1f}s ({count / elapsed:,.0f} rows/sec)")
+    elapsed, rows = timed(ReportRollups().rebuild)
+    print(f"rollups built in {elapsed:.1f}s ({rows['appointments']:,} daily rows)\n")
+
+    db = SessionLocal()
+    try:
+        practitioner_id = PRACTITIONERS // 2
+        for days in WINDOWS:
+            since = NOW - timedelta(days=days)
+            old_time, old = timed(lambda: per_type_counts(db, practitioner_id, since), REPEAT)
+            new_time, new = timed(lambda: summarize_treatments(
+                treatment_rows(db, practitioner_id, since), since, NOW), REPEAT)
+            rollup_time, rolled = timed(lambda: summarize_treatments(
+                treatment_rows_from_rollups(db, practitioner_id, since.date()), since, NOW), REPEAT)
+            for key in old:
+                assert old[key] == new[key], f"{key} differs: {old[key]} != {new[key]}"
+            assert new == rolled, "rollup report differs from raw aggregation"
+            report(f"{days} days: COUNT per therapy type", old_time)
+            report(f"{days} days: single grouped query", new_time)
+            report(f"{days} days: daily rollups", rollup_time)
+            print(f"{'':<48} {old_time / new_time:>9.1f}x / {old_time / rollup_time:.1f}x  "
+                  f"({new['total_treatments']} appointments, {len(new['monthly_trends'])} months)")
+    finally:
+        db.close()
+    print(f"\nscratch data in {_scratch_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark for the WorkoutEngine split generator
+Measures splits/sec and compares indexed exercise lookups against a full scan.
+
+Usage: python benchmark_workout_engine.py [iterations]
+"""
+
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_health_assistant import ExerciseDatabase, WorkoutEngine
+
+PROFILES = [
+    {'frequency': '3 days', 'workout_goal': 'weight loss', 'equipment_access': 'home', 'medical_conditions': []},
+    {'frequency': '4 days', 'workout_goal': 'strength', 'equipment_access': 'gym', 'medical_conditions': ['arthritis']},
+    {'frequency': '5 days', 'workout_goal': 'general fitness', 'equipment_access': 'home', 'medical_conditions': ['hypertension']},
+]
+DOSHAS = ['vata', 'pitta', 'kapha']
+
+
+def scan_exercises(ex_db: ExerciseDatabase, criteria: dict) -> list:
+    """Reference full-scan filter (the pre-index implementation)"""
+    filtered = []
+    for name, data in ex_db.db.items():
+        if criteria.get('equip') == 'home' and data['equip'] == 'gym': continue
+        if criteria.get('impact') == 'low' and data['impact'] == 'high': continue
+        if criteria.get('level') == 'beginner' and data['level'] == 'advanced': continue
+
+        target = criteria.get('target_group')
+        if target and data['type'] != target and data['target'] != target: continue
+
+        filtered.append(name)
+    return filtered
+
+
+def check_index_matches_scan(ex_db: ExerciseDatabase):
+    """Indexed lookups must return exactly what the full scan returns"""
+    for equip in ['home', 'gym', None]:
+        for impact in ['low', 'any', None]:
+            for level in ['beginner', None]:
+                for group in ['push', 'pull', 'legs', 'cardio', 'chest', None]:
+                    criteria = {'equip': equip, 'impact': impact, 'level': level, 'target_group': group}
+                    assert ex_db.get_exercises(criteria) == scan_exercises(ex_db, criteria), criteria
+    print("✅ Indexed lookups match full scan")
+
+
+def check_determinism(engine: WorkoutEngine):
+    """Identical profiles must produce identical splits"""
+    for profile in PROFILES:
+        for dosha in DOSHAS:
+            assert engine.generate_split(profile, dosha) == engine.generate_split(dict(profile), dosha)
+    print("✅ Split generation is reproducible")
+
+
+def bench(label: str, fn, iterations: int):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {iterations / elapsed:>12,.0f} ops/sec  ({elapsed * 1000:.1f} ms total)")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    ex_db = ExerciseDatabase()
+    engine = WorkoutEngine()
+
+    print("=" * 60)
+    print("WORKOUT ENGINE MICRO-BENCHMARK")
+    print("=" * 60)
+
+    check_index_matches_scan(ex_db)
+    check_determinism(engine)
+    print()
+
+    criteria = {'equip': 'home', 'impact': 'low', 'target_group': 'push'}
+    bench("get_exercises (full scan)", lambda i: scan_exercises(ex_db, criteria), iterations)
+    bench("get_exercises (indexed)", lambda i: ex_db.get_exercises(criteria), iterations)
+
+    def split(i):
+        engine.generate_split(PROFILES[i % len(PROFILES)], DOSHAS[i % len(DOSHAS)])
+    bench("generate_split (seeded)", split, iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Real-time Chat
+WebSocket connection registry with per-user fan-out, presence tracking and a pluggable
+pub/sub backend.
+
+Every event for a user is published on the pub/sub backend; each API worker subscribes
+and delivers the events to the sockets it holds for that user. The default in-memory
+backend delivers directly within the process. For multi-worker deployments implement
+PubSubBackend on top of a broker (e.g. Redis pub/sub) and select it with
+CHAT_PUBSUB_BACKEND.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Any, Set, Optional, Callable, Awaitable
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+CHAT_PUBSUB_BACKEND = os.getenv("CHAT_PUBSUB_BACKEND", "memory")
+
+EventHandler = Callable[[int, Dict[str, Any]], Awaitable[None]]
+
+
+class PubSubBackend(ABC):
+    """
+    Interface for delivering user events between API workers.
+    publish() sends an event addressed to a user id; every subscribed handler
+    (one per worker) receives it and fans it out to local connections.
+    """
+
+    @abstractmethod
+    async def start(self, handler: EventHandler):
+        """Subscribe handler to events for every user"""
+
+    @abstractmethod
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        """Deliver an event to the handlers of all workers"""
+
+    async def stop(self):
+        pass
+
+
+class InMemoryPubSub(PubSubBackend):
+    """Single-process backend: publish calls the local handler directly"""
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+
+    async def publish(self, user_id: int, event: Dict[str, Any]):
+        if self._handler is not None:
+            await self._handler(user_id, event)
+
+
+PUBSUB_BACKENDS = {
+    "memory": InMemoryPubSub,
+}
+
+
+class ConnectionManager:
+    """Registry of open chat sockets per user, with presence"""
+
+    def __init__(self, pubsub: Optional[PubSubBackend] = None):
+        self.pubsub = pubsub or PUBSUB_BACKENDS.get(CHAT_PUBSUB_BACKEND, InMemoryPubSub)()
+        self._connections: Dict[int, Set[WebSocket]] = {}
+        self._last_seen: Dict[int, datetime] = {}
+        self._started = False
+
+    async def start(self):
+        if not self._started:
+            await self.pubsub.start(self.deliver_local)
+            self._started = True
+
+    async def stop(self):
+        if self._started:
+            await self.pubsub.stop()
+            self._started = False
+
+    async def connect(self, user_id: int, websocket: WebSocket):
+        await self.start()
+        await websocket.accept()
+        self._connections.setdefault(user_id, set()).add(websocket)
+        self._last_seen[user_id] = datetime.utcnow()
+
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        sockets = self._connections.get(user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._connections[user_id]
+        self._last_seen[user_id] = datetime.utcnow()
+
+    def is_online(self, user_id: int) -> bool:
+        return bool(self._connections.get(user_id))
+
+    def last_seen(self, user_id: int) -> Optional[datetime]:
+        if self.is_online(user_id):
+            return datetime.utcnow()
+        return self._last_seen.get(user_id)
+
+    def connection_count(self) -> int:
+        return sum(len(sockets) for sockets in self._connections.values())
+
+    async def send_to_user(self, user_id: int, event: Dict[str, Any]):
+        """Publish an event to all of a user's connections, on any worker"""
+        await self.pubsub.publish(user_id, event)
+
+    async def deliver_local(self, user_id: int, event: Dict[str, Any]):
+        """Write an event to the sockets this worker holds for the user"""
+        sockets = list(self._connections.get(user_id, ()))
+        if not sockets:
+            return
+
+        payload = json.dumps(event, default=_json_default)
+        results = await asyncio.gather(*(ws.send_text(payload) for ws in sockets), return_exceptions=True)
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                logger.info(f"Dropping dead chat socket for user {user_id}: {result}")
+                self.disconnect(user_id, websocket)
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def message_event(message) -> Dict[str, Any]:
+    """Serialize a ChatMessage row as a socket event"""
+    return {
+        "type": "message",
+        "message": {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "sender_type": message.sender_type,
+            "recipient_id": message.recipient_id,
+            "recipient_type": message.recipient_type,
+            "content": message.content,
+            "read": message.read,
+            "created_at": message.created_at
+        }
+    }
+
+def read_receipt_event(reader_id: int, sender_id: int, count: int) -> Dict[str, Any]:
+    """Tell a sender that the reader has read their messages"""
+    return {
+        "type": "read_receipt",
+        "reader_id": reader_id,
+        "sender_id": sender_id,
+        "count": count,
+        "read_at": datetime.utcnow()
+    }
+
+
+# Singleton instance
+_connection_manager = None
+
+def get_connection_manager() -> ConnectionManager:
+    """Get or create chat connection manager singleton"""
+    global _connection_manager
+
+    if _connection_manager is None:
+        _connection_manager = ConnectionManager()
+
+    return _connection_manager
@@ -0,0 +1,292 @@
+"""
+Data Export
+Streaming bulk export of health logs, symptoms, appointments and feedback as CSV,
+NDJSON or Parquet, for audits and research.
+
+Rows are read with yield_per (a server-side cursor where the driver supports one,
+fetchmany batches on SQLite) and encoded one batch at a time, so memory stays
+constant regardless of table size. CSV/NDJSON can be gzipped on the fly; Parquet
+(requires pyarrow) is written one row group per batch with gzip or snappy pages.
+
+Used by GET /export/{dataset} and as a CLI:
+    python data_export.py appointments --format csv --gzip -o appointments.csv.gz
+    python data_export.py health_logs --format parquet --practitioner-id 3 -o logs.parquet
+"""
+
+import os
+import io
+import csv
+import sys
+import json
+import enum
+import zlib
+import logging
+import argparse
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import select, Integer, Float, Numeric, Boolean, DateTime, Date
+from sqlalchemy.orm import Session
+
+from models import PatientHealthLog, Symptom, Appointment, Feedback
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+# Dataset name -> (model, timestamp column used by since/until, practitioner scoping).
+# "own" rows carry the practitioner's id; "caseload" rows belong to patients with at
+# least one appointment with the practitioner (health logs are kept whoever wrote them).
+DATASETS = {
+    "health_logs": (PatientHealthLog, "date", "caseload"),
+    "symptoms": (Symptom, "created_at", "caseload"),
+    "appointments": (Appointment, "scheduled_datetime", "own"),
+    "feedback": (Feedback, "created_at", "own"),
+}
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportError(ValueError):
+    """Unknown dataset or format, or Parquet requested without pyarrow"""
+
+
+# ==================== ROW SOURCE ====================
+
+def export_select(dataset: str, practitioner_id: Optional[int] = None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Column-only SELECT for a dataset, scoped to one practitioner when given, in id order"""
+    model, time_column, scoping = DATASETS[dataset]
+    table = model.__table__
+    query = select(*table.columns)
+
+    if practitioner_id is not None:
+        if scoping == "own":
+            query = query.where(table.c.practitioner_id == practitioner_id)
+        else:
+            caseload = select(Appointment.patient_id).where(Appointment.practitioner_id == practitioner_id)
+            query = query.where(table.c.patient_id.in_(caseload))
+    if since is not None:
+        query = query.where(table.c[time_column] >= since)
+    if until is not None:
+        query = query.where(table.c[time_column] < until)
+    return query.order_by(table.c.id)
+
+
+def iter_batches(db: Session, query, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence[Any]]:
+    """Result rows in lists of batch_size, streamed from the cursor"""
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _text(value: Any) -> Any:
+    """Scalar for CSV/Parquet cells: enums by value, JSON documents as compact strings"""
+    value = _plain(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), default=str)
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+
+# ==================== ENCODERS ====================
+
+def csv_chunks(columns: List[str], batches: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_text(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def ndjson_chunks(columns: List[str], batches: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row))), default=_json_default, separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain (keeps tell() absolute)"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(pa, column):
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def parquet_chunks(table_columns, batches: Iterable[Sequence[Any]], compress: bool = False) -> Iterator[bytes]:
+    """One Parquet row group per batch; the footer is emitted after the last one"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(column.name, _arrow_type(pa, column)) for column in table_columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="gzip" if compress else "snappy")
+    try:
+        for rows in batches:
+            values = list(zip(*rows))
+            arrays = [
+                pa.array([_text(value) for value in column_values] if field.type == pa.string() else column_values,
+                         type=field.type)
+                for column_values, field in zip(values, schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# ==================== EXPORT ====================
+
+def validate_export(dataset: str, fmt: str):
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'. Choose from: {', '.join(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def export_filename(dataset: str, fmt: str, compress: bool) -> str:
+    name = f"{dataset}-{datetime.utcnow():%Y%m%d}.{FORMATS[fmt][1]}"
+    return name + ".gz" if compress and fmt != "parquet" else name
+
+
+def stream_export(session_factory, dataset: str, fmt: str = "csv", compress: bool = False,
+                  practitioner_id: Optional[int] = None, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Encoded export as a byte-chunk iterator. The session is opened by the iterator itself,
+    so it stays alive for the whole stream and is closed when it finishes or is abandoned.
+    Parquet pages are compressed internally, so compress selects the gzip codec there.
+    Call validate_export() first: the checks here only run once iteration starts.
+    """
+    validate_export(dataset, fmt)
+    query = export_select(dataset, practitioner_id, since, until)
+    table_columns = list(DATASETS[dataset][0].__table__.columns)
+    columns = [column.name for column in table_columns]
+
+    db = session_factory()
+    try:
+        batches = iter_batches(db, query, batch_size)
+        if fmt == "parquet":
+            yield from parquet_chunks(table_columns, batches, compress)
+            return
+        chunks = csv_chunks(columns, batches) if fmt == "csv" else ndjson_chunks(columns, batches)
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export patient and practice data as CSV, NDJSON or Parquet")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", dest="fmt", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip CSV/NDJSON output; gzip pages for Parquet")
+    parser.add_argument("--practitioner-id", type=int, help="only this practitioner's rows / caseload")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO date or datetime, inclusive")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO date or datetime, exclusive")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        validate_export(args.dataset, args.fmt)
+    except ExportError as e:
+        parser.error(str(e))
+
+    from database import SessionLocal
+
+    chunks = stream_export(SessionLocal, args.dataset, args.fmt, args.gzip, args.practitioner_id,
+                           args.since, args.until, args.batch_size)
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.output:
+        print(f"Exported {args.dataset} to {args.output} ({written:,} bytes)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
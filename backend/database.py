@@ -4,10 +4,13 @@ SQLAlchemy setup and database connection management.
 """
 
 import os
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+logger = logging.getLogger(__name__)
+
 # Database URL - defaults to SQLite for development
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -32,18 +35,44 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class
 Base = declarative_base()
 
+def ensure_indexes(metadata):
+    """
+    Create indexes declared on models that are missing in the database.
+    create_all only creates indexes together with new tables, so indexes added
+    to existing models would otherwise never reach existing databases.
+    """
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def ensure_columns(metadata):
+    """
+    Add nullable columns declared on models that are missing in the database.
+    Like ensure_indexes, this covers columns added to existing models, which
+    create_all does not alter into existing tables.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
 # Database dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
-    except Exception:
-        import traceback
-        from datetime import datetime
-        with open("backend_error.log", "a") as f:
-            f.write(f"DB CRASH AT {datetime.utcnow()}:\n")
-            f.write(traceback.format_exc())
-            f.write("\n")
+    except Exception as e:
+        # HTTP errors raised by endpoints pass through here too; only log real failures
+        if getattr(e, "status_code", 500) >= 500:
+            logger.exception("Request failed with an open database session")
         db.rollback()
         raise
     finally:
@@ -6,13 +6,18 @@ Provides conversational AI, personalized diet plans, and workout recommendations
 import os
 import json
 import logging
+import random
+import hashlib
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import google.generativeai as genai
 
 # Import Med-Gemma and Query Classifier
 from med_gemma_service import get_med_gemma_service
+from request_metrics import track_ai_call
 from query_classifier import get_query_classifier
+from plan_cache import get_plan_cache, bucket_profile, bucket_key, common_profiles
+from fake_ai_backends import fake_backend_enabled, FakeGenerativeModel
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +29,10 @@ load_dotenv()
 
 # Initialize Gemini
 GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-if GOOGLE_API_KEY:
+if fake_backend_enabled("gemini"):
+    logger.info("Using the fake Gemini backend (FAKE_AI_BACKENDS)")
+    model = FakeGenerativeModel('gemini-pro')
+elif GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
     model = genai.GenerativeModel('gemini-pro')
 else:
@@ -135,6 +143,17 @@ class NutritionalEngine:
     """
     def __init__(self):
         self.food_db = FoodDatabase()
+        # Filtered food sets keyed by (dosha, restrictions, conditions), shared across profiles
+        self._allowed_foods_cache = {}
+        
+    def get_allowed_foods(self, dosha: str, restrictions: List[str], conditions: List[str]) -> Dict[str, List[str]]:
+        """Return the filtered food set for a (dosha, restrictions, conditions) key, computing it once"""
+        key = (dosha, tuple(sorted(restrictions or [])), tuple(sorted(conditions or [])))
+        allowed = self._allowed_foods_cache.get(key)
+        if allowed is None:
+            allowed = self.food_db.filter_foods(dosha, list(key[1]), list(key[2]))
+            self._allowed_foods_cache[key] = allowed
+        return allowed
         
     def calculate_needs(self, profile: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate TDEE, BMR, and Macro split based on advanced formulas"""
@@ -183,20 +202,22 @@ class NutritionalEngine:
             }
         }
 
-    def generate_day_plan(self, profile: Dict[str, Any], dosha: str) -> Dict[str, Any]:
+    def generate_day_plan(self, profile: Dict[str, Any], dosha: str, needs: Optional[Dict[str, Any]] = None,
+                          rng: Optional[random.Random] = None) -> Dict[str, Any]:
         """Construct a full day of eating using component-based logic"""
-        needs = self.calculate_needs(profile)
+        chooser = rng or random
+        if needs is None:
+            needs = self.calculate_needs(profile)
         restrictions = profile.get('dietary_restrictions', [])
         conditions = profile.get('medical_conditions', [])
         
         # Get allowed foods
-        allowed_foods = self.food_db.filter_foods(dosha, restrictions, conditions)
+        allowed_foods = self.get_allowed_foods(dosha, restrictions, conditions)
         
         # Check if lists are empty (fallback to generic if strict filters remove everything)
-        import random
         def pick(category):
             if allowed_foods[category]: 
-                return random.choice(allowed_foods[category])
+                return chooser.choice(allowed_foods[category])
             return f"Generic {category} (Database Empty)"
 
         # Meal Construction Logic
@@ -222,6 +243,19 @@ class NutritionalEngine:
             }
         }
 
+    def generate_multi_day_plan(self, profile: Dict[str, Any], dosha: str, days: int = 7) -> Dict[str, Any]:
+        """Construct a plan of several days, computing needs and the allowed food set only once"""
+        needs = self.calculate_needs(profile)
+        day_plans = []
+        for day in range(1, days + 1):
+            plan = self.generate_day_plan(profile, dosha, needs=needs)
+            day_plans.append({'day': day, 'meals': plan['meals']})
+        
+        return {
+            'metrics': needs,
+            'days': day_plans
+        }
+
 
 
 class ExerciseDatabase:
@@ -259,32 +293,62 @@ class ExerciseDatabase:
             'Burpees': {'type': 'cardio', 'target': 'hiit', 'level': 'advanced', 'equip': 'none', 'impact': 'high'},
             'Swimming': {'type': 'cardio', 'target': 'full_body', 'level': 'intermediate', 'equip': 'pool', 'impact': 'low'},
         }
+        self._build_indexes()
+        
+    def _build_indexes(self):
+        """Precompute exercise name sets per attribute value (type/target/level/equip/impact)"""
+        self.order = {name: i for i, name in enumerate(self.db)}
+        self.index = {field: {} for field in ('type', 'target', 'level', 'equip', 'impact')}
+        for name, data in self.db.items():
+            for field, values in self.index.items():
+                values.setdefault(data[field], set()).add(name)
+        # Memoized pools keyed by (equipment, impact, level, group)
+        self._pool_cache = {}
+        
+    def _lookup(self, field: str, value: str) -> set:
+        return self.index[field].get(value, set())
         
     def get_exercises(self, criteria: Dict[str, Any]) -> List[str]:
         """Filter exercises based on criteria"""
-        filtered = []
-        for name, data in self.db.items():
-            if criteria.get('equip') == 'home' and data['equip'] == 'gym': continue
-            if criteria.get('impact') == 'low' and data['impact'] == 'high': continue
-            if criteria.get('level') == 'beginner' and data['level'] == 'advanced': continue
-            
-            target = criteria.get('target_group')
-            if target and data['type'] != target and data['target'] != target: continue
-            
-            filtered.append(name)
-        return filtered
+        key = (criteria.get('equip'), criteria.get('impact'), criteria.get('level'), criteria.get('target_group'))
+        pool = self._pool_cache.get(key)
+        if pool is None:
+            pool = self._build_pool(*key)
+            self._pool_cache[key] = pool
+        return list(pool)
+        
+    def _build_pool(self, equip: Optional[str], impact: Optional[str], level: Optional[str], target: Optional[str]) -> tuple:
+        """Resolve criteria with set operations over the indexes, in library order"""
+        names = set(self.db)
+        if equip == 'home': names -= self._lookup('equip', 'gym')
+        if impact == 'low': names -= self._lookup('impact', 'high')
+        if level == 'beginner': names -= self._lookup('level', 'advanced')
+        if target: names &= self._lookup('type', target) | self._lookup('target', target)
+        return tuple(sorted(names, key=self.order.get))
 
 class WorkoutEngine:
     """Advanced Training Logic for Periodization and Splits"""
     def __init__(self):
         self.ex_db = ExerciseDatabase()
         
-    def generate_split(self, profile: Dict[str, Any], dosha: str) -> Dict[str, Any]:
-        """Generate a scientific training split"""
+    def _split_features(self, profile: Dict[str, Any]) -> tuple:
+        """The profile features a training split depends on"""
         days_available = int(profile.get('frequency', '3 days').split()[0]) if 'frequency' in profile and profile['frequency'] else 3
         goal = profile.get('workout_goal', 'general fitness')
         equipment = profile.get('equipment_access', 'home')
         conditions = profile.get('medical_conditions', [])
+        return days_available, goal, equipment, conditions
+        
+    def split_seed(self, profile: Dict[str, Any], dosha: str, week: int = 0) -> int:
+        """Stable seed derived from the split features, so identical profiles get identical plans"""
+        days_available, goal, equipment, conditions = self._split_features(profile)
+        features = (dosha, days_available, goal, equipment, tuple(sorted(conditions)), week)
+        return int.from_bytes(hashlib.sha256(repr(features).encode()).digest()[:8], 'big')
+        
+    def generate_split(self, profile: Dict[str, Any], dosha: str, seed: Optional[int] = None) -> Dict[str, Any]:
+        """Generate a scientific training split (reproducible for a given seed)"""
+        days_available, goal, equipment, conditions = self._split_features(profile)
+        rng = random.Random(self.split_seed(profile, dosha) if seed is None else seed)
         
         # Determine Split Structure
         if days_available <= 3:
@@ -331,12 +395,11 @@ class WorkoutEngine:
             
             # Select Exercises
             exercises = []
-            import random
             
             # Helper to fetch by exact group
             def add_move(grp):
                 opts = self.ex_db.get_exercises({'target_group': grp, 'equip': equipment, 'impact': impact_preference})
-                if opts: exercises.append(f"{random.choice(opts)} ({sets} sets x {reps})")
+                if opts: exercises.append(f"{rng.choice(opts)} ({sets} sets x {reps})")
             
             if isinstance(target_group, list):
                 for grp in target_group: add_move(grp)
@@ -352,6 +415,67 @@ class WorkoutEngine:
         }
 
 
+def render_diet_plan_message(plan_data: Dict[str, Any]) -> str:
+    """Chat message for a diet plan"""
+    plan_message = f"Here is your personalized diet plan:\n\n"
+    plan_message += f"**Target Calories:** {plan_data['target_calories']} kcal/day\n"
+    plan_message += f"**Macros:** Protein: {plan_data['macros']['protein']}, Carbs: {plan_data['macros']['carbs']}, Fats: {plan_data['macros']['fats']}\n\n"
+    plan_message += "**Daily Meal Plan:**\n"
+    for meal_name, meal_details in plan_data['meal_plan'].items():
+        plan_message += f"\n**{meal_name.title()}** ({meal_details['calories']} kcal)\n"
+        plan_message += f"  {meal_details['suggestion']}\n"
+    
+    plan_message += f"\n**Foods to Favor:** {', '.join(plan_data['foods_to_favor'][:5])}\n"
+    plan_message += f"**Foods to Avoid:** {', '.join(plan_data['foods_to_avoid'][:5])}\n"
+    
+    if plan_data['conditions_considered']:
+        plan_message += f"\n*Tailored for: {', '.join(plan_data['conditions_considered'])}*"
+    return plan_message
+
+def render_workout_plan_message(plan_data: Dict[str, Any]) -> str:
+    """Chat message for a workout plan"""
+    plan_message = f"Here is your personalized workout routine:\n\n"
+    plan_message += f"**Workout Style:** {plan_data['workout_style']}\n\n"
+    plan_message += "**Weekly Schedule:**\n"
+    for day, workout in plan_data['weekly_plan'].items():
+        plan_message += f"\n**{day}:**\n  {workout}\n"
+    
+    if 'yoga_sequence' in plan_data:
+        plan_message += "\n**Recommended Yoga Sequence:**\n"
+        for pose in plan_data['yoga_sequence'][:5]:
+            plan_message += f"  • {pose}\n"
+    return plan_message
+
+def render_plan_markdown(plan_type: str, plan_data: Dict[str, Any]) -> str:
+    """Markdown summary of a plan as shown by /health/ask-ai"""
+    if plan_type == 'diet_plan':
+        ai_answer = f"📊 **Your Metrics:**\n"
+        ai_answer += f"- BMI: {plan_data['bmi']}\n"
+        ai_answer += f"- Daily Calorie Target: {plan_data['target_calories']} kcal\n"
+        ai_answer += f"- Dominant Dosha: {plan_data['dominant_dosha'].title()}\n\n"
+        ai_answer += f"🥗 **Macros:**\n"
+        ai_answer += f"- Protein: {plan_data['macros']['protein']}\n"
+        ai_answer += f"- Carbs: {plan_data['macros']['carbs']}\n"
+        ai_answer += f"- Fats: {plan_data['macros']['fats']}\n\n"
+        ai_answer += f"✅ **Foods to Favor:** {', '.join(plan_data['foods_to_favor'][:5])}\n\n"
+        ai_answer += f"❌ **Foods to Avoid:** {', '.join(plan_data['foods_to_avoid'][:5])}\n\n"
+        ai_answer += f"🍽️ **Sample Meal Plan:**\n"
+        for meal, details in plan_data['meal_plan'].items():
+            ai_answer += f"- **{meal.title()}**: {details['suggestion']} ({details['calories']} kcal)\n"
+        ai_answer += f"\n💧 **Hydration:** {plan_data['hydration']}\n"
+        return ai_answer
+    
+    ai_answer = f"🏋️ **Workout Style:** {plan_data['workout_style']}\n\n"
+    ai_answer += f"✅ **Recommended Activities:** {', '.join(plan_data['recommended_activities'][:4])}\n\n"
+    ai_answer += f"📅 **Weekly Plan:**\n"
+    for day, activity in plan_data['weekly_plan'].items():
+        ai_answer += f"- **{day}**: {activity}\n"
+    ai_answer += f"\n🧘 **Yoga Sequence:**\n"
+    for pose in plan_data['yoga_sequence'][:5]:
+        ai_answer += f"- {pose}\n"
+    return ai_answer
+
+
 class ConversationalHealthAssistant:
     """
     Advanced health assistant that asks clarifying questions and provides
@@ -363,6 +487,7 @@ class ConversationalHealthAssistant:
         # Initialize Advanced Engines
         self.nutrition_engine = NutritionalEngine()
         self.workout_engine = WorkoutEngine()
+        self.plan_cache = get_plan_cache()
         
         # Initialize Hybrid AI System
         self.med_gemma_service = get_med_gemma_service()
@@ -372,14 +497,54 @@ class ConversationalHealthAssistant:
         
     # ... (extract_profile_info and needs_clarification remain same) ...
 
+    def get_plan(self, plan_type: str, user_profile: Dict[str, Any], dosha_analysis: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Get the cached plan for the profile's bucket as {'data', 'text', 'markdown'},
+        generating it from the bucket's representative profile on a miss
+        """
+        bucket = bucket_profile(plan_type, user_profile, dosha_analysis)
+        key = bucket_key(bucket)
+        return self.plan_cache.get_or_create(key, lambda: self._build_cached_plan(bucket, key))
+    
+    def _build_cached_plan(self, bucket: Dict[str, Any], key: str) -> Dict[str, Any]:
+        dosha_analysis = {bucket['dosha']: 1}
+        if bucket['plan_type'] == 'diet_plan':
+            # Seed meal picks from the bucket key so a bucket always renders the same plan
+            plan_data = self._build_diet_plan(bucket, dosha_analysis, random.Random(int(key[:16], 16)))
+            text = render_diet_plan_message(plan_data)
+        else:
+            plan_data = self._build_workout_plan(bucket, dosha_analysis)
+            text = render_workout_plan_message(plan_data)
+        
+        return {
+            'data': plan_data,
+            'text': text,
+            'markdown': render_plan_markdown(bucket['plan_type'], plan_data)
+        }
+    
+    def warm_plan_cache(self) -> int:
+        """Pre-generate plans for the most common profile buckets"""
+        warmed = 0
+        for profile in common_profiles():
+            for dosha in ['vata', 'pitta', 'kapha']:
+                for plan_type in ['diet_plan', 'workout_plan']:
+                    self.get_plan(plan_type, profile, {dosha: 1})
+                    warmed += 1
+        logger.info(f"Plan cache warmed: {self.plan_cache.stats()}")
+        return warmed
+
     def generate_diet_plan(self, user_profile: Dict[str, Any], dosha_analysis: Dict[str, int]) -> Dict[str, Any]:
         """
-        Generate robust personalized diet plan using NutritionalEngine
+        Generate robust personalized diet plan using NutritionalEngine (cached per profile bucket)
         """
+        return self.get_plan('diet_plan', user_profile, dosha_analysis)['data']
+    
+    def _build_diet_plan(self, user_profile: Dict[str, Any], dosha_analysis: Dict[str, int],
+                         rng: Optional[random.Random] = None) -> Dict[str, Any]:
         dominant_dosha = max(dosha_analysis, key=dosha_analysis.get)
         
         # Use the advanced engine
-        plan_data = self.nutrition_engine.generate_day_plan(user_profile, dominant_dosha)
+        plan_data = self.nutrition_engine.generate_day_plan(user_profile, dominant_dosha, rng=rng)
         metrics = plan_data['metrics']
         
         # Get dosha specific advice (keep existing small helper or move to DB)
@@ -408,8 +573,11 @@ class ConversationalHealthAssistant:
 
     def generate_workout_plan(self, user_profile: Dict[str, Any], dosha_analysis: Dict[str, int]) -> Dict[str, Any]:
         """
-        Generate personalized workout plan using WorkoutEngine
+        Generate personalized workout plan using WorkoutEngine (cached per profile bucket)
         """
+        return self.get_plan('workout_plan', user_profile, dosha_analysis)['data']
+    
+    def _build_workout_plan(self, user_profile: Dict[str, Any], dosha_analysis: Dict[str, int]) -> Dict[str, Any]:
         dominant_dosha = max(dosha_analysis, key=dosha_analysis.get)
         
         # Use advanced engine
@@ -907,6 +1075,7 @@ class ConversationalHealthAssistant:
         response_type = 'conversation'
         plan_data = None
         plan_message = ""
+        rendered_plan = None
         
         # Broad keywords for plan generation
         diet_keywords = ['diet', 'meal', 'food', 'eating', 'nutrition', 'recipe']
@@ -923,20 +1092,10 @@ class ConversationalHealthAssistant:
         if is_diet_request:
             response_type = 'diet_plan'
             try:
-                plan_data = self.generate_diet_plan(user_profile, dosha_analysis)
-                plan_message = f"Here is your personalized diet plan:\n\n"
-                plan_message += f"**Target Calories:** {plan_data['target_calories']} kcal/day\n"
-                plan_message += f"**Macros:** Protein: {plan_data['macros']['protein']}, Carbs: {plan_data['macros']['carbs']}, Fats: {plan_data['macros']['fats']}\n\n"
-                plan_message += "**Daily Meal Plan:**\n"
-                for meal_name, meal_details in plan_data['meal_plan'].items():
-                    plan_message += f"\n**{meal_name.title()}** ({meal_details['calories']} kcal)\n"
-                    plan_message += f"  {meal_details['suggestion']}\n"
-                
-                plan_message += f"\n**Foods to Favor:** {', '.join(plan_data['foods_to_favor'][:5])}\n"
-                plan_message += f"**Foods to Avoid:** {', '.join(plan_data['foods_to_avoid'][:5])}\n"
-                
-                if plan_data['conditions_considered']:
-                    plan_message += f"\n*Tailored for: {', '.join(plan_data['conditions_considered'])}*"
+                cached_plan = self.get_plan('diet_plan', user_profile, dosha_analysis)
+                plan_data = cached_plan['data']
+                plan_message = cached_plan['text']
+                rendered_plan = cached_plan['markdown']
                 
                 # Add structured meal reminders with specific times
                 meal_times = {
@@ -976,17 +1135,10 @@ class ConversationalHealthAssistant:
         elif is_workout_request:
             response_type = 'workout_plan'
             try:
-                plan_data = self.generate_workout_plan(user_profile, dosha_analysis)
-                plan_message = f"Here is your personalized workout routine:\n\n"
-                plan_message += f"**Workout Style:** {plan_data['workout_style']}\n\n"
-                plan_message += "**Weekly Schedule:**\n"
-                for day, workout in plan_data['weekly_plan'].items():
-                    plan_message += f"\n**{day}:**\n  {workout}\n"
-                
-                if 'yoga_sequence' in plan_data:
-                    plan_message += "\n**Recommended Yoga Sequence:**\n"
-                    for pose in plan_data['yoga_sequence'][:5]:
-                        plan_message += f"  • {pose}\n"
+                cached_plan = self.get_plan('workout_plan', user_profile, dosha_analysis)
+                plan_data = cached_plan['data']
+                plan_message = cached_plan['text']
+                rendered_plan = cached_plan['markdown']
             except Exception as e:
                 logger.error(f"Workout Plan Generation Error: {e}")
                 response_type = 'conversation'
@@ -1020,11 +1172,12 @@ class ConversationalHealthAssistant:
                 # Use Med-Gemma for medical queries
                 try:
                     logger.info("Using Med-Gemma for medical query")
-                    med_response = self.med_gemma_service.generate_medical_response(
-                        query=query,
-                        context=f"Patient conditions: {user_profile.get('medical_conditions', [])}. Dosha: {dosha_analysis}",
-                        conversation_history=conversation_history
-                    )
+                    with track_ai_call("med-gemma"):
+                        med_response = self.med_gemma_service.generate_medical_response(
+                            query=query,
+                            context=f"Patient conditions: {user_profile.get('medical_conditions', [])}. Dosha: {dosha_analysis}",
+                            conversation_history=conversation_history
+                        )
                     
                     if med_response.get('response'):
                         reply_text = med_response['response']
@@ -1063,7 +1216,8 @@ class ConversationalHealthAssistant:
                         
                         base_prompt += " Provide helpful health advice based on their profile and dosha."
                         
-                        resp = model.generate_content(base_prompt)
+                        with track_ai_call("gemini"):
+                            resp = model.generate_content(base_prompt)
                         reply_text = resp.text
                         ai_model_used = "gemini-pro"
                     except Exception as e:
@@ -1085,7 +1239,8 @@ class ConversationalHealthAssistant:
             if model and response_type in ['diet_plan', 'workout_plan']:
                 try:
                     commentary_prompt = f"The user requested a {response_type.replace('_', ' ')}. I've generated a detailed plan. Add a brief encouraging message (2-3 sentences) about following this plan."
-                    resp = model.generate_content(commentary_prompt)
+                    with track_ai_call("gemini"):
+                        resp = model.generate_content(commentary_prompt)
                     reply_text = resp.text + "\n\n" + reply_text
                     ai_model_used = "gemini-pro"
                 except:
@@ -1096,6 +1251,7 @@ class ConversationalHealthAssistant:
             'reply': reply_text, # Used for conversation type
             'message': reply_text, # Used for plan types by main.py
             'data': plan_data,
+            'rendered_plan': rendered_plan, # Pre-rendered markdown summary of the plan (cached)
             'actions': actions,
             'conversation_id': "new",
             'extracted_info': extracted_info if 'extracted_info' in locals() else None,
@@ -0,0 +1,478 @@
+"""
+Fake AI Backends
+Deterministic stand-ins for the external AI dependencies, so the orchestration around
+them (timeouts, fallbacks, caching, concurrency) can be profiled offline, in CI or on
+air-gapped machines.
+
+Selected with FAKE_AI_BACKENDS, a comma-separated list or "all":
+    gemini       google.generativeai GenerativeModel (health assistant, RAG service)
+    gemini_rest  the generateContent REST call made by /api/agent/chat
+    medgemma     the Ollama client used by MedGemmaService
+    embeddings   SentenceTransformer in the RAG service
+
+Behaviour, each setting also available per backend (e.g. FAKE_AI_LATENCY_MEDGEMMA):
+    FAKE_AI_LATENCY          time to first token: "fixed:0.2", "uniform:0.1,0.5",
+                             "normal:0.8,0.2", "lognormal:0.8,0.5" (median, sigma) or
+                             "exponential:0.5" (mean); defaults depend on the backend
+    FAKE_AI_TOKENS_PER_SEC   generation rate after the first token (default 50, 0 = instant)
+    FAKE_AI_REPLY_TOKENS     typical reply length in tokens (default 120)
+    FAKE_AI_FAILURE_RATE     share of calls failing the way the real backend does (default 0)
+    FAKE_AI_TIMEOUT_RATE     share of calls hanging until the caller's timeout (default 0)
+    FAKE_AI_HANG_SECONDS     how long a hung call blocks when the caller sets no timeout (default 30)
+    FAKE_AI_SEED             seed for latencies and injected failures (default 42)
+    FAKE_EMBEDDING_DIM       embedding size (default 384, as all-MiniLM-L6-v2)
+
+Reply text is derived from a hash of the prompt, so a prompt always gets the same reply.
+Embeddings are hashed bag-of-words vectors: identical texts embed identically and texts
+sharing words are close, so retrieval still ranks plausibly. Calls block like the real
+clients do (time.sleep); only generate_content_async yields to the event loop.
+"""
+
+import os
+import re
+import math
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("gemini", "gemini_rest", "medgemma", "embeddings")
+
+# Time to first token when FAKE_AI_LATENCY is not set; a local 2B model is slower than Gemini
+DEFAULT_LATENCY = {
+    "gemini": "lognormal:0.8,0.4",
+    "gemini_rest": "lognormal:0.8,0.4",
+    "medgemma": "lognormal:1.5,0.5",
+    "embeddings": "lognormal:0.01,0.3",
+}
+
+VOCABULARY = (
+    "ayurveda dosha vata pitta kapha balance digestion agni warm cooked meals ginger turmeric "
+    "rest sleep routine hydration water herbal tea yoga pranayama breathing gentle walk stress "
+    "practitioner consult symptoms monitor diet seasonal fruits vegetables spices ghee oil massage "
+    "abhyanga detox moderation energy recovery mindful evening morning daily week improve support"
+).split()
+
+
+class FakeBackendError(RuntimeError):
+    """Injected backend failure (FAKE_AI_FAILURE_RATE)"""
+
+
+class FakeBackendTimeout(FakeBackendError, TimeoutError):
+    """Injected hang that ran into the caller's timeout (FAKE_AI_TIMEOUT_RATE)"""
+
+
+# ==================== CONFIGURATION ====================
+
+def _setting(name: str, backend: str, default: Optional[str] = None) -> Optional[str]:
+    return os.getenv(f"{name}_{backend.upper()}", os.getenv(name, default))
+
+
+_warned_unknown: set = set()
+
+def enabled_backends() -> set:
+    spec = os.getenv("FAKE_AI_BACKENDS", "").strip().lower()
+    if spec in ("all", "1", "true", "yes"):
+        return set(BACKENDS)
+    names = {name.strip() for name in spec.split(",") if name.strip()}
+    unknown = names - set(BACKENDS) - _warned_unknown
+    if unknown:
+        _warned_unknown.update(unknown)
+        logger.warning(f"Unknown fake AI backends ignored: {', '.join(sorted(unknown))}")
+    return names & set(BACKENDS)
+
+
+def fake_backend_enabled(name: str) -> bool:
+    """Whether FAKE_AI_BACKENDS selects the fake for this backend"""
+    return name in enabled_backends()
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """A latency distribution in seconds, parsed from "kind:param,param" """
+    kind: str
+    params: Tuple[float, ...]
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, raw = spec.strip().partition(":")
+        kind = kind.lower()
+        if kind not in cls.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}'. Choose from: {', '.join(cls.KINDS)}")
+        try:
+            params = tuple(float(value) for value in raw.split(",") if value.strip())
+        except ValueError:
+            raise ValueError(f"Latency parameters must be numbers: '{spec}'")
+        if len(params) != cls.KINDS[kind]:
+            raise ValueError(f"'{kind}' latency takes {cls.KINDS[kind]} parameter(s): '{spec}'")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            value = median * rng.lognormvariate(0, sigma)
+        else:
+            value = rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+@dataclass(frozen=True)
+class BackendProfile:
+    latency: LatencyModel
+    tokens_per_sec: float
+    reply_tokens: int
+    failure_rate: float
+    timeout_rate: float
+    hang_seconds: float
+
+    @classmethod
+    def from_env(cls, backend: str) -> "BackendProfile":
+        return cls(
+            latency=LatencyModel.parse(_setting("FAKE_AI_LATENCY", backend, DEFAULT_LATENCY.get(backend, "fixed:0"))),
+            tokens_per_sec=float(_setting("FAKE_AI_TOKENS_PER_SEC", backend, "50")),
+            reply_tokens=int(_setting("FAKE_AI_REPLY_TOKENS", backend, "120")),
+            failure_rate=float(_setting("FAKE_AI_FAILURE_RATE", backend, "0")),
+            timeout_rate=float(_setting("FAKE_AI_TIMEOUT_RATE", backend, "0")),
+            hang_seconds=float(_setting("FAKE_AI_HANG_SECONDS", backend, "30")),
+        )
+
+
+# ==================== BACKEND CORE ====================
+
+@dataclass
+class CallPlan:
+    """What one call will do, drawn up front so blocking and async callers behave alike"""
+    outcome: str  # "ok", "failure" or "timeout"
+    first_token: float
+    tokens: List[str]
+
+
+class FakeBackend:
+    """Seeded latency and failure draws, deterministic reply text and call counters for one backend"""
+
+    def __init__(self, name: str, profile: Optional[BackendProfile] = None, seed: Optional[int] = None):
+        self.name = name
+        self.profile = profile or BackendProfile.from_env(name)
+        seed = int(os.getenv("FAKE_AI_SEED", "42")) if seed is None else seed
+        self.rng = random.Random(f"{seed}:{name}")
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.tokens = 0
+
+    def reply_tokens(self, prompt: str, max_tokens: Optional[int] = None) -> List[str]:
+        """Reply for a prompt: same prompt, same words; length 50-150% of reply_tokens"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        words = random.Random(digest).choices(VOCABULARY, k=max(1, int(self.profile.reply_tokens * (0.5 + digest[0] / 255))))
+        if max_tokens:
+            words = words[:max_tokens]
+        words[0] = words[0].capitalize()
+        return [word if i == 0 else " " + word for i, word in enumerate(words)] + ["."]
+
+    def plan(self, prompt: str, max_tokens: Optional[int] = None) -> CallPlan:
+        profile = self.profile
+        with self._lock:
+            self.calls += 1
+            roll = self.rng.random()
+            first_token = profile.latency.sample(self.rng)
+            if roll < profile.timeout_rate:
+                self.timeouts += 1
+                return CallPlan("timeout", first_token, [])
+            if roll < profile.timeout_rate + profile.failure_rate:
+                self.failures += 1
+                return CallPlan("failure", first_token, [])
+        tokens = self.reply_tokens(prompt, max_tokens)
+        with self._lock:
+            self.tokens += len(tokens)
+        return CallPlan("ok", first_token, tokens)
+
+    def _token_delay(self) -> float:
+        rate = self.profile.tokens_per_sec
+        return 1 / rate if rate > 0 else 0.0
+
+    def _raise_for(self, plan: CallPlan, timeout: Optional[float]):
+        if plan.outcome == "timeout":
+            raise FakeBackendTimeout(f"{self.name}: no response within {timeout or self.profile.hang_seconds:g}s")
+        if plan.outcome == "failure":
+            raise FakeBackendError(f"{self.name}: injected failure (503 Service Unavailable)")
+
+    def complete(self, prompt: str, timeout: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """Blocking completion: first-token latency plus generation time, then the whole reply"""
+        plan = self.plan(prompt, max_tokens)
+        if plan.outcome == "timeout":
+            time.sleep(timeout or self.profile.hang_seconds)
+        else:
+            time.sleep(plan.first_token + len(plan.tokens) * self._token_delay())
+        self._raise_for(plan, timeout)
+        return "".join(plan.tokens)
+
+    async def complete_async(self, prompt: str, timeout: Optional[float] = None,
+                             max_tokens: Optional[int] = None) -> str:
+        plan = self.plan(prompt, max_tokens)
+        if plan.outcome == "timeout":
+            await asyncio.sleep(timeout or self.profile.hang_seconds)
+        else:
+            await asyncio.sleep(plan.first_token + len(plan.tokens) * self._token_delay())
+        self._raise_for(plan, timeout)
+        return "".join(plan.tokens)
+
+    def stream(self, prompt: str, chunk_tokens: int = 1, timeout: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Blocking token stream: chunks of chunk_tokens at the configured rate"""
+        plan = self.plan(prompt, max_tokens)
+        if plan.outcome == "timeout":
+            time.sleep(timeout or self.profile.hang_seconds)
+        else:
+            time.sleep(plan.first_token)
+        self._raise_for(plan, timeout)
+        delay = self._token_delay()
+        for start in range(0, len(plan.tokens), chunk_tokens):
+            chunk = plan.tokens[start:start + chunk_tokens]
+            if start and delay:
+                time.sleep(delay * len(chunk))
+            yield "".join(chunk)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "tokens": self.tokens,
+                "latency": f"{self.profile.latency.kind}:{','.join(f'{p:g}' for p in self.profile.latency.params)}",
+                "tokens_per_sec": self.profile.tokens_per_sec,
+            }
+
+
+_backends: Dict[str, FakeBackend] = {}
+_backends_lock = threading.Lock()
+
+def get_fake_backend(name: str) -> FakeBackend:
+    """Get or create the shared fake backend for a name (configured from the environment)"""
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = FakeBackend(name)
+    return backend
+
+
+def fake_backend_stats() -> Dict[str, Dict[str, Any]]:
+    with _backends_lock:
+        backends = dict(_backends)
+    return {name: backend.stats() for name, backend in sorted(backends.items())}
+
+
+def _prompt_text(contents: Any) -> str:
+    """Flatten genai-style contents (str, parts, content dicts, lists of them) into one prompt"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        if "parts" in contents:
+            return _prompt_text(contents["parts"])
+        return str(contents.get("text", ""))
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_prompt_text(item) for item in contents)
+    return str(getattr(contents, "text", contents))
+
+
+# ==================== GEMINI (google.generativeai) ====================
+
+class FakeGenerateContentChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerateContentResponse:
+    """GenerateContentResponse look-alike; a streamed one yields chunks and has .text once consumed"""
+
+    def __init__(self, text: Optional[str] = None, chunks: Optional[Iterator[str]] = None):
+        self._text = text
+        self._chunks = chunks
+        self._received: List[str] = []
+
+    def __iter__(self) -> Iterator[FakeGenerateContentChunk]:
+        if self._chunks is None:
+            yield FakeGenerateContentChunk(self.text)
+            return
+        for chunk in self._chunks:
+            self._received.append(chunk)
+            yield FakeGenerateContentChunk(chunk)
+        self._text = "".join(self._received)
+        self._chunks = None
+
+    def resolve(self):
+        for _ in self:
+            pass
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self.resolve()
+        return self._text
+
+
+class FakeGenerativeModel:
+    """genai.GenerativeModel look-alike: generate_content (optionally streamed) and generate_content_async"""
+
+    def __init__(self, model_name: str = "gemini-pro", backend: Optional[FakeBackend] = None):
+        self.model_name = model_name
+        self.backend = backend or get_fake_backend("gemini")
+
+    def generate_content(self, contents: Any, stream: bool = False, **kwargs) -> FakeGenerateContentResponse:
+        prompt = _prompt_text(contents)
+        if stream:
+            # Gemini streams a few tokens per chunk
+            return FakeGenerateContentResponse(chunks=self.backend.stream(prompt, chunk_tokens=8))
+        return FakeGenerateContentResponse(text=self.backend.complete(prompt))
+
+    async def generate_content_async(self, contents: Any, **kwargs) -> FakeGenerateContentResponse:
+        return FakeGenerateContentResponse(text=await self.backend.complete_async(_prompt_text(contents)))
+
+
+# ==================== GEMINI REST ====================
+
+class FakeRestResponse:
+    """The parts of requests.Response the callers use"""
+
+    def __init__(self, status_code: int, payload: Dict[str, Any]):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error: {self._payload['error']['message']}", response=self)
+
+
+def fake_gemini_rest_post(url: str, json: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+                          **kwargs) -> FakeRestResponse:
+    """Drop-in for requests.post to generativelanguage.googleapis.com ...:generateContent"""
+    import requests
+
+    backend = get_fake_backend("gemini_rest")
+    prompt = _prompt_text((json or {}).get("contents", []))
+    try:
+        text = backend.complete(prompt, timeout=timeout)
+    except FakeBackendTimeout as e:
+        raise requests.exceptions.Timeout(str(e))
+    except FakeBackendError as e:
+        # The REST API reports overload as a status, not a dropped connection
+        return FakeRestResponse(503, {"error": {"code": 503, "message": str(e), "status": "UNAVAILABLE"}})
+    return FakeRestResponse(200, {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]
+    })
+
+
+# ==================== OLLAMA (Med-Gemma) ====================
+
+class FakeOllamaClient:
+    """ollama.Client look-alike: list, generate and chat, each optionally streamed"""
+
+    def __init__(self, host: Optional[str] = None, backend: Optional[FakeBackend] = None, **kwargs):
+        self.host = host
+        self.backend = backend or get_fake_backend("medgemma")
+
+    def list(self) -> Dict[str, Any]:
+        return {"models": [{"name": os.getenv("MED_GEMMA_MODEL", "gemma2:2b")}]}
+
+    def generate(self, model: str = "", prompt: str = "", options: Optional[Dict[str, Any]] = None,
+                 stream: bool = False, **kwargs):
+        max_tokens = (options or {}).get("num_predict")
+        if stream:
+            return self._stream(model, prompt, max_tokens, lambda text: {"response": text})
+        text = self.backend.complete(prompt, max_tokens=max_tokens)
+        return {"model": model, "response": text, "done": True}
+
+    def chat(self, model: str = "", messages: Sequence[Dict[str, str]] = (), options: Optional[Dict[str, Any]] = None,
+             stream: bool = False, **kwargs):
+        prompt = "\n".join(f"{message.get('role')}: {message.get('content')}" for message in messages)
+        max_tokens = (options or {}).get("num_predict")
+        if stream:
+            return self._stream(model, prompt, max_tokens,
+                                lambda text: {"message": {"role": "assistant", "content": text}})
+        text = self.backend.complete(prompt, max_tokens=max_tokens)
+        return {"model": model, "message": {"role": "assistant", "content": text}, "done": True}
+
+    def _stream(self, model: str, prompt: str, max_tokens: Optional[int], shape) -> Iterator[Dict[str, Any]]:
+        for token in self.backend.stream(prompt, max_tokens=max_tokens):
+            yield {"model": model, "done": False, **shape(token)}
+        yield {"model": model, "done": True, **shape("")}
+
+
+# ==================== EMBEDDINGS (SentenceTransformer) ====================
+
+def hashed_embedding(text: str, dim: int) -> List[float]:
+    """Unit-length signed feature-hashing vector of the text's words"""
+    vector = [0.0] * dim
+    for token in re.findall(r"\w+", text.lower()) or [text]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "big") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class _Vector(list):
+    def tolist(self) -> List[float]:
+        return list(self)
+
+
+class _Matrix(list):
+    def tolist(self) -> List[List[float]]:
+        return [list(row) for row in self]
+
+
+class FakeSentenceTransformer:
+    """SentenceTransformer look-alike whose encode() returns hashed bag-of-words vectors"""
+
+    def __init__(self, model_name_or_path: str = "all-MiniLM-L6-v2", backend: Optional[FakeBackend] = None, **kwargs):
+        self.model_name = model_name_or_path
+        self.dim = int(os.getenv("FAKE_EMBEDDING_DIM", "384"))
+        self.backend = backend or get_fake_backend("embeddings")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # One model call per batch, as the real encoder runs
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            plan = self.backend.plan("\n".join(batch), max_tokens=1)
+            time.sleep(plan.first_token)
+            self.backend._raise_for(plan, None)
+        vectors = [hashed_embedding(text, self.dim) for text in texts]
+
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None and convert_to_numpy:
+            array = np.asarray(vectors, dtype=np.float32)
+            return array[0] if single else array
+        return _Vector(vectors[0]) if single else _Matrix(_Vector(vector) for vector in vectors)
@@ -0,0 +1,340 @@
+"""
+File Storage
+Streaming, size-bounded uploads into a content-addressed local store.
+
+Uploads are parsed straight from the request stream with python-multipart. The file
+part is hashed and written to a temporary file chunk by chunk; the size limit is
+enforced as bytes arrive, and the content type is sniffed from the file's magic
+bytes instead of trusting the client. Finished files are stored under their SHA-256
+(objects/ab/abcdef...), so identical uploads share one copy on disk.
+
+Profile picture thumbnails are generated on a small worker pool when Pillow is
+installed.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_STORAGE_DIR = os.getenv(
+    "UPLOAD_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+ALLOWED_TYPES = IMAGE_TYPES | {"application/pdf"}
+
+# (offset, signature, content type)
+MAGIC_BYTES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (0, b"%PDF-", "application/pdf"),
+]
+SNIFF_BYTES = 16
+
+
+class UploadError(Exception):
+    """Upload rejected; carries the HTTP status to report"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Content type from the leading bytes of a file, or None if unrecognised"""
+    for offset, signature, content_type in MAGIC_BYTES:
+        if head[offset:offset + len(signature)] == signature:
+            if content_type == "image/webp" and not head.startswith(b"RIFF"):
+                continue
+            return content_type
+    return None
+
+
+class StoredObject:
+    __slots__ = ("sha256", "size", "content_type", "path", "deduplicated")
+
+    def __init__(self, sha256: str, size: int, content_type: str, path: str, deduplicated: bool):
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        self.path = path
+        self.deduplicated = deduplicated
+
+
+class PendingObject:
+    """A file being written: hashed, size-checked and sniffed as chunks arrive"""
+
+    def __init__(self, store: "ContentAddressedStore", max_bytes: int, allowed_types: set):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.allowed_types = allowed_types
+        self.size = 0
+        self.content_type: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._head = b""
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(413, f"File too large (limit {self.max_bytes // (1024 * 1024)} MB)")
+
+        if self.content_type is None and len(self._head) < SNIFF_BYTES:
+            self._head += chunk[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._check_type()
+
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def _check_type(self):
+        self.content_type = sniff_content_type(self._head)
+        if self.content_type not in self.allowed_types:
+            raise UploadError(400, "Invalid file type")
+
+    def commit(self) -> StoredObject:
+        if self.size == 0:
+            raise UploadError(400, "Empty file")
+        if self.content_type is None:
+            self._check_type()
+        self._file.close()
+
+        digest = self._hash.hexdigest()
+        path = self.store.object_path(digest)
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.remove(self._tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        return StoredObject(digest, self.size, self.content_type, path, deduplicated)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class ContentAddressedStore:
+    """Files stored by SHA-256 under UPLOAD_STORAGE_DIR, with optional thumbnails"""
+
+    def __init__(self, root: str = UPLOAD_STORAGE_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._thumbnail_pool: Optional[ThreadPoolExecutor] = None
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def thumbnail_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "thumbnails", sha256[:2], f"{sha256}.jpg")
+
+    def exists(self, sha256: str) -> bool:
+        return len(sha256) == 64 and all(c in "0123456789abcdef" for c in sha256) and os.path.exists(self.object_path(sha256))
+
+    def begin(self, max_bytes: int = MAX_UPLOAD_BYTES, allowed_types: set = ALLOWED_TYPES) -> PendingObject:
+        return PendingObject(self, max_bytes, allowed_types)
+
+    async def receive_upload(self, request: Request, field_name: str = "file",
+                             max_bytes: int = MAX_UPLOAD_BYTES,
+                             allowed_types: set = ALLOWED_TYPES) -> Tuple[StoredObject, Optional[str]]:
+        """Stream the multipart request body into the store; returns the object and the client filename"""
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+            raise UploadError(413, f"File too large (limit {max_bytes // (1024 * 1024)} MB)")
+
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise UploadError(400, "Expected multipart/form-data")
+
+        state: Dict[str, object] = {"headers": {}, "field": b"", "value": b"", "pending": None, "filename": None, "done": False}
+
+        def on_part_begin():
+            state["headers"] = {}
+
+        def on_header_field(data, start, end):
+            state["field"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            state["value"] += data[start:end]
+
+        def on_header_end():
+            state["headers"][state["field"].lower()] = state["value"]
+            state["field"], state["value"] = b"", b""
+
+        def on_headers_finished():
+            _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+            name = disposition.get(b"name", b"").decode("utf-8", "replace")
+            filename = disposition.get(b"filename")
+            if name == field_name and filename is not None and state["pending"] is None and not state["done"]:
+                state["filename"] = os.path.basename(filename.decode("utf-8", "replace"))[:255]
+                state["pending"] = self.begin(max_bytes, allowed_types)
+
+        def on_part_data(data, start, end):
+            pending = state["pending"]
+            if pending is not None and not state["done"]:
+                pending.write(data[start:end])
+
+        def on_part_end():
+            if state["pending"] is not None:
+                state["done"] = True
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    # Parsing, hashing and disk writes happen off the event loop
+                    await asyncio.to_thread(parser.write, chunk)
+                if state["done"]:
+                    break
+            if state["pending"] is None or not state["done"]:
+                raise UploadError(400, f"Missing file field '{field_name}'")
+            stored = await asyncio.to_thread(state["pending"].commit)
+        except Exception:
+            if state["pending"] is not None:
+                state["pending"].abort()
+            raise
+        return stored, state["filename"]
+
+    # ==================== THUMBNAILS ====================
+
+    def schedule_thumbnail(self, stored: StoredObject):
+        """Generate a thumbnail in the background (no-op without Pillow or for non-images)"""
+        if stored.content_type not in IMAGE_TYPES or os.path.exists(self.thumbnail_path(stored.sha256)):
+            return
+        if self._thumbnail_pool is None:
+            self._thumbnail_pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+        future = self._thumbnail_pool.submit(make_thumbnail, stored.path, self.thumbnail_path(stored.sha256))
+        future.add_done_callback(_log_thumbnail_failure)
+
+    def shutdown(self):
+        if self._thumbnail_pool is not None:
+            self._thumbnail_pool.shutdown(wait=True)
+            self._thumbnail_pool = None
+
+
+def make_thumbnail(source: str, destination: str, size: Tuple[int, int] = THUMBNAIL_SIZE) -> bool:
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.info("Pillow not installed, skipping thumbnail generation. Run: pip install Pillow")
+        return False
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    partial = destination + ".part"
+    with Image.open(source) as image:
+        image.thumbnail(size)
+        image.convert("RGB").save(partial, "JPEG", quality=85)
+    os.replace(partial, destination)
+    return True
+
+def _log_thumbnail_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Thumbnail generation failed: {error}")
+
+
+# ==================== DOWNLOADS ====================
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """First (start, end) inclusive byte range of a "bytes=" header; None if absent or malformed"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    first, _, last = spec.split(",")[0].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and start > end:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(last))
+            end = size - 1
+    except ValueError:
+        return None
+    return start, min(end, size - 1)
+
+def content_disposition(filename: str) -> str:
+    """inline disposition with a sanitized ASCII filename= and the exact name as RFC 5987 filename*="""
+    fallback = "".join(c if 32 <= ord(c) < 127 and c not in '"\\' else "_" for c in filename)
+    return f"inline; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+def file_response(path: str, content_type: str, range_header: Optional[str] = None,
+                  filename: Optional[str] = None) -> Response:
+    """Serve a stored file, honouring a single HTTP Range request"""
+    size = os.path.getsize(path)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=31536000, immutable"}
+    if filename:
+        headers["Content-Disposition"] = content_disposition(filename)
+
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range is None:
+        return FileResponse(path, media_type=content_type, headers=headers)
+
+    start, end = byte_range
+    if start >= size:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    def iter_range():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_range(), status_code=206, media_type=content_type, headers=headers)
+
+
+# Singleton instance
+_file_store = None
+
+def get_file_store() -> ContentAddressedStore:
+    """Get or create file store singleton"""
+    global _file_store
+
+    if _file_store is None:
+        _file_store = ContentAddressedStore()
+
+    return _file_store
@@ -0,0 +1,207 @@
+"""
+Geo Index
+In-memory grid index over practitioner clinic locations for nearest-practitioner search.
+
+Locations are bucketed into lat/lng grid cells; a radius query only visits the cells
+overlapping the search bounding box and ranks candidates by haversine distance.
+The index is rebuilt from the practitioners table on startup and kept in sync by
+SQLAlchemy session events when practitioner rows are committed.
+"""
+
+import os
+import math
+import heapq
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import Practitioner
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in degrees (0.1 deg is ~11 km of latitude)
+GEO_CELL_DEGREES = float(os.getenv("GEO_CELL_DEGREES", "0.1"))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoEntry:
+    __slots__ = ("practitioner_id", "lat", "lng", "specializations", "is_verified")
+
+    def __init__(self, practitioner_id: int, lat: float, lng: float, specializations: List[str], is_verified: bool):
+        self.practitioner_id = practitioner_id
+        self.lat = lat
+        self.lng = lng
+        self.specializations = [s.lower() for s in specializations or []]
+        self.is_verified = bool(is_verified)
+
+
+class GeoIndex:
+    """Grid bucket index of practitioner locations"""
+
+    def __init__(self, cell_degrees: float = GEO_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[int, GeoEntry]] = {}
+        self._entries: Dict[int, GeoEntry] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+    def rebuild(self, db: Session):
+        """Reload the index from all practitioners with a location"""
+        rows = db.query(
+            Practitioner.id, Practitioner.latitude, Practitioner.longitude,
+            Practitioner.specializations, Practitioner.is_verified
+        ).filter(Practitioner.latitude.isnot(None), Practitioner.longitude.isnot(None)).all()
+
+        with self._lock:
+            self._cells = {}
+            self._entries = {}
+            for practitioner_id, lat, lng, specializations, is_verified in rows:
+                self._add(GeoEntry(practitioner_id, lat, lng, specializations, is_verified))
+            self.loaded = True
+
+        logger.info(f"Geo index rebuilt: {len(rows)} practitioner locations")
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            self.rebuild(db)
+
+    def upsert(self, practitioner_id: int, lat: Optional[float], lng: Optional[float],
+               specializations: Optional[List[str]] = None, is_verified: bool = False):
+        with self._lock:
+            self._remove(practitioner_id)
+            if lat is not None and lng is not None:
+                self._add(GeoEntry(practitioner_id, lat, lng, specializations, is_verified))
+
+    def remove(self, practitioner_id: int):
+        with self._lock:
+            self._remove(practitioner_id)
+
+    def _add(self, entry: GeoEntry):
+        self._entries[entry.practitioner_id] = entry
+        self._cells.setdefault(self._cell(entry.lat, entry.lng), {})[entry.practitioner_id] = entry
+
+    def _remove(self, practitioner_id: int):
+        entry = self._entries.pop(practitioner_id, None)
+        if entry is None:
+            return
+        cell = self._cell(entry.lat, entry.lng)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(practitioner_id, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def _candidate_cells(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, int]]:
+        """Grid cells overlapping the bounding box of the search circle"""
+        lat_delta = radius_km / KM_PER_DEGREE_LAT
+        min_lat, max_lat = max(-90.0, lat - lat_delta), min(90.0, lat + lat_delta)
+
+        # Longitude degrees shrink towards the poles; use the widest latitude in the box
+        widest = max(abs(min_lat), abs(max_lat))
+        cos_lat = math.cos(math.radians(min(widest, 89.9)))
+        lng_delta = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+        low_row, low_col = self._cell(min_lat, lng - lng_delta)
+        high_row, high_col = self._cell(max_lat, lng + lng_delta)
+
+        # For very large radii, scanning the occupied cells is cheaper than enumerating the box
+        box_size = (high_row - low_row + 1) * (high_col - low_col + 1)
+        if box_size > len(self._cells):
+            return [
+                (row, col) for row, col in self._cells
+                if low_row <= row <= high_row and low_col <= col <= high_col
+            ]
+        return [(row, col) for row in range(low_row, high_row + 1) for col in range(low_col, high_col + 1)]
+
+    def nearby(self, lat: float, lng: float, radius_km: float, limit: int = 20,
+               specialization: Optional[str] = None, verified_only: bool = False) -> List[Tuple[int, float]]:
+        """(practitioner_id, distance_km) within the radius, nearest first"""
+        wanted = specialization.strip().lower() if specialization else None
+        candidates = []
+
+        with self._lock:
+            for cell in self._candidate_cells(lat, lng, radius_km):
+                for entry in self._cells.get(cell, {}).values():
+                    if verified_only and not entry.is_verified:
+                        continue
+                    if wanted and not any(wanted in s for s in entry.specializations):
+                        continue
+                    distance = haversine_km(lat, lng, entry.lat, entry.lng)
+                    if distance <= radius_km:
+                        candidates.append((distance, entry.practitioner_id))
+
+        return [(practitioner_id, round(distance, 3)) for distance, practitioner_id in heapq.nsmallest(limit, candidates)]
+
+
+# ==================== SESSION EVENT HOOKS ====================
+# Practitioner location changes are applied once the transaction commits.
+
+_PENDING_KEY = "geo_index_pending"
+
+def _record_change(target: Practitioner, deleted: bool = False):
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault(_PENDING_KEY, []).append((
+        target.id, target.latitude, target.longitude, target.specializations, target.is_verified, deleted
+    ))
+
+@event.listens_for(Practitioner, "after_insert")
+def _practitioner_inserted(mapper, connection, target):
+    _record_change(target)
+
+@event.listens_for(Practitioner, "after_update")
+def _practitioner_updated(mapper, connection, target):
+    _record_change(target)
+
+@event.listens_for(Practitioner, "after_delete")
+def _practitioner_deleted(mapper, connection, target):
+    _record_change(target, deleted=True)
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or _geo_index is None or not _geo_index.loaded:
+        return
+
+    for practitioner_id, lat, lng, specializations, is_verified, deleted in pending:
+        if deleted:
+            _geo_index.remove(practitioner_id)
+        else:
+            _geo_index.upsert(practitioner_id, lat, lng, specializations, is_verified)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Singleton instance
+_geo_index = None
+
+def get_geo_index() -> GeoIndex:
+    """Get or create geo index singleton"""
+    global _geo_index
+
+    if _geo_index is None:
+        _geo_index = GeoIndex()
+
+    return _geo_index
@@ -0,0 +1,478 @@
+"""
+Load Test
+Concurrent user-journey load test for the API, in the spirit of Locust but built on
+asyncio + httpx so it can run fully offline.
+
+By default the app is driven in-process through httpx's ASGI transport against a
+scratch SQLite database filled by seed_data.py, with the AI backends replaced by the
+fakes in fake_ai_backends.py (log-normal latency, no network; FAKE_AI_* settings in
+the environment take precedence over --llm-latency and --seed). Pointing
+--base-url at a running server load-tests that server instead; accounts are then
+read from DATABASE_URL, which must hold data seeded with seed_data.py.
+
+Each virtual user repeatedly picks a journey by the role mix and runs it as one
+seeded account, with exponential think time between steps:
+    patient       login -> dashboard -> appointments -> recommendations -> practitioner chat
+                  -> AI assistant -> free slots -> book appointment -> own report
+    practitioner  login -> dashboard -> appointments -> patients -> unread counts
+                  -> treatment / monthly / feedback reports -> a patient's report
+    admin         login -> dashboard -> users -> user search -> audit log -> practitioners
+
+The summary (throughput, per-endpoint p50/p95/p99 and error rates, per-journey
+timings) is printed as JSON with sorted keys, so runs can be diffed.
+
+Usage:
+    python load_test.py --users 50 --duration 60
+    python load_test.py --users 20 --iterations 5 --mix patient=1 --llm-latency 2 -o patient.json
+    python load_test.py --base-url http://localhost:8001 --users 100 --duration 120
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from seed_data import SEED_EMAIL_DOMAIN, SEED_PASSWORD
+
+DEFAULT_MIX = "patient=70,practitioner=25,admin=5"
+LOAD_TEST_ADMIN_EMAIL = f"loadtest-admin@{SEED_EMAIL_DOMAIN}"
+
+AI_PROMPTS = [
+    "I have been feeling bloated after dinner, what should I change?",
+    "How can I balance my vata dosha during winter?",
+    "I'm 32 years old, weigh 78kg and I'm 172cm tall. Create a diet plan for weight loss.",
+    "Suggest a workout plan I can do at home three times a week.",
+    "I get headaches in the afternoon and sleep badly, any advice?",
+    "What should I eat before my Abhyanga session?",
+]
+CHAT_MESSAGES = [
+    "Hello doctor, is my next session still on?",
+    "The oil you suggested is helping, thank you.",
+    "Should I keep avoiding dairy this week?",
+]
+THERAPIES = ["Abhyanga", "Shirodhara", "Panchakarma", "Nasya", "Basti"]
+
+
+# ==================== STATS ====================
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))  # ceil(n * q / 100)
+    return sorted_values[int(rank) - 1]
+
+
+def _timings(seconds: List[float]) -> Dict[str, float]:
+    ordered = sorted(seconds)
+    if not ordered:
+        return {}
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+@dataclass
+class Series:
+    """Latencies and outcomes of one endpoint or journey"""
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        count = len(self.latencies)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            **_timings(self.latencies),
+        }
+
+
+class LoadStats:
+    """Request and journey outcomes, keyed by route template ("GET /reports/patient/{id}") and role"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, Series] = {}
+        self.journeys: Dict[str, Series] = {}
+
+    def record(self, name: str, seconds: float, status: str, ok: bool):
+        series = self.endpoints.setdefault(name, Series())
+        series.latencies.append(seconds)
+        series.statuses[status] += 1
+        series.errors += not ok
+
+    def record_journey(self, role: str, seconds: float, ok: bool):
+        series = self.journeys.setdefault(role, Series())
+        series.latencies.append(seconds)
+        series.statuses["completed" if ok else "failed"] += 1
+        series.errors += not ok
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        requests = sum(len(series.latencies) for series in self.endpoints.values())
+        errors = sum(series.errors for series in self.endpoints.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+            "latency": _timings([s for series in self.endpoints.values() for s in series.latencies]),
+            "endpoints": {name: series.summary(elapsed) for name, series in sorted(self.endpoints.items())},
+            "journeys": {role: series.summary(elapsed) for role, series in sorted(self.journeys.items())},
+        }
+
+
+# ==================== ACCOUNTS ====================
+
+@dataclass
+class Account:
+    role: str
+    email: str
+    user_id: int
+    profile_id: Optional[int] = None            # patients.id / practitioners.id
+    practitioner_user_id: Optional[int] = None  # a patient's main practitioner, for chat
+
+
+def ensure_admin(db):
+    """Seed data has no admins; add one load-test admin with the seed password"""
+    from models import User, Admin, UserRole
+    from auth import get_password_hash
+
+    if db.query(User.id).filter(User.email == LOAD_TEST_ADMIN_EMAIL).first():
+        return
+    user = User(email=LOAD_TEST_ADMIN_EMAIL, full_name="Load Test Admin", role=UserRole.ADMIN,
+                hashed_password=get_password_hash(SEED_PASSWORD), is_active=True, created_at=datetime.utcnow())
+    db.add(user)
+    db.flush()
+    db.add(Admin(user_id=user.id, admin_level="standard", permissions=["user_management", "system_monitoring"]))
+    db.commit()
+
+
+def load_accounts(limit: int) -> Dict[str, List[Account]]:
+    """Up to limit seeded accounts per role, with the ids the journeys need"""
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import User, Patient, Practitioner, Appointment, UserRole
+
+    seeded = User.email.like(f"%@{SEED_EMAIL_DOMAIN}")
+    db = SessionLocal()
+    try:
+        ensure_admin(db)
+        patients = db.query(Patient.id, User.id, User.email).join(User, User.id == Patient.user_id).filter(
+            seeded).order_by(Patient.id).limit(limit).all()
+        practitioners = db.query(Practitioner.id, User.id, User.email).join(
+            User, User.id == Practitioner.user_id).filter(seeded).order_by(Practitioner.id).limit(limit).all()
+        admins = db.query(User.id, User.email).filter(seeded, User.role == UserRole.ADMIN).limit(limit).all()
+
+        # A patient's main practitioner: the one they have the most appointments with
+        visits = db.query(Appointment.patient_id, Appointment.practitioner_id, func.count(Appointment.id)).filter(
+            Appointment.patient_id.in_([row[0] for row in patients])
+        ).group_by(Appointment.patient_id, Appointment.practitioner_id).all()
+        main_practitioner: Dict[int, Tuple[int, int]] = {}
+        for patient_id, practitioner_id, count in visits:
+            if count > main_practitioner.get(patient_id, (0, 0))[1]:
+                main_practitioner[patient_id] = (practitioner_id, count)
+        practitioner_users = dict(db.query(Practitioner.id, Practitioner.user_id).all())
+    finally:
+        db.close()
+
+    def practitioner_user(patient_id: int) -> Optional[int]:
+        practitioner_id = main_practitioner.get(patient_id, (None,))[0]
+        return practitioner_users.get(practitioner_id)
+
+    return {
+        "patient": [Account("patient", email, user_id, patient_id, practitioner_user(patient_id))
+                    for patient_id, user_id, email in patients],
+        "practitioner": [Account("practitioner", email, user_id, practitioner_id)
+                         for practitioner_id, user_id, email in practitioners],
+        "admin": [Account("admin", email, user_id) for user_id, email in admins],
+    }
+
+
+# ==================== JOURNEYS ====================
+
+class VirtualUser:
+    """One simulated client; every request is timed and recorded under its route template"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: LoadStats, rng: random.Random, think_time: float):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.headers: Dict[str, str] = {}
+        self.failed = False
+
+    async def call(self, method: str, name: str, url: str, expected: Tuple[int, ...] = (200,),
+                   **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(f"{method} {name}", time.perf_counter() - start, type(e).__name__, False)
+            self.failed = True
+            return None
+        ok = response.status_code in expected
+        self.stats.record(f"{method} {name}", time.perf_counter() - start, str(response.status_code), ok)
+        if not ok:
+            self.failed = True
+            return None
+        return response
+
+    async def think(self):
+        if self.think_time > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def login(self, account: Account) -> bool:
+        self.headers = {}
+        response = await self.call("POST", "/auth/login", "/auth/login",
+                                   json={"email": account.email, "password": SEED_PASSWORD})
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+
+async def patient_journey(user: VirtualUser, account: Account):
+    if not await user.login(account):
+        return
+    for path in ("/patient/dashboard", "/appointments", "/health/recommendations"):
+        await user.think()
+        await user.call("GET", path, path)
+
+    if account.practitioner_user_id:
+        await user.think()
+        await user.call("GET", "/chat/messages", "/chat/messages",
+                        params={"recipient_id": account.practitioner_user_id, "limit": 50})
+        await user.call("POST", "/chat/send", "/chat/send", json={
+            "recipient_id": account.practitioner_user_id, "recipient_type": "practitioner",
+            "content": user.rng.choice(CHAT_MESSAGES)
+        })
+
+    conversation_id = None
+    for _ in range(user.rng.randint(1, 2)):
+        await user.think()
+        response = await user.call("POST", "/chat/ai-assistant", "/chat/ai-assistant", json={
+            "message": user.rng.choice(AI_PROMPTS), "conversation_id": conversation_id
+        })
+        if response is not None:
+            conversation_id = response.json()["conversation_id"]
+
+    await user.think()
+    response = await user.call("GET", "/availability/slots", "/availability/slots", params={"days": 14, "limit": 10})
+    slots = response.json() if response is not None else []
+    if slots:
+        slot = user.rng.choice(slots)
+        # Losing a race for the slot is a normal outcome under load, not an error
+        await user.call("POST", "/appointments", "/appointments", expected=(200, 400), json={
+            "patient_id": account.profile_id, "practitioner_id": slot["practitioner_id"],
+            "therapy_type": user.rng.choice(THERAPIES), "scheduled_datetime": slot["start"],
+            "duration_minutes": 60
+        })
+
+    await user.think()
+    await user.call("GET", "/reports/patient/{id}", f"/reports/patient/{account.profile_id}")
+
+
+async def practitioner_journey(user: VirtualUser, account: Account):
+    if not await user.login(account):
+        return
+    patients = []
+    for path in ("/practitioner/dashboard", "/appointments", "/practitioner/patients", "/chat/unread-counts",
+                 "/reports/treatments", "/reports/monthly-summary", "/reports/feedback"):
+        await user.think()
+        response = await user.call("GET", path, path)
+        if path == "/practitioner/patients" and response is not None:
+            patients = response.json()
+    if patients:
+        await user.think()
+        await user.call("GET", "/reports/patient/{id}", f"/reports/patient/{user.rng.choice(patients)['id']}")
+
+
+async def admin_journey(user: VirtualUser, account: Account):
+    if not await user.login(account):
+        return
+    await user.think()
+    await user.call("GET", "/admin/dashboard", "/admin/dashboard")
+    await user.think()
+    await user.call("GET", "/admin/users", "/admin/users", params={"limit": 100})
+    await user.think()
+    await user.call("GET", "/admin/users", "/admin/users",
+                    params={"role": "practitioner", "search": user.rng.choice("aeiou"), "limit": 50})
+    await user.think()
+    await user.call("GET", "/admin/audit-logs", "/admin/audit-logs", params={"limit": 50})
+    await user.think()
+    await user.call("GET", "/practitioners", "/practitioners")
+
+
+JOURNEYS = {
+    "patient": patient_journey,
+    "practitioner": practitioner_journey,
+    "admin": admin_journey,
+}
+
+
+# ==================== RUNNER ====================
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        role, _, weight = part.partition("=")
+        if role not in JOURNEYS:
+            raise ValueError(f"Unknown role '{role}' in mix. Choose from: {', '.join(JOURNEYS)}")
+        mix[role] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix needs at least one role with a positive weight")
+    return mix
+
+
+async def run_load(client: httpx.AsyncClient, accounts: Dict[str, List[Account]], users: int,
+                   mix: Dict[str, float], duration: Optional[float] = None, iterations: Optional[int] = None,
+                   think_time: float = 0.2, ramp_up: float = 0.0, seed: int = 42) -> Dict[str, Any]:
+    """Run users concurrent journey loops until duration elapses or each has done iterations journeys"""
+    roles = [role for role in mix if accounts.get(role)]
+    if not roles:
+        raise ValueError("No seeded accounts for the requested roles; run seed_data.py first")
+    weights = [mix[role] for role in roles]
+    stats = LoadStats()
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def virtual_user(index: int):
+        rng = random.Random(seed * 100003 + index)
+        user = VirtualUser(client, stats, rng, think_time)
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / users)
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or time.perf_counter() < deadline):
+            role = rng.choices(roles, weights)[0]
+            account = rng.choice(accounts[role])
+            user.failed = False
+            journey_started = time.perf_counter()
+            await JOURNEYS[role](user, account)
+            stats.record_journey(role, time.perf_counter() - journey_started, not user.failed)
+            done += 1
+
+    await asyncio.gather(*(virtual_user(index) for index in range(users)))
+    return stats.summary(time.perf_counter() - started)
+
+
+async def run_in_process(args, mix: Dict[str, float]) -> Dict[str, Any]:
+    import main as app_module
+    from seed_data import seed
+    from fake_ai_backends import fake_backend_stats
+
+    if args.seed_patients:
+        today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        seed(args.seed_patients, args.seed_practitioners, seed_value=args.seed, anchor=today,
+             verbose=not args.quiet)
+    accounts = load_accounts(args.accounts)
+
+    app = app_module.app
+    # httpx's ASGI transport does not send lifespan events
+    await app.router.startup()
+    try:
+        # Unhandled server errors become 500 responses, as they would behind uvicorn
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            result = await run_load(client, accounts, args.users, mix, args.duration, args.iterations,
+                                    args.think_time, args.ramp_up, args.seed)
+    finally:
+        await app.router.shutdown()
+    result["fake_ai"] = fake_backend_stats()
+    return result
+
+
+async def run_remote(args, mix: Dict[str, float]) -> Dict[str, Any]:
+    accounts = load_accounts(args.accounts)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(client, accounts, args.users, mix, args.duration, args.iterations,
+                              args.think_time, args.ramp_up, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent user-journey load test")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, help="seconds to run (default 30 unless --iterations)")
+    parser.add_argument("--iterations", type=int, help="journeys per virtual user")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"journey weights by role (default {DEFAULT_MIX})")
+    parser.add_argument("--think-time", type=float, default=0.2, help="mean seconds between steps, exponential")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which users are started")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--accounts", type=int, default=500, help="seeded accounts used per role")
+    parser.add_argument("--base-url", help="load-test a running server instead of the in-process app")
+    parser.add_argument("--database-url", help="in-process database (default: a scratch SQLite file)")
+    parser.add_argument("--seed-patients", type=int, default=2000,
+                        help="patients to seed into the in-process database first (0 to skip)")
+    parser.add_argument("--seed-practitioners", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="median fake AI latency in seconds")
+    parser.add_argument("-o", "--output", help="also write the JSON summary to this file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no seeding progress on stderr")
+    args = parser.parse_args()
+
+    if args.users < 1:
+        parser.error("--users must be at least 1")
+    if args.duration is None and args.iterations is None:
+        args.duration = 30.0
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.base_url:
+        result = asyncio.run(run_remote(args, mix))
+    else:
+        # Configure the in-process app before any backend module is imported
+        scratch_dir = tempfile.mkdtemp(prefix="load_test_")
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(scratch_dir, 'load.db')}"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("LOG_FILE", os.path.join(scratch_dir, "backend.log"))
+        # Empty keys keep .env from enabling real Gemini calls (load_dotenv does not override)
+        os.environ["GEMINI_API_KEY"] = os.environ["GOOGLE_API_KEY"] = ""
+        os.environ.setdefault("FAKE_AI_BACKENDS", "all")
+        os.environ.setdefault("FAKE_AI_LATENCY", f"lognormal:{args.llm_latency},0.5")
+        # --llm-latency is the whole call, not just the time to first token
+        os.environ.setdefault("FAKE_AI_TOKENS_PER_SEC", "0")
+        os.environ.setdefault("FAKE_AI_SEED", str(args.seed))
+        result = asyncio.run(run_in_process(args, mix))
+
+    result["config"] = {
+        "target": args.base_url or "in-process",
+        "users": args.users,
+        "duration": args.duration,
+        "iterations": args.iterations,
+        "mix": mix,
+        "think_time": args.think_time,
+        "ramp_up": args.ramp_up,
+        "seed": args.seed,
+        "llm_latency": None if args.base_url else args.llm_latency,
+    }
+    output = json.dumps(result, indent=2, sort_keys=True)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    # Add backend to path
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
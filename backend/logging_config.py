@@ -0,0 +1,224 @@
+"""
+Logging Configuration
+Central, non-blocking logging setup for the backend.
+
+Every logger writes to a QueueHandler; a QueueListener thread formats the records
+and does the actual console/file I/O, so request handlers never block on disk.
+Records are emitted as JSON lines (LOG_FORMAT=text for plain lines) and carry the
+id of the request that produced them. The log file rotates by size and by age.
+
+Environment:
+    LOG_LEVEL                 root level (default INFO)
+    LOG_LEVELS                per-logger levels, e.g. "auth=DEBUG,sqlalchemy.engine=WARNING"
+    LOG_FORMAT                json | text (default json)
+    LOG_FILE                  log file path (default backend/logs/backend.log, "" to disable)
+    LOG_MAX_BYTES             rotate when the file exceeds this size (default 10 MB)
+    LOG_ROTATE_HOURS          rotate when the file is older than this (default 24)
+    LOG_BACKUP_COUNT          rotated files to keep (default 7)
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import logging
+import contextvars
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "backend.log"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+
+REQUEST_ID_HEADER = "x-request-id"
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id (runs in the calling thread)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if record.levelno >= logging.WARNING:
+            entry["location"] = f"{record.module}:{record.funcName}:{record.lineno}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps records structured: the message is rendered and the
+    traceback captured as text in the calling thread, but formatting is left to
+    the listener's handlers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file exceeds maxBytes or is older than interval_seconds"""
+
+    def __init__(self, filename: str, maxBytes: int, backupCount: int, interval_seconds: float):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding="utf-8")
+        self.interval_seconds = interval_seconds
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self) -> float:
+        opened = os.path.getmtime(self.baseFilename) if os.path.exists(self.baseFilename) else time.time()
+        return min(opened, time.time()) + self.interval_seconds
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if self.interval_seconds > 0 and time.time() >= self.rollover_at and os.path.getsize(self.baseFilename) > 0:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval_seconds
+
+
+def _parse_levels(spec: str):
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            yield name.strip(), level.strip().upper()
+
+
+def configure_logging(force: bool = False):
+    """Install the queue-based handlers on the root logger (idempotent)"""
+    global _listener
+    if _listener is not None and not force:
+        return
+    if _listener is not None:
+        _listener.stop()
+
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+    handlers = []
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+    handlers.append(console)
+
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        file_handler = SizeAndTimeRotatingFileHandler(
+            LOG_FILE, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_HOURS * 3600
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    # Replace handlers installed by basicConfig() calls in imported modules
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    # Disabled levels are rejected by isEnabledFor() before any formatting happens
+    for name, level in _parse_levels(LOG_LEVELS):
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware assigning each request an id (X-Request-ID is reused if sent) and echoing it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers") or []:
+            if key == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.encode(), request_id.encode())]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
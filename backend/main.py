@@ -1,57 +1,87 @@
 
 import os
-from datetime import datetime, timedelta
+import json
+from datetime import date, datetime, timedelta
 from typing import Optional, List
 import logging
 
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Request, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, StreamingResponse, PlainTextResponse
 
 # ... (omitted)
 
 
 from pydantic import BaseModel
 import uvicorn
-from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, text, and_, or_
 import requests
 
-from database import engine, SessionLocal, get_db
-from models import User, Patient, Practitioner, Admin, Appointment, TherapySession, Feedback, UserRole, Base, Notification, SystemSettings, AuditLog, PatientHealthLog, Symptom, AIConversation, ChatMessage, Reminder
+from database import engine, SessionLocal, get_db, ensure_indexes, ensure_columns
+from models import User, Patient, Practitioner, Admin, Appointment, TherapySession, Feedback, UserRole, Base, Notification, SystemSettings, FileUpload, AuditLog, PatientHealthLog, Symptom, AIConversation, ChatMessage, Reminder
 from schemas import (
     UserCreate, UserResponse, TokenResponse, UserLogin,
     PatientCreate, PatientResponse, PatientUpdate,
     PractitionerCreate, PractitionerResponse, PractitionerUpdate,
-    AdminCreate, AdminResponse, AdminUserResponse, AuditLogResponse, 
+    AdminCreate, AdminResponse, AdminUserResponse, AuditLogResponse, AuditLogPage, AuditPipelineStats,
+    RollupConsistencyReport,
     SystemSettingsResponse, SystemSettingsUpdate, UserHistoryResponse, ClinicResponse,
-    AppointmentCreate, AppointmentResponse, AppointmentUpdate,
+    NearbyPractitionerResponse,
+    AppointmentCreate, AppointmentResponse, AppointmentUpdate, AppointmentConflictCheck, AvailableSlot,
     TherapySessionCreate, TherapySessionResponse, TherapySessionUpdate,
     FeedbackCreate, FeedbackResponse,
     AIAssistantRequest, AIAssistantResponse,
     DashboardStats, PatientListItem, UserUpdate,
-    NotificationResponse, TherapyTemplateResponse, HealthLogCreate, HealthLogResponse,
+    NotificationResponse, NotificationMarkRead, NotificationReadResult, NotificationUnreadCount,
+    TherapyTemplateResponse, HealthLogCreate, HealthLogResponse,
     SymptomCreate, SymptomResponse, AIHealthRequest, AIHealthResponse,
-    HealthRecommendationsResponse, ChatMessageCreate, ChatMessageResponse,
+    HealthRecommendationsResponse, ChatMessageCreate, ChatMessageResponse, ChatUnreadCounts, FileUploadResponse,
     PractitionerAvailability, AIChatRequest, AIChatResponse,
     PatientReportResponse, ReportHealthStats,
     TreatmentAnalyticsResponse, MonthlySummaryResponse, FeedbackReportResponse,
-    TreatmentTypeStat, FeedbackSummary, ReminderCreate, ReminderResponse, AgentAction, AIChatRequest, AIChatResponse
+    TreatmentTypeStat, FeedbackSummary, ReminderCreate, ReminderResponse, ReminderSchedulerMetrics, AgentAction, AIChatRequest, AIChatResponse,
+    BatchPlanRequest
 )
-from enhanced_health_assistant import health_assistant
+from enhanced_health_assistant import health_assistant, render_plan_markdown
 from auth import (
     create_access_token, verify_token, get_password_hash, verify_password,
-    get_current_user, get_current_patient, get_current_practitioner, get_current_admin
+    get_current_user, get_current_patient, get_current_practitioner, get_current_admin,
+    get_user_from_token
 )
 import subscription_routes
+import plan_batch_service
+from scheduling_engine import get_scheduling_engine, normalize_datetime
+from availability_engine import get_availability_engine
+from geo_index import get_geo_index
+from chat_realtime import get_connection_manager, message_event, read_receipt_event
+from notification_service import get_notification_service, active_filter as active_notification_filter
+from audit_log import AuditContextMiddleware, get_audit_writer, record_audit, record_audit_async
+from audit_storage import get_audit_storage
+from file_storage import get_file_store, file_response, UploadError, IMAGE_TYPES, ALLOWED_TYPES
+from reminder_scheduler import get_reminder_scheduler, format_reminder_time, is_valid_timezone
+from report_queries import (
+    treatment_analytics, appointment_summary, appointment_summary_from_rollups, appointment_total,
+    appointment_total_from_rollups, feedback_summary, feedback_summary_from_rollups
+)
+from report_rollups import get_report_rollups, ROLLUPS_ENABLED
+from logging_config import configure_logging, shutdown_logging, RequestIdMiddleware
+from request_metrics import RequestMetricsMiddleware, get_metrics_registry, instrument_engine, track_ai_call
+from response_cache import CachedResponse, cached_response, get_response_cache
+from fast_json import FastJSONResponse, list_response, model_columns
+from data_export import ExportError, FORMATS as EXPORT_FORMATS, export_filename, stream_export, validate_export
+from fake_ai_backends import fake_backend_enabled, fake_gemini_rest_post
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+ensure_columns(Base.metadata)
+ensure_indexes(Base.metadata)
+instrument_engine(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -79,9 +109,72 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Client IP / user agent for audit rows
+app.add_middleware(AuditContextMiddleware)
+# Per-route latency / DB / AI metrics (inside the request id so slow-request logs carry it)
+app.add_middleware(RequestMetricsMiddleware, routes_app=app)
+app.add_middleware(RequestIdMiddleware)
+
 # Security
 security = HTTPBearer()
 
+
+@app.on_event("startup")
+async def load_scheduling_index():
+    """Build the appointment interval and practitioner location indexes from the database"""
+    db = SessionLocal()
+    try:
+        get_scheduling_engine().rebuild(db)
+        get_geo_index().rebuild(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def warm_plan_cache():
+    """Pre-generate plans for common profile buckets when PLAN_CACHE_PREWARM is set"""
+    if os.getenv("PLAN_CACHE_PREWARM", "false").lower() in ("1", "true", "yes"):
+        health_assistant.warm_plan_cache()
+
+@app.on_event("startup")
+async def start_audit_writer():
+    """Start the background audit log writer and partition maintenance"""
+    get_audit_writer().start()
+    get_audit_storage().start()
+
+@app.on_event("startup")
+async def start_report_rollups():
+    """Bring the daily report rollups up to date and keep catching up in the background"""
+    get_report_rollups().start()
+
+@app.on_event("startup")
+async def start_notification_sweeper():
+    """Periodically purge notifications past their expiry"""
+    get_notification_service().start_sweeper(SessionLocal)
+
+@app.on_event("startup")
+async def start_reminder_scheduler():
+    """Load active reminders and start firing them"""
+    scheduler = get_reminder_scheduler()
+    db = SessionLocal()
+    try:
+        scheduler.rebuild(db)
+    finally:
+        db.close()
+    scheduler.start(SessionLocal)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background workers on shutdown"""
+    plan_batch_service.shutdown_process_pool()
+    await get_connection_manager().stop()
+    await get_notification_service().stop_sweeper()
+    await get_reminder_scheduler().stop()
+    get_audit_writer().stop()
+    get_file_store().shutdown()
+    await get_audit_storage().stop()
+    await get_report_rollups().stop()
+    shutdown_logging()
+
 # RAG Service Configuration
 RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL", "http://localhost:8000")
 
@@ -98,6 +191,18 @@ async def root():
         "timestamp": datetime.utcnow()
     }
 
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics; requires 'Authorization: Bearer <METRICS_TOKEN>' when METRICS_TOKEN is set"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(
+        get_metrics_registry().render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 
 @app.get("/health")
 async def health_check():
@@ -195,13 +300,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         db.rollback()
-        print(f"\n{'='*60}")
-        print(f"REGISTRATION ERROR:")
-        print(f"Error Type: {type(e).__name__}")
-        print(f"Error Message: {str(e)}")
-        print(f"{'='*60}\n")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Registration failed: {type(e).__name__}")
         raise HTTPException(
             status_code=500,
             detail=f"Registration failed: {str(e)}"
@@ -214,6 +313,11 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_credentials.email).first()
     
     if not user or not verify_password(user_credentials.password, user.hashed_password):
+        record_audit(
+            "login_failed", "user",
+            resource_id=user.id if user else None,
+            details={"email": user_credentials.email}
+        )
         raise HTTPException(
             status_code=401,
             detail="Invalid email or password"
@@ -228,6 +332,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     # Update last login
     user.last_login = datetime.utcnow()
     db.commit()
+    record_audit("login", "user", resource_id=user.id, user_id=user.id)
     
     # Create access token (convert enum to string for serialization)
     access_token = create_access_token(data={"sub": user.email, "role": user.role.value})
@@ -287,11 +392,12 @@ async def ai_assistant(
     """AI Assistant powered by RAG service"""
     try:
         # Forward request to RAG service
-        response = requests.post(
-            f"{RAG_SERVICE_URL}/ask",
-            json={"query": request.query, "top_k": request.top_k or 5},
-            timeout=30
-        )
+        with track_ai_call("rag"):
+            response = requests.post(
+                f"{RAG_SERVICE_URL}/ask",
+                json={"query": request.query, "top_k": request.top_k or 5},
+                timeout=30
+            )
         
         if response.status_code == 200:
             rag_data = response.json()
@@ -373,7 +479,7 @@ async def confirm_agent_actions(
                     title=data["title"],
                     message=data.get("message"),
                     frequency=data["frequency"],
-                    time=t.strip(),
+                    time=format_reminder_time(t) or t.strip(),
                     is_active=True
                 )
                 db.add(reminder)
@@ -433,31 +539,32 @@ async def create_appointment(
     if not patient or not practitioner:
         raise HTTPException(status_code=404, detail="Patient or practitioner not found")
     
-    # Check for scheduling conflicts
-    existing_appointment = db.query(Appointment).filter(
-        Appointment.practitioner_id == appointment_data.practitioner_id,
-        Appointment.scheduled_datetime == appointment_data.scheduled_datetime,
-        Appointment.status.in_(["scheduled", "confirmed"])
-    ).first()
-    
-    if existing_appointment:
-        raise HTTPException(status_code=400, detail="Time slot already booked")
-    
-    # Create appointment
-    appointment = Appointment(
-        patient_id=appointment_data.patient_id,
-        practitioner_id=appointment_data.practitioner_id,
-        therapy_type=appointment_data.therapy_type,
-        scheduled_datetime=appointment_data.scheduled_datetime,
-        duration_minutes=appointment_data.duration_minutes,
-        status="scheduled",
-        notes=appointment_data.notes,
-        created_at=datetime.utcnow(),
-        created_by=current_user.id
-    )
+    scheduling = get_scheduling_engine()
+    scheduling.ensure_loaded(db)
+    scheduled_datetime = normalize_datetime(appointment_data.scheduled_datetime)
+    
+    # Check for overlapping appointments and book under the practitioner's lock,
+    # so two concurrent requests cannot both take the same slot
+    with scheduling.practitioner_lock(practitioner.id):
+        if scheduling.find_conflicts(practitioner.id, scheduled_datetime, appointment_data.duration_minutes):
+            raise HTTPException(status_code=400, detail="Time slot already booked")
+        
+        # Create appointment
+        appointment = Appointment(
+            patient_id=appointment_data.patient_id,
+            practitioner_id=appointment_data.practitioner_id,
+            therapy_type=appointment_data.therapy_type,
+            scheduled_datetime=scheduled_datetime,
+            duration_minutes=appointment_data.duration_minutes,
+            status="scheduled",
+            notes=appointment_data.notes,
+            created_at=datetime.utcnow(),
+            created_by=current_user.id
+        )
+        
+        db.add(appointment)
+        db.commit()
     
-    db.add(appointment)
-    db.commit()
     db.refresh(appointment)
     
     return AppointmentResponse.from_orm(appointment)
@@ -471,14 +578,15 @@ async def get_appointments(
     limit: int = 50
 ):
     """Get appointments for current user"""
-    query = db.query(Appointment)
+    # Only the response columns; rows are validated and dumped as one list
+    query = db.query(Appointment).with_entities(*model_columns(Appointment, AppointmentResponse))
     
-    if current_user.role == "patient":
+    if current_user.role == UserRole.PATIENT:
         patient = db.query(Patient).filter(Patient.user_id == current_user.id).first()
         if patient:
             query = query.filter(Appointment.patient_id == patient.id)
     
-    elif current_user.role == "practitioner":
+    elif current_user.role == UserRole.PRACTITIONER:
         practitioner = db.query(Practitioner).filter(Practitioner.user_id == current_user.id).first()
         if practitioner:
             query = query.filter(Appointment.practitioner_id == practitioner.id)
@@ -488,16 +596,62 @@ async def get_appointments(
     
     appointments = query.order_by(Appointment.scheduled_datetime.desc()).limit(limit).all()
     
-    return [AppointmentResponse.from_orm(appointment) for appointment in appointments]
+    return list_response(AppointmentResponse, appointments)
 
 
-# ==================== PATIENT DASHBOARD ====================
-@app.get("/patient/dashboard", response_model=DashboardStats)
-async def get_patient_dashboard(
-    current_patient: Patient = Depends(get_current_patient),
+@app.get("/appointments/conflicts", response_model=AppointmentConflictCheck)
+async def check_appointment_conflicts(
+    practitioner_id: int,
+    start: datetime,
+    duration_minutes: int = 60,
+    exclude_appointment_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get patient dashboard statistics"""
+    """Check whether a proposed slot overlaps the practitioner's active appointments"""
+    scheduling = get_scheduling_engine()
+    scheduling.ensure_loaded(db)
+    
+    start = normalize_datetime(start)
+    conflicts = scheduling.find_conflicts(practitioner_id, start, duration_minutes, exclude_appointment_id)
+    
+    return AppointmentConflictCheck(
+        practitioner_id=practitioner_id,
+        start=start,
+        end=start + timedelta(minutes=duration_minutes),
+        available=not conflicts,
+        conflicts=conflicts
+    )
+
+
+@app.get("/availability/slots", response_model=List[AvailableSlot])
+async def search_available_slots(
+    start: Optional[datetime] = None,
+    days: int = 7,
+    duration_minutes: int = 60,
+    limit: int = 10,
+    specialization: Optional[str] = None,
+    max_fee: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Earliest free slots across practitioners, optionally filtered by specialization and fee"""
+    if not 1 <= days <= 28 or not 1 <= limit <= 100 or duration_minutes < 1:
+        raise HTTPException(status_code=400, detail="days must be 1-28, limit 1-100 and duration positive")
+    
+    return get_availability_engine().search(
+        db,
+        window_start=start or datetime.utcnow(),
+        days=days,
+        duration_minutes=duration_minutes,
+        limit=limit,
+        specialization=specialization,
+        max_fee=max_fee
+    )
+
+
+# ==================== PATIENT DASHBOARD ====================
+def _patient_dashboard_stats(current_patient: Patient, db: Session) -> DashboardStats:
     now = datetime.utcnow()
     
     # Get appointments statistics
@@ -530,14 +684,19 @@ async def get_patient_dashboard(
         avg_session_duration=75.5  # Mock data
     )
 
-
-# ==================== PRACTITIONER DASHBOARD ====================
-@app.get("/practitioner/dashboard", response_model=DashboardStats)
-async def get_practitioner_dashboard(
-    current_practitioner: Practitioner = Depends(get_current_practitioner),
+@app.get("/patient/dashboard", response_model=DashboardStats)
+async def get_patient_dashboard(
+    cached: CachedResponse = Depends(cached_response(
+        "patient_dashboard", ("appointments", "therapy_sessions", "patients"))),
+    current_patient: Patient = Depends(get_current_patient),
     db: Session = Depends(get_db)
 ):
-    """Get practitioner dashboard statistics"""
+    """Get patient dashboard statistics"""
+    return await cached.respond(DashboardStats, lambda: _patient_dashboard_stats(current_patient, db))
+
+
+# ==================== PRACTITIONER DASHBOARD ====================
+def _practitioner_dashboard_stats(current_practitioner: Practitioner, db: Session) -> DashboardStats:
     now = datetime.utcnow()
     today_start = datetime(now.year, now.month, now.day)
     today_end = today_start + timedelta(days=1)
@@ -584,13 +743,24 @@ async def get_practitioner_dashboard(
         avg_session_rating=current_practitioner.rating or 0.0
     )
 
+@app.get("/practitioner/dashboard", response_model=DashboardStats)
+async def get_practitioner_dashboard(
+    cached: CachedResponse = Depends(cached_response(
+        "practitioner_dashboard", ("appointments", "therapy_sessions", "practitioners", "feedback"))),
+    current_practitioner: Practitioner = Depends(get_current_practitioner),
+    db: Session = Depends(get_db)
+):
+    """Get practitioner dashboard statistics"""
+    return await cached.respond(DashboardStats, lambda: _practitioner_dashboard_stats(current_practitioner, db))
+
 @app.get("/practitioners", response_model=List[PractitionerResponse])
 async def get_all_practitioners(
+    cached: CachedResponse = Depends(cached_response(
+        "practitioners", ("practitioners", "users", "feedback"), per_user=False)),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user) 
 ):
     """Get all practitioners (for map/directory)"""
-    practitioners = db.query(Practitioner).all()
     # Ensure user data is joined/available? 
     # Pydantic schema expects 'user' field? PractitionerResponse definition has 'user_id' but not nested 'user' object unless specified.
     # Check schemas.py line 145. It has 'user_id'. It does NOT have nested User.
@@ -602,18 +772,21 @@ async def get_all_practitioners(
     # I should update PractitionerResponse in schemas.py to include 'full_name' or nested 'user'.
     # I'll assume current schema is sufficient or I'll fix it if name is missing. 
     # Actually, let's just return them. Logic for name might be needed.
-    return practitioners
+    return await cached.respond(List[PractitionerResponse],
+                                lambda: db.query(Practitioner).options(joinedload(Practitioner.user)).all())
     
 
 
 
 @app.get("/practitioner/profile", response_model=PractitionerResponse)
 async def get_practitioner_profile_data(
+    cached: CachedResponse = Depends(cached_response(
+        "practitioner_profile", ("practitioners", "users", "feedback"))),
     current_practitioner: Practitioner = Depends(get_current_practitioner),
     db: Session = Depends(get_db)
 ):
     """Get current practitioner's profile"""
-    return current_practitioner
+    return await cached.respond(PractitionerResponse, lambda: current_practitioner)
 
 @app.patch("/practitioner/profile", response_model=PractitionerResponse)
 async def update_practitioner_profile(
@@ -625,7 +798,7 @@ async def update_practitioner_profile(
     try:
         from fastapi.encoders import jsonable_encoder
         update_data = profile_update.dict(exclude_unset=True)
-        print(f"DEBUG: Updating profile with: {update_data}")
+        logger.debug("Updating practitioner %s profile fields: %s", current_practitioner.id, list(update_data))
         
         # Ensure availability_schedule is properly encoded for JSON column
         if "availability_schedule" in update_data:
@@ -637,11 +810,12 @@ async def update_practitioner_profile(
         db.add(current_practitioner) # Ensure attached
         db.commit()
         db.refresh(current_practitioner)
+        
+        if "availability_schedule" in update_data:
+            get_availability_engine().invalidate(current_practitioner.id)
         return current_practitioner
     except Exception as e:
-        print(f"ERROR updating profile: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Practitioner profile update failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/practitioner/patients", response_model=List[PatientListItem])
@@ -650,6 +824,7 @@ async def get_my_patients(
     db: Session = Depends(get_db)
 ):
     """Get list of patients for current practitioner"""
+    record_audit("list_patients", "practitioner", resource_id=current_practitioner.id, user_id=current_practitioner.user_id)
     # Find patients with appointments with this practitioner
     # Subquery or distinct join
     patients = db.query(Patient).join(Appointment).filter(
@@ -701,18 +876,58 @@ async def get_my_patients(
     return patient_list
 
 
-# ==================== ADMIN DASHBOARD ====================
-@app.get("/admin/dashboard", response_model=DashboardStats)
-async def get_admin_dashboard(
-    current_admin: Admin = Depends(get_current_admin),
+@app.post("/practitioner/plans/batch")
+async def generate_batch_plans(
+    request: BatchPlanRequest,
+    current_practitioner: Practitioner = Depends(get_current_practitioner),
     db: Session = Depends(get_db)
 ):
-    """Get admin dashboard statistics"""
+    """Generate multi-day diet/workout plans for the caseload, streamed as NDJSON"""
+    invalid_types = [t for t in request.plan_types if t not in plan_batch_service.SUPPORTED_PLAN_TYPES]
+    if invalid_types or not request.plan_types:
+        raise HTTPException(status_code=400, detail=f"Unsupported plan types: {invalid_types}")
+    
+    # Caseload = patients with at least one appointment with this practitioner
+    query = db.query(Patient).join(Appointment).filter(
+        Appointment.practitioner_id == current_practitioner.id
+    )
+    if request.patient_ids:
+        query = query.filter(Patient.id.in_(request.patient_ids))
+    patients = query.distinct().all()
+    
+    # Latest health log per patient in a single query
+    latest_logs = {}
+    if patients:
+        latest_dates = db.query(
+            PatientHealthLog.patient_id,
+            func.max(PatientHealthLog.date).label("latest_date")
+        ).filter(
+            PatientHealthLog.patient_id.in_([p.id for p in patients])
+        ).group_by(PatientHealthLog.patient_id).subquery()
+        
+        logs = db.query(PatientHealthLog).join(
+            latest_dates,
+            (PatientHealthLog.patient_id == latest_dates.c.patient_id) &
+            (PatientHealthLog.date == latest_dates.c.latest_date)
+        ).all()
+        latest_logs = {log.patient_id: log for log in logs}
+    
+    jobs = [plan_batch_service.build_patient_job(p, latest_logs.get(p.id)) for p in patients]
+    
+    return StreamingResponse(
+        plan_batch_service.stream_batch_ndjson(jobs, request.days, request.plan_types),
+        media_type="application/x-ndjson"
+    )
+
+
+# ==================== ADMIN DASHBOARD ====================
+def _admin_dashboard_stats(db: Session) -> DashboardStats:
     # System-wide statistics
-    total_users = db.query(User).count()
-    total_practitioners = db.query(User).filter(User.role == UserRole.PRACTITIONER).count()
-    total_patients = db.query(User).filter(User.role == UserRole.PATIENT).count()
-    total_appointments = db.query(Appointment).count()
+    users_by_role = dict(db.query(User.role, func.count(User.id)).group_by(User.role).all())
+    total_users = sum(users_by_role.values())
+    total_practitioners = users_by_role.get(UserRole.PRACTITIONER, 0)
+    total_patients = users_by_role.get(UserRole.PATIENT, 0)
+    total_appointments = appointment_total_from_rollups(db) if ROLLUPS_ENABLED else appointment_total(db)
     
     # Recent activity
     recent_registrations = db.query(User).filter(
@@ -728,6 +943,21 @@ async def get_admin_dashboard(
         system_health=98.5  # Mock data
     )
 
+@app.get("/admin/dashboard", response_model=DashboardStats)
+async def get_admin_dashboard(
+    cached: CachedResponse = Depends(cached_response(
+        "admin_dashboard", ("users", "appointments"), per_user=False)),
+    current_admin: Admin = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get admin dashboard statistics"""
+    return await cached.respond(DashboardStats, lambda: _admin_dashboard_stats(db))
+
+@app.get("/admin/response-cache")
+async def get_response_cache_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Response cache size, hit/304 counters and current resource versions"""
+    return get_response_cache().stats()
+
 @app.get("/admin/users", response_model=List[AdminUserResponse])
 async def get_all_users(
     skip: int = 0,
@@ -739,7 +969,7 @@ async def get_all_users(
 ):
     """Get all users with optional filtering"""
     try:
-        query = db.query(User)
+        query = db.query(User).with_entities(*model_columns(User, AdminUserResponse))
         
         if role:
             target_role = None
@@ -758,10 +988,10 @@ async def get_all_users(
             )
             
         users = query.offset(skip).limit(limit).all()
-        return users
+        return list_response(AdminUserResponse, users)
     except Exception as e:
         # Fallback to raw SQL if ORM fails (e.g., enum mismatch)
-        print(f"ORM query failed, using raw SQL fallback: {e}")
+        logger.warning(f"ORM query failed, using raw SQL fallback: {e}")
         try:
             sql = text("""
                 SELECT id, full_name, email, role, phone, is_active, is_verified, created_at, last_login
@@ -785,7 +1015,7 @@ async def get_all_users(
                 })
             return users_list
         except Exception as e2:
-            print(f"Raw SQL fallback also failed: {e2}")
+            logger.error(f"Raw SQL fallback also failed: {e2}")
             raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 @app.get("/admin/users/{user_id}", response_model=AdminUserResponse)
@@ -798,6 +1028,7 @@ async def get_user_details(
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    record_audit("view_user", "user", resource_id=user.id, user_id=current_admin.user_id)
     return user
 
 @app.put("/admin/users/{user_id}")
@@ -816,17 +1047,16 @@ async def admin_update_user(
     if user_update.email: user.email = user_update.email
     if user_update.phone: user.phone = user_update.phone
     
+    db.commit()
+    
     # Log action
-    audit = AuditLog(
-        user_id=current_admin.user_id,
-        action="update_user",
-        resource_type="user",
+    await record_audit_async(
+        "update_user", "user",
         resource_id=user.id,
-        details={"updater": current_admin.user.email}
+        user_id=current_admin.user_id,
+        details={"updater": current_admin.user.email},
+        critical=True
     )
-    db.add(audit)
-    
-    db.commit()
     return {"message": "User updated successfully"}
 
 @app.delete("/admin/users/{user_id}")
@@ -845,17 +1075,16 @@ async def admin_delete_user(
         
     user.is_active = False
     
+    db.commit()
+    
     # Log action
-    audit = AuditLog(
-        user_id=current_admin.user_id,
-        action="deactivate_user",
-        resource_type="user",
+    await record_audit_async(
+        "deactivate_user", "user",
         resource_id=user.id,
-        details={"reason": "Admin deactivation"}
+        user_id=current_admin.user_id,
+        details={"reason": "Admin deactivation"},
+        critical=True
     )
-    db.add(audit)
-    
-    db.commit()
     return {"message": "User deactivated successfully"}
 
 @app.post("/admin/impersonate/{user_id}", response_model=TokenResponse)
@@ -882,15 +1111,13 @@ async def impersonate_user(
     })
     
     # Log action
-    audit = AuditLog(
-        user_id=current_admin.user_id,
-        action="impersonate_user",
-        resource_type="user",
+    await record_audit_async(
+        "impersonate_user", "user",
         resource_id=target_user.id,
-        details={"target": target_user.email}
+        user_id=current_admin.user_id,
+        details={"target": target_user.email},
+        critical=True
     )
-    db.add(audit)
-    db.commit()
     
     return TokenResponse(
         access_token=access_token,
@@ -900,16 +1127,58 @@ async def impersonate_user(
         full_name=target_user.full_name
     )
 
-@app.get("/admin/audit-logs", response_model=List[AuditLogResponse])
+@app.get("/admin/audit-logs", response_model=AuditLogPage)
 async def get_audit_logs(
-    skip: int = 0,
     limit: int = 50,
-    current_admin: Admin = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_admin: Admin = Depends(get_current_admin)
 ):
-    """Get system audit logs"""
-    logs = db.query(AuditLog).order_by(AuditLog.created_at.desc()).offset(skip).limit(limit).all()
-    return logs
+    """
+    Get system audit logs, newest first.
+    Pass the returned next_cursor as ?cursor= to fetch the following page.
+    """
+    try:
+        items, next_cursor = get_audit_storage().query(
+            user_id=user_id,
+            action=action,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            since=normalize_datetime(since) if since else None,
+            until=normalize_datetime(until) if until else None,
+            cursor=cursor,
+            limit=max(1, min(limit, 500))
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/admin/audit-logs/pipeline", response_model=AuditPipelineStats)
+async def get_audit_pipeline_stats(current_admin: Admin = Depends(get_current_admin)):
+    """Audit writer queue depth, throughput and drop counters"""
+    return get_audit_writer().stats()
+
+@app.get("/admin/rollups/consistency", response_model=RollupConsistencyReport)
+def check_report_rollups(
+    days: Optional[int] = None,
+    repair: bool = False,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Compare the daily report rollups with raw aggregates (last `days` days, or everything)"""
+    since = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+    return get_report_rollups().check_consistency(since, repair)
+
+@app.post("/admin/rollups/rebuild")
+def rebuild_report_rollups(current_admin: Admin = Depends(get_current_admin)):
+    """Recompute the daily report rollups from the raw tables"""
+    rows = get_report_rollups().rebuild()
+    record_audit("rebuild_rollups", "system", user_id=current_admin.user_id, details=rows, critical=True)
+    return {"rows": rows}
 
 @app.get("/admin/users/{user_id}/history", response_model=UserHistoryResponse)
 async def get_user_history(
@@ -921,6 +1190,7 @@ async def get_user_history(
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    record_audit("view_user_history", "user", resource_id=user.id, user_id=current_admin.user_id)
         
     # Get appointments depending on role
     appointments = []
@@ -929,15 +1199,15 @@ async def get_user_history(
     elif user.role == UserRole.PRACTITIONER:
         appointments = db.query(Appointment).filter(Appointment.practitioner_id == user.practitioner_profile.id).order_by(Appointment.scheduled_datetime.desc()).all()
         
-    # Get audit logs for this user
-    audit_logs = db.query(AuditLog).filter(AuditLog.resource_id == user.id).order_by(AuditLog.created_at.desc()).all()
+    # Get audit logs about this user (resource ids of other types would collide)
+    audit_logs, _ = get_audit_storage().query(resource_type="user", resource_id=user.id, limit=200)
     
     # Use from_orm strictly for Pydantic v2 compatibility if needed, but direct assignment works for simple cases
     # We construct the response
     return UserHistoryResponse(
         user=AdminUserResponse.from_orm(user),
         appointments=[AppointmentResponse.from_orm(a) for a in appointments],
-        audit_logs=[AuditLogResponse.from_orm(l) for l in audit_logs]
+        audit_logs=[AuditLogResponse(**l) for l in audit_logs]
     )
 
 @app.get("/admin/settings", response_model=List[SystemSettingsResponse])
@@ -1044,6 +1314,11 @@ async def create_feedback(
         rating=feedback_data.rating,
         comments=feedback_data.comments,
         satisfaction_level=feedback_data.satisfaction_level,
+        therapy_effectiveness=feedback_data.therapy_effectiveness,
+        practitioner_professionalism=feedback_data.practitioner_professionalism,
+        facility_cleanliness=feedback_data.facility_cleanliness,
+        would_recommend=feedback_data.would_recommend,
+        suggestions=feedback_data.suggestions,
         created_at=datetime.utcnow()
     )
     
@@ -1055,44 +1330,109 @@ async def create_feedback(
 
 
 # ==================== FILE UPLOAD ====================
-@app.post("/upload")
+@app.post("/upload", response_model=FileUploadResponse)
 async def upload_file(
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    purpose: str = "document",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
-    """Upload files (profile pictures, documents, etc.)"""
-    # Validate file type and size
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "application/pdf"]
-    max_size = 5 * 1024 * 1024  # 5MB
+    """
+    Upload files (profile pictures, documents, etc.) as multipart field "file".
+    The body is streamed to storage; the type is taken from the file's magic bytes.
+    purpose=profile_picture accepts images only and sets the user's profile picture.
+    """
+    if purpose not in ("document", "profile_picture"):
+        raise HTTPException(status_code=400, detail="purpose must be document or profile_picture")
     
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Invalid file type")
+    store = get_file_store()
+    try:
+        stored, filename = await store.receive_upload(
+            request,
+            allowed_types=IMAGE_TYPES if purpose == "profile_picture" else ALLOWED_TYPES
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     
-    # Read and validate file size
-    content = await file.read()
-    if len(content) > max_size:
-        raise HTTPException(status_code=400, detail="File too large")
+    upload = FileUpload(
+        user_id=current_user.id,
+        sha256=stored.sha256,
+        size=stored.size,
+        content_type=stored.content_type,
+        filename=filename,
+        purpose=purpose
+    )
+    db.add(upload)
     
-    # Save file (implement proper file storage)
-    filename = f"{current_user.id}_{datetime.utcnow().timestamp()}_{file.filename}"
-    # TODO: Implement actual file saving to cloud storage or local filesystem
+    url = f"/files/{stored.sha256}"
+    thumbnail_url = None
+    if purpose == "profile_picture":
+        store.schedule_thumbnail(stored)
+        thumbnail_url = f"{url}/thumbnail"
+        current_user.profile_picture = url
     
-    return {
-        "filename": filename,
-        "size": len(content),
-        "content_type": file.content_type,
-        "message": "File uploaded successfully"
-    }
+    db.commit()
+    db.refresh(upload)
+    
+    return FileUploadResponse(
+        id=upload.id,
+        sha256=stored.sha256,
+        filename=filename,
+        size=stored.size,
+        content_type=stored.content_type,
+        purpose=purpose,
+        url=url,
+        thumbnail_url=thumbnail_url,
+        deduplicated=stored.deduplicated
+    )
 
+def _readable_upload(db: Session, sha256: str, user: User) -> Optional[FileUpload]:
+    """
+    An upload of this file the user may read: their own, any upload for an admin, and
+    for a practitioner the uploads of patients they have appointments with
+    """
+    query = db.query(FileUpload).filter(FileUpload.sha256 == sha256)
+    if user.role == UserRole.ADMIN:
+        return query.first()
+    own = query.filter(FileUpload.user_id == user.id).first()
+    if own or user.role != UserRole.PRACTITIONER:
+        return own
+    caseload = db.query(Patient.user_id).join(Appointment, Appointment.patient_id == Patient.id).join(
+        Practitioner, Practitioner.id == Appointment.practitioner_id
+    ).filter(Practitioner.user_id == user.id)
+    return query.filter(FileUpload.user_id.in_(caseload)).first()
+
+@app.get("/files/{sha256}")
+async def download_file(
+    sha256: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Download a stored file the current user may read; supports Range requests"""
+    upload = _readable_upload(db, sha256, current_user)
+    store = get_file_store()
+    if not upload or not store.exists(sha256):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    return file_response(store.object_path(sha256), upload.content_type, request.headers.get("range"), upload.filename)
 
-# ==================== REPORTS AND ANALYTICS ====================
-@app.get("/reports/patient/{patient_id}", response_model=PatientReportResponse)
-async def get_patient_report(
-    patient_id: int,
-    current_user: User = Depends(get_current_user), # Any authorized user for now (practitioner/patient)
+@app.get("/files/{sha256}/thumbnail")
+async def download_thumbnail(
+    sha256: str,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate a detailed progress report for a patient"""
+    """Profile picture thumbnail (404 until generated, if Pillow is not installed, or if not readable)"""
+    store = get_file_store()
+    path = store.thumbnail_path(sha256)
+    if not _readable_upload(db, sha256, current_user) or not store.exists(sha256) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Thumbnail not available")
+    return file_response(path, "image/jpeg")
+
+
+# ==================== REPORTS AND ANALYTICS ====================
+def _patient_report(patient_id: int, current_user: User, db: Session) -> PatientReportResponse:
     # 1. Get Patient Details
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
@@ -1155,97 +1495,60 @@ async def get_patient_report(
         doctor_notes="Patient is showing steady improvement." # Placeholder
     )
 
+@app.get("/reports/patient/{patient_id}", response_model=PatientReportResponse)
+async def get_patient_report(
+    patient_id: int,
+    # No early 304: every view, including a revalidation, must reach the audit log
+    cached: CachedResponse = Depends(cached_response(
+        "patient_report", ("patients", "users", "patient_health_logs", "appointments", "symptoms"),
+        short_circuit=False)),
+    current_user: User = Depends(get_current_user), # Any authorized user for now (practitioner/patient)
+    db: Session = Depends(get_db)
+):
+    """Generate a detailed progress report for a patient"""
+    not_modified = cached.revalidate()
+    if not_modified is not None:
+        record_audit("view_patient_report", "patient", resource_id=patient_id, user_id=current_user.id)
+        return not_modified
+    response = await cached.respond(PatientReportResponse, lambda: _patient_report(patient_id, current_user, db))
+    record_audit("view_patient_report", "patient", resource_id=patient_id, user_id=current_user.id)
+    return response
+
 @app.get("/reports/treatments", response_model=TreatmentAnalyticsResponse)
 async def get_treatment_analytics(
     days: int = 30,
     patient_id: Optional[int] = None,
-    current_user: User = Depends(get_current_practitioner),
+    current_practitioner: Practitioner = Depends(get_current_practitioner),
     db: Session = Depends(get_db)
 ):
-    """Get overall treatment analytics or patient specific"""
-    start_date = datetime.utcnow() - timedelta(days=days)
-    
-    query = db.query(Appointment).filter(Appointment.scheduled_datetime >= start_date)
-    if patient_id:
-        query = query.filter(Appointment.patient_id == patient_id)
-        
-    total_treatments = query.count()
-    completed = query.filter(Appointment.status == "completed").count()
-    
-    # Calculate success rate (completed / total) * 100
-    success_rate = (completed / total_treatments * 100) if total_treatments > 0 else 0.0
-    
-    # Type Distribution
-    type_dist = []
-    # Get counts by therapy type
-    therapy_counts = query.group_by(Appointment.therapy_type).with_entities(
-        Appointment.therapy_type, func.count(Appointment.id)
-    ).all()
-    
-    for t_type, count in therapy_counts:
-        # Per type success rate
-        t_total = count
-        t_completed = query.filter(
-            Appointment.therapy_type == t_type, 
-            Appointment.status == "completed"
-        ).count()
-        t_rate = (t_completed / t_total * 100) if t_total > 0 else 0.0
-        
-        type_dist.append(TreatmentTypeStat(
-            type=t_type,
-            count=count,
-            success_rate=round(t_rate, 1)
-        ))
-        
-    # If no data, return empty structure instead of mock, so user effectively sees "No data" for new patients
-    # But for global view, if empty, we might typically seed data? 
-    # If user asks "why this data", they likely want to see THEIR data.
-    
-    return TreatmentAnalyticsResponse(
-        total_treatments=total_treatments,
-        success_rate_overall=round(success_rate, 1),
-        type_distribution=type_dist,
-        monthly_trends=[] # Skipping trends for now or keeping empty
-    )
+    """Get treatment analytics for the current practitioner, optionally for one patient"""
+    # Whole days, so the practitioner-wide view can be served from the daily rollups
+    start_date = datetime.combine((datetime.utcnow() - timedelta(days=days)).date(), datetime.min.time())
+    analytics = treatment_analytics(db, current_practitioner.id, start_date, patient_id,
+                                    use_rollups=ROLLUPS_ENABLED)
+    return TreatmentAnalyticsResponse(**analytics)
 
 @app.get("/reports/monthly-summary", response_model=MonthlySummaryResponse)
 async def get_monthly_summary(
     patient_id: Optional[int] = None,
-    current_user: User = Depends(get_current_practitioner),
+    current_practitioner: Practitioner = Depends(get_current_practitioner),
     db: Session = Depends(get_db)
 ):
     """Get monthly activity summary, optionally filtered by patient"""
     now = datetime.utcnow()
     month_name = now.strftime("%B")
     start_date = datetime(now.year, now.month, 1)
-    
-    # Base Query (Practitioner Specific)
-    appt_query = db.query(Appointment).filter(
-        Appointment.scheduled_datetime >= start_date,
-        Appointment.practitioner_id == current_user.id # Assuming current_user is the practitioner user, wait.
-        # current_user is passed as User, but via get_current_practitioner dependency?
-        # get_current_practitioner returns User object according to main.py type hint? 
-        # No, line 738: current_user: User = Depends(get_current_practitioner)
-        # Check get_current_practitioner definition.
-    )
-    
-    # We need the Practitioner ID, not User ID.
-    practitioner_profile = db.query(Practitioner).filter(Practitioner.user_id == current_user.id).first()
-    if not practitioner_profile:
-         raise HTTPException(status_code=400, detail="Practitioner profile not found")
-         
-    appt_query = db.query(Appointment).filter(
-        Appointment.scheduled_datetime >= start_date,
-        Appointment.practitioner_id == practitioner_profile.id
-    )
-    
-    if patient_id:
-        appt_query = appt_query.filter(Appointment.patient_id == patient_id)
 
-    total_appts = appt_query.count()
-    
-    # New Patients Logic
     if patient_id:
+        # Per-patient figures are not rolled up; aggregate this month's raw rows in one query
+        status_counts = dict(db.query(Appointment.status, func.count(Appointment.id)).filter(
+            Appointment.scheduled_datetime >= start_date,
+            Appointment.practitioner_id == current_practitioner.id,
+            Appointment.patient_id == patient_id
+        ).group_by(Appointment.status).all())
+        status_counts = {getattr(status, "value", status): count for status, count in status_counts.items()}
+        total_appts = sum(status_counts.values())
+
         # If filtering for a specific patient, check if THEY are new this month
         patient_user_id = db.query(Patient.user_id).filter(Patient.id == patient_id).scalar()
         if patient_user_id:
@@ -1255,32 +1558,33 @@ async def get_monthly_summary(
             ).count()
         else:
             new_pts = 0
+
+        # Get this patient's therapies
+        t_counts = db.query(Appointment.therapy_type, func.count(Appointment.id))\
+            .filter(Appointment.patient_id == patient_id, Appointment.practitioner_id == current_practitioner.id)\
+            .group_by(Appointment.therapy_type)\
+            .order_by(func.count(Appointment.id).desc()).limit(3).all()
+        therapies = [t[0] for t in t_counts]
     else:
-        # New patients *for this practitioner* (e.g. patients with first appointment this month? 
-        # Or just simply patients of this practitioner created this month?
-        # Let's count patients who have an appointment with this practitioner AND were created this month.
+        if ROLLUPS_ENABLED:
+            summary = appointment_summary_from_rollups(db, current_practitioner.id, start_date.date())
+        else:
+            summary = appointment_summary(db, current_practitioner.id, start_date.date())
+        status_counts = summary["status_counts"]
+        total_appts = summary["total"]
+        therapies = [therapy_type for therapy_type, _ in summary["therapies"][:3]]
+
+        # Patients of this practitioner whose accounts were created this month
         new_pts = db.query(User).join(Patient).join(Appointment).filter(
             User.role == UserRole.PATIENT,
             User.created_at >= start_date,
-            Appointment.practitioner_id == practitioner_profile.id
+            Appointment.practitioner_id == current_practitioner.id
         ).distinct().count()
-    
+
     # Revenue Calculation (Estimate: 1500 INR per appointment)
     avg_treatment_cost = 1500.0
     revenue = float(total_appts * avg_treatment_cost)
 
-    # Popular Therapies
-    therapies = []
-    if patient_id:
-         # Get this patient's therapies
-         t_counts = db.query(Appointment.therapy_type, func.count(Appointment.id))\
-            .filter(Appointment.patient_id == patient_id)\
-            .group_by(Appointment.therapy_type)\
-            .order_by(func.count(Appointment.id).desc()).limit(3).all()
-         therapies = [t[0] for t in t_counts]
-    else:
-         therapies = ["Abhyanga", "Shirodhara"] # Default
-
     return MonthlySummaryResponse(
         month=month_name,
         total_revenue=revenue,
@@ -1288,82 +1592,88 @@ async def get_monthly_summary(
         new_patients=new_pts,
         popular_therapies=therapies if therapies else ["None"],
         appointment_status_counts={
-            "completed": appt_query.filter(Appointment.status == "completed").count(),
-            "scheduled": appt_query.filter(Appointment.status == "scheduled").count(),
-            "cancelled": appt_query.filter(Appointment.status == "cancelled").count()
+            "completed": status_counts.get("completed", 0),
+            "scheduled": status_counts.get("scheduled", 0),
+            "cancelled": status_counts.get("cancelled", 0)
         }
     )
 
 @app.get("/reports/feedback", response_model=FeedbackReportResponse)
 async def get_feedback_report(
-    current_user: User = Depends(get_current_practitioner),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_practitioner: Practitioner = Depends(get_current_practitioner),
     db: Session = Depends(get_db)
 ):
-    """Get patient feedback report"""
-    # Aggregate from Feedback table
-    feedbacks = db.query(Feedback).order_by(Feedback.created_at.desc()).limit(10).all()
-    
-    total_reviews = db.query(Feedback).count()
-    avg_rating = db.query(func.avg(Feedback.rating)).scalar() or 0.0
-    
-    # Distribution
-    dist = {}
-    for i in range(1, 6):
-        count = db.query(Feedback).filter(Feedback.rating == i).count()
-        dist[i] = count
-        
+    """Get the current practitioner's feedback report, optionally for a date range (inclusive)"""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    recent = db.query(Feedback).filter(Feedback.practitioner_id == current_practitioner.id)
+    if start_date:
+        recent = recent.filter(Feedback.created_at >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        recent = recent.filter(Feedback.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    feedbacks = recent.order_by(Feedback.created_at.desc()).limit(10).all()
+
+    if ROLLUPS_ENABLED:
+        summary = feedback_summary_from_rollups(db, current_practitioner.id, start_date, end_date)
+    else:
+        summary = feedback_summary(db, current_practitioner.id, start_date, end_date)
+
     return FeedbackReportResponse(
         summary=FeedbackSummary(
-            average_rating=round(float(avg_rating), 1),
-            total_reviews=total_reviews,
-            rating_distribution=dist,
+            **summary,
+            start_date=start_date,
+            end_date=end_date,
             recent_feedback=[FeedbackResponse.from_orm(f) for f in feedbacks]
         ),
         improvement_areas=["Wait time reduction", "Post-session follow-up"]
     )
-    
-    # 5. Popular Therapies
-    popular_therapies_query = db.query(
-        Appointment.therapy_type, func.count(Appointment.id)
-    ).group_by(Appointment.therapy_type).order_by(func.count(Appointment.id).desc()).limit(4).all()
-    
-    popular_therapies = [{"name": t, "count": c} for t, c in popular_therapies_query]
-    
-    # 6. Monthly Trends (Last 6 months)
-    monthly_trends = []
-    for i in range(5, -1, -1):
-        # Use a more robust way to get the first day of the month i months ago
-        # current month = now.month, i=0
-        # i=1 -> last month
-        
-        month = now.month - i
-        year = now.year
-        while month <= 0:
-            month += 12
-            year -= 1
-            
-        count = db.query(Appointment).filter(
-            func.extract('month', Appointment.scheduled_datetime) == month,
-            func.extract('year', Appointment.scheduled_datetime) == year,
-            Appointment.status == "completed"
-        ).count()
-        
-        # Get month name
-        month_name = datetime(year, month, 1).strftime("%b")
-        
-        monthly_trends.append({
-            "month": month_name,
-            "sessions": count
-        })
 
-    return {
-        "total_sessions": total_sessions,
-        "success_rate": round(success_rate, 1),
-        "average_duration": round(avg_duration, 1),
-        "patient_satisfaction": round(float(avg_rating), 1),
-        "popular_therapies": popular_therapies,
-        "monthly_trends": monthly_trends
-    }
+
+# ==================== DATA EXPORT ====================
+@app.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    fmt: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    practitioner_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream health_logs, symptoms, appointments or feedback as CSV, NDJSON or Parquet.
+    Practitioners get their own appointments/feedback and their caseload's health logs
+    and symptoms; admins get everything, optionally narrowed to one practitioner_id.
+    """
+    if current_user.role == UserRole.PRACTITIONER:
+        practitioner = db.query(Practitioner).filter(Practitioner.user_id == current_user.id).first()
+        if not practitioner:
+            raise HTTPException(status_code=404, detail="Practitioner profile not found")
+        practitioner_id = practitioner.id
+    elif current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only practitioners and admins can export data")
+    
+    try:
+        validate_export(dataset, fmt)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    record_audit("export_data", dataset, user_id=current_user.id, details={
+        "format": fmt, "gzip": gzip, "practitioner_id": practitioner_id,
+        "since": since.isoformat() if since else None, "until": until.isoformat() if until else None
+    })
+    
+    compressed_file = gzip and fmt != "parquet"
+    return StreamingResponse(
+        # The stream opens its own session: it outlives this request's dependencies
+        stream_export(SessionLocal, dataset, fmt, gzip, practitioner_id, since, until),
+        media_type="application/gzip" if compressed_file else EXPORT_FORMATS[fmt][0],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(dataset, fmt, gzip)}"'}
+    )
 
 
 # ==================== DEBUG / DB VIEWER ====================
@@ -1393,6 +1703,45 @@ async def get_all_practitioners(db: Session = Depends(get_db)):
     return practitioners
 
 
+@app.get("/practitioners/nearby", response_model=List[NearbyPractitionerResponse])
+async def get_nearby_practitioners(
+    lat: float,
+    lng: float,
+    radius_km: float = 25.0,
+    limit: int = 50,
+    specialization: Optional[str] = None,
+    verified_only: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Practitioners within radius_km of a point, nearest first (for the clinic map)"""
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    if radius_km <= 0 or not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="radius_km must be positive and limit 1-500")
+    
+    geo_index = get_geo_index()
+    geo_index.ensure_loaded(db)
+    nearest = geo_index.nearby(lat, lng, radius_km, limit, specialization, verified_only)
+    if not nearest:
+        return []
+    
+    # Load only the matched rows and keep the distance ordering
+    practitioners = db.query(Practitioner).join(User).filter(
+        Practitioner.id.in_([practitioner_id for practitioner_id, _ in nearest]),
+        User.is_active == True
+    ).all()
+    by_id = {p.id: p for p in practitioners}
+    
+    results = []
+    for practitioner_id, distance in nearest:
+        practitioner = by_id.get(practitioner_id)
+        if practitioner is not None:
+            practitioner.distance_km = distance  # Transient attribute read by the response model
+            results.append(practitioner)
+    return results
+
+
 # ==================== HEALTH LOGS ====================
 @app.post("/api/health-logs", response_model=HealthLogResponse)
 async def create_health_log(
@@ -1594,34 +1943,10 @@ async def ask_health_ai(
         if response_type == 'clarification':
             # Use the pre-formatted message from enhanced assistant
             ai_answer = response_data['message']
-        elif response_type == 'diet_plan':
-            diet_plan = response_data['data']
-            ai_answer = f"{response_data['message']}\n\n"
-            ai_answer += f"📊 **Your Metrics:**\n"
-            ai_answer += f"- BMI: {diet_plan['bmi']}\n"
-            ai_answer += f"- Daily Calorie Target: {diet_plan['target_calories']} kcal\n"
-            ai_answer += f"- Dominant Dosha: {diet_plan['dominant_dosha'].title()}\n\n"
-            ai_answer += f"🥗 **Macros:**\n"
-            ai_answer += f"- Protein: {diet_plan['macros']['protein']}\n"
-            ai_answer += f"- Carbs: {diet_plan['macros']['carbs']}\n"
-            ai_answer += f"- Fats: {diet_plan['macros']['fats']}\n\n"
-            ai_answer += f"✅ **Foods to Favor:** {', '.join(diet_plan['foods_to_favor'][:5])}\n\n"
-            ai_answer += f"❌ **Foods to Avoid:** {', '.join(diet_plan['foods_to_avoid'][:5])}\n\n"
-            ai_answer += f"🍽️ **Sample Meal Plan:**\n"
-            for meal, details in diet_plan['meal_plan'].items():
-                ai_answer += f"- **{meal.title()}**: {details['suggestion']} ({details['calories']} kcal)\n"
-            ai_answer += f"\n💧 **Hydration:** {diet_plan['hydration']}\n"
-        elif response_type == 'workout_plan':
-            workout_plan = response_data['data']
-            ai_answer = f"{response_data['message']}\n\n"
-            ai_answer += f"🏋️ **Workout Style:** {workout_plan['workout_style']}\n\n"
-            ai_answer += f"✅ **Recommended Activities:** {', '.join(workout_plan['recommended_activities'][:4])}\n\n"
-            ai_answer += f"📅 **Weekly Plan:**\n"
-            for day, activity in workout_plan['weekly_plan'].items():
-                ai_answer += f"- **{day}**: {activity}\n"
-            ai_answer += f"\n🧘 **Yoga Sequence:**\n"
-            for pose in workout_plan['yoga_sequence'][:5]:
-                ai_answer += f"- {pose}\n"
+        elif response_type in ('diet_plan', 'workout_plan'):
+            # Plan markdown is pre-rendered and cached alongside the plan itself
+            rendered_plan = response_data.get('rendered_plan') or render_plan_markdown(response_type, response_data['data'])
+            ai_answer = f"{response_data['message']}\n\n{rendered_plan}"
         else:
             # Default conversation
             ai_answer = response_data.get('reply', response_data.get('message', 'I understood that.'))
@@ -1660,12 +1985,7 @@ async def ask_health_ai(
         }
         
     except Exception as e:
-        logger.error(f"Enhanced AI health assistant error: {str(e)}")
-        import traceback
-        with open("backend_error.log", "w") as f:
-            f.write(f"ERROR AT {datetime.utcnow()}:\n")
-            f.write(traceback.format_exc())
-            f.write("\n")
+        logger.exception(f"Enhanced AI health assistant error: {str(e)}")
         # Fallback to simple response
         ai_answer = "I encountered a processing error. However, your request is noted and I can still assist with general queries."
         
@@ -1699,19 +2019,17 @@ async def get_health_conversations(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient profile not found")
         
-    conversations = db.query(AIConversation).filter(
+    # Skip loading the (potentially large) messages JSON column
+    conversations = db.query(AIConversation).with_entities(
+        AIConversation.conversation_id,
+        AIConversation.title,
+        AIConversation.created_at,
+        AIConversation.updated_at
+    ).filter(
         AIConversation.patient_id == patient.id
     ).order_by(AIConversation.updated_at.desc()).all()
     
-    return [
-        {
-            "conversation_id": c.conversation_id,
-            "title": c.title,
-            "created_at": c.created_at,
-            "updated_at": c.updated_at
-        }
-        for c in conversations
-    ]
+    return FastJSONResponse([c._asdict() for c in conversations])
 
 @app.get("/health/conversations/{conversation_id}")
 async def get_health_conversation_detail(
@@ -1769,12 +2087,7 @@ async def delete_health_conversation(
     db.commit()
     return {"status": "success", "message": "Conversation deleted"}
 
-@app.get("/health/recommendations", response_model=HealthRecommendationsResponse)
-async def get_health_recommendations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get AI-generated health recommendations based on patient data"""
+def _health_recommendations(current_user: User, db: Session) -> HealthRecommendationsResponse:
     if current_user.role != UserRole.PATIENT:
         raise HTTPException(status_code=403, detail="Only patients can get recommendations")
     
@@ -1875,6 +2188,16 @@ async def get_health_recommendations(
         dosha_analysis=dosha_analysis
     )
 
+@app.get("/health/recommendations", response_model=HealthRecommendationsResponse)
+async def get_health_recommendations(
+    cached: CachedResponse = Depends(cached_response(
+        "health_recommendations", ("patients", "patient_health_logs", "symptoms"))),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get AI-generated health recommendations based on patient data"""
+    return await cached.respond(HealthRecommendationsResponse, lambda: _health_recommendations(current_user, db))
+
 # ==================== CHAT SUPPORT ENDPOINTS ====================
 
 @app.get("/chat/practitioners")
@@ -1887,14 +2210,16 @@ async def get_available_practitioners(
         User.is_active == True
     ).limit(20).all()
     
+    connections = get_connection_manager()
     result = []
     for prac in practitioners:
         result.append({
             "id": prac.id,
+            "user_id": prac.user_id,
             "name": prac.user.full_name,
             "specialization": prac.specializations[0] if prac.specializations else None,
-            "online": True,  # TODO: Implement real online status
-            "last_seen": datetime.utcnow()
+            "online": connections.is_online(prac.user_id),
+            "last_seen": connections.last_seen(prac.user_id)
         })
     
     return result
@@ -1904,27 +2229,100 @@ async def get_chat_messages(
     recipient_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
-    limit: int = 50
+    limit: int = 50,
+    before: Optional[int] = None,
+    after: Optional[int] = None
 ):
-    """Get chat message history with a specific user"""
-    # Determine sender type
-    sender_type = current_user.role.value
+    """
+    Get chat message history with a specific user, oldest first.
+    Pages are keyed on (created_at, id): pass the id of the oldest loaded message
+    as `before` to page back, or of the newest as `after` to fetch new messages.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    limit = max(1, min(limit, 200))
+    
     sender_id = current_user.id
     
     # Get messages where user is either sender or recipient
-    messages = db.query(ChatMessage).filter(
+    query = db.query(ChatMessage).filter(
         ((ChatMessage.sender_id == sender_id) & (ChatMessage.recipient_id == recipient_id)) |
         ((ChatMessage.sender_id == recipient_id) & (ChatMessage.recipient_id == sender_id))
-    ).order_by(ChatMessage.created_at.desc()).limit(limit).all()
+    )
     
-    # Mark messages as read
-    for msg in messages:
-        if msg.recipient_id == sender_id and not msg.read:
-            msg.read = True
+    cursor_id = before if before is not None else after
+    if cursor_id is not None:
+        if db.query(ChatMessage.id).filter(ChatMessage.id == cursor_id).first() is None:
+            raise HTTPException(status_code=404, detail="Cursor message not found")
+        
+        # Compare against the stored timestamp in SQL so precision/format never differs
+        cursor_created_at = db.query(ChatMessage.created_at).filter(ChatMessage.id == cursor_id).scalar_subquery()
+        if before is not None:
+            query = query.filter(or_(
+                ChatMessage.created_at < cursor_created_at,
+                and_(ChatMessage.created_at == cursor_created_at, ChatMessage.id < cursor_id)
+            ))
+        else:
+            query = query.filter(or_(
+                ChatMessage.created_at > cursor_created_at,
+                and_(ChatMessage.created_at == cursor_created_at, ChatMessage.id > cursor_id)
+            ))
     
-    db.commit()
+    if after is not None:
+        messages = query.order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc()).limit(limit).all()
+    else:
+        messages = list(reversed(
+            query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit).all()
+        ))
+    
+    # Serialize before committing so the rows are not reloaded one by one after expiry
+    response = [ChatMessageResponse.from_orm(msg) for msg in messages]
+    
+    # Mark everything received up to the newest loaded message as read in one UPDATE
+    received_ids = {msg.id for msg in response if msg.recipient_id == sender_id and not msg.read}
+    newly_read = 0
+    if received_ids:
+        newly_read = db.query(ChatMessage).filter(
+            ChatMessage.recipient_id == sender_id,
+            ChatMessage.sender_id == recipient_id,
+            ChatMessage.id <= max(received_ids),
+            ChatMessage.read == False
+        ).update({ChatMessage.read: True}, synchronize_session=False)
+        db.commit()
+        
+        for msg in response:
+            if msg.id in received_ids:
+                msg.read = True
     
-    return list(reversed(messages))
+    if newly_read:
+        await get_connection_manager().send_to_user(recipient_id, read_receipt_event(sender_id, recipient_id, newly_read))
+    
+    return response
+
+
+@app.get("/chat/unread-counts", response_model=ChatUnreadCounts)
+async def get_chat_unread_counts(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Unread message counts per conversation partner, from a single grouped query"""
+    rows = db.query(
+        ChatMessage.sender_id,
+        func.count(ChatMessage.id),
+        func.max(ChatMessage.created_at)
+    ).filter(
+        ChatMessage.recipient_id == current_user.id,
+        ChatMessage.read == False
+    ).group_by(ChatMessage.sender_id).all()
+    
+    conversations = [
+        {"sender_id": sender_id, "unread": unread, "last_message_at": last_message_at}
+        for sender_id, unread, last_message_at in rows
+    ]
+    return ChatUnreadCounts(
+        total=sum(c["unread"] for c in conversations),
+        conversations=conversations
+    )
 
 @app.post("/chat/send", response_model=ChatMessageResponse)
 async def send_chat_message(
@@ -1948,8 +2346,103 @@ async def send_chat_message(
     db.commit()
     db.refresh(message)
     
+    # Push to the recipient and to the sender's other open sockets
+    connections = get_connection_manager()
+    event = message_event(message)
+    await connections.send_to_user(message.recipient_id, event)
+    await connections.send_to_user(current_user.id, event)
+    
     return message
 
+
+@app.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Real-time chat socket, authenticated with ?token=<access token>.
+    Client events: {"type": "message", "recipient_id", "recipient_type", "content"},
+    {"type": "read", "sender_id"} and {"type": "ping"}.
+    Server events: "message", "read_receipt", "pong" and "error".
+    """
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        user_id = user.id if user else None
+        sender_type = user.role.value if user else None
+    finally:
+        db.close()
+    
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    connections = get_connection_manager()
+    await connections.connect(user_id, websocket)
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+                event_type = data.get("type")
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON event"})
+                continue
+            
+            if event_type == "message":
+                content = str(data.get("content") or "").strip()
+                recipient_id = data.get("recipient_id")
+                if not content or not isinstance(recipient_id, int):
+                    await websocket.send_json({"type": "error", "detail": "recipient_id and content are required"})
+                    continue
+                
+                db = SessionLocal()
+                try:
+                    message = ChatMessage(
+                        sender_id=user_id,
+                        sender_type=sender_type,
+                        recipient_id=recipient_id,
+                        recipient_type=data.get("recipient_type") or "practitioner",
+                        content=content,
+                        read=False
+                    )
+                    db.add(message)
+                    db.commit()
+                    db.refresh(message)
+                    event = message_event(message)
+                finally:
+                    db.close()
+                
+                await connections.send_to_user(recipient_id, event)
+                await connections.send_to_user(user_id, event)
+            
+            elif event_type == "read":
+                other_id = data.get("sender_id")
+                if not isinstance(other_id, int):
+                    await websocket.send_json({"type": "error", "detail": "sender_id is required"})
+                    continue
+                
+                db = SessionLocal()
+                try:
+                    newly_read = db.query(ChatMessage).filter(
+                        ChatMessage.sender_id == other_id,
+                        ChatMessage.recipient_id == user_id,
+                        ChatMessage.read == False
+                    ).update({ChatMessage.read: True}, synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+                
+                if newly_read:
+                    await connections.send_to_user(other_id, read_receipt_event(user_id, other_id, newly_read))
+            
+            elif event_type == "ping":
+                await websocket.send_json({"type": "pong"})
+            
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown event type: {event_type}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        connections.disconnect(user_id, websocket)
+
 @app.post("/chat/ai-assistant", response_model=AIChatResponse)
 async def chat_with_ai_assistant(
     request: AIChatRequest,
@@ -1966,9 +2459,10 @@ async def chat_with_ai_assistant(
         AIConversation.conversation_id == conversation_id
     ).first()
     
+    # Patient profile (None for non-patients), also needed when continuing a conversation
+    patient = db.query(Patient).filter(Patient.user_id == current_user.id).first()
+    
     if not conversation:
-        # Try to get patient ID if user is a patient
-        patient = db.query(Patient).filter(Patient.user_id == current_user.id).first()
         patient_id = patient.id if patient else None
         
         # Create conversation (patient_id can be None for non-patients)
@@ -1992,7 +2486,7 @@ async def chat_with_ai_assistant(
     
     # Prepare User Profile for Assistant
     user_profile = {}
-    if current_user.role == UserRole.PATIENT.value and patient:
+    if current_user.role == UserRole.PATIENT and patient:
         today = datetime.now()
         age = None
         if patient.date_of_birth:
@@ -2222,7 +2716,8 @@ async def agent_chat(
     # Generate AI response
     try:
         gemini_api_key = os.getenv("GEMINI_API_KEY")
-        if gemini_api_key:
+        use_fake_gemini = fake_backend_enabled("gemini_rest")
+        if gemini_api_key or use_fake_gemini:
             gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={gemini_api_key}"
             
             # Build context
@@ -2230,11 +2725,13 @@ async def agent_chat(
             for msg in conversation.messages[-5:]:
                 context += f"{msg['role']}: {msg['content']}\n"
             
-            response = requests.post(
-                gemini_url,
-                json={"contents": [{"parts": [{"text": context}]}]},
-                timeout=30
-            )
+            post = fake_gemini_rest_post if use_fake_gemini else requests.post
+            with track_ai_call("gemini"):
+                response = post(
+                    gemini_url,
+                    json={"contents": [{"parts": [{"text": context}]}]},
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -2282,7 +2779,7 @@ async def confirm_agent_actions(
                     user_id=current_user.id,
                     title=action.data.get("title", "Reminder"),
                     message=action.data.get("message", ""),
-                    time=action.data.get("time", "08:00 AM"),
+                    time=format_reminder_time(action.data.get("time", "08:00 AM")) or action.data.get("time"),
                     frequency=action.data.get("frequency", "daily"),
                     is_active=True
                 )
@@ -2349,12 +2846,21 @@ async def create_reminder(
     """
     Create a new reminder
     """
+    reminder_time = format_reminder_time(reminder.time)
+    if reminder_time is None:
+        raise HTTPException(status_code=400, detail=f"Invalid reminder time: {reminder.time}")
+    if reminder.frequency not in ("daily", "weekly", "once"):
+        raise HTTPException(status_code=400, detail="Frequency must be daily, weekly or once")
+    if reminder.timezone and not is_valid_timezone(reminder.timezone):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone: {reminder.timezone}")
+    
     new_reminder = Reminder(
         user_id=current_user.id,
         title=reminder.title,
         message=reminder.message,
         frequency=reminder.frequency,
-        time=reminder.time,
+        time=reminder_time,
+        timezone=reminder.timezone,
         is_active=True
     )
     db.add(new_reminder)
@@ -2362,6 +2868,11 @@ async def create_reminder(
     db.refresh(new_reminder)
     return new_reminder
 
+@app.get("/api/reminders/scheduler/metrics", response_model=ReminderSchedulerMetrics)
+async def get_reminder_scheduler_metrics(current_admin: Admin = Depends(get_current_admin)):
+    """Reminder delivery lag and queue depth"""
+    return get_reminder_scheduler().metrics()
+
 
 
 # ==================== NOTIFICATIONS ====================
@@ -2374,7 +2885,10 @@ async def get_notifications(
     limit: int = 50
 ):
     """Get notifications for current user"""
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    query = db.query(Notification).filter(
+        Notification.user_id == current_user.id,
+        active_notification_filter()
+    )
     
     if unread_only:
         query = query.filter(Notification.is_read == False)
@@ -2382,6 +2896,55 @@ async def get_notifications(
     notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
     return notifications
 
+@app.get("/notifications/unread-count", response_model=NotificationUnreadCount)
+async def get_notification_unread_count(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Unread notification count, served from the in-memory counter"""
+    return {"unread": get_notification_service().unread_count(db, current_user.id)}
+
+@app.get("/notifications/stream")
+async def stream_notifications(request: Request, token: Optional[str] = None):
+    """
+    Server-Sent Events stream of the current user's notifications.
+    EventSource cannot set headers, so the access token may be passed as ?token=.
+    Events: "unread_count" ({"unread"}) on connect and after every change,
+    "notification" (the new notification).
+    """
+    if token is None:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    
+    service = get_notification_service()
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db) if token else None
+        if user is None:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
+        user_id = user.id
+        unread = service.unread_count(db, user_id)
+    finally:
+        db.close()
+    
+    return StreamingResponse(
+        service.event_stream(request, user_id, unread),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.patch("/notifications/read", response_model=NotificationReadResult)
+async def mark_notifications_as_read(
+    payload: NotificationMarkRead,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark several notifications read in one update; omit ids to mark all read"""
+    service = get_notification_service()
+    updated = service.mark_read(db, current_user.id, payload.ids)
+    return {"updated": updated, "unread": service.unread_count(db, current_user.id)}
+
 @app.patch("/notifications/{notification_id}/read", response_model=NotificationResponse)
 async def mark_notification_as_read(
     notification_id: int,
@@ -2397,23 +2960,19 @@ async def mark_notification_as_read(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_read = True
-    db.commit()
+    get_notification_service().mark_read(db, current_user.id, [notification_id])
     db.refresh(notification)
     return notification
 
 
+
 # ==================== DEBUG / DB VIEWER ====================
-print("LOADING MAIN.PY - VERSION CHECK 999")
 @app.get("/db-view")
 def get_db_viewer():
     """Serve the database viewer HTML"""
-    print("DEBUG: Entering get_db_viewer (SYNC) - NEW ROUTE")
     try:
         base_dir = os.path.dirname(os.path.abspath(__file__))
         file_path = os.path.join(base_dir, "database_viewer.html")
-        print(f"DEBUG: Calculated path: {file_path}")
-        # print(f"DEBUG: Exists? {os.path.exists(file_path)}")
         if not os.path.exists(file_path):
             return JSONResponse(status_code=404, content={"detail": f"File not found at {file_path}"})
         
@@ -2423,12 +2982,7 @@ def get_db_viewer():
     except Exception as e:
         import traceback
         error_msg = traceback.format_exc()
-        try:
-            with open("backend/error_log.txt", "w") as err_f:
-                err_f.write(error_msg)
-        except:
-            pass
-        traceback.print_exc()
+        logger.exception("Failed to serve database viewer")
         return JSONResponse(status_code=500, content={"detail": str(e), "traceback": error_msg})
 
 @app.get("/debug/db-data")
@@ -2454,12 +3008,14 @@ async def get_debug_db_data(db: Session = Depends(get_db)):
                 count = db.query(model).count()
                 output["stats"][name] = count
             except Exception as e:
-                print(f"Error counting {name}: {e}")
+                logger.warning(f"Error counting {name}: {e}")
                 output["stats"][name] = f"Error: {str(e)[:50]}"
             
         # Fetch all users with details
         try:
-            users = db.query(User).all()
+            users = db.query(User).with_entities(
+                User.id, User.full_name, User.email, User.role, User.last_login, User.is_active
+            ).all()
             user_list = []
             for u in users:
                 try:
@@ -2472,13 +3028,13 @@ async def get_debug_db_data(db: Session = Depends(get_db)):
                         "is_active": u.is_active
                     })
                 except Exception as e:
-                    print(f"Error serializing user {u.id}: {e}")
+                    logger.warning(f"Error serializing user {u.id}: {e}")
                     user_list.append({
                         "id": u.id,
                         "error": str(e)
                     })
         except Exception as e:
-            print(f"Error querying users: {e}")
+            logger.warning(f"Error querying users: {e}")
             # Fallback: try to get users via raw SQL
             try:
                 result = db.execute(text("SELECT id, full_name, email, role, last_login, is_active FROM users"))
@@ -2493,11 +3049,11 @@ async def get_debug_db_data(db: Session = Depends(get_db)):
                         "is_active": bool(row[5])
                     })
             except Exception as e2:
-                print(f"Error with raw SQL fallback: {e2}")
+                logger.error(f"Error with raw SQL fallback: {e2}")
                 user_list = [{"error": f"Could not fetch users: {str(e)[:100]}"}]
                 
         output["users"] = user_list
-        return output
+        return FastJSONResponse(output)
         
     except Exception as e:
         import traceback
@@ -8,6 +8,8 @@ import logging
 from typing import Dict, Any, Optional, List
 import json
 
+from fake_ai_backends import fake_backend_enabled, FakeOllamaClient
+
 logger = logging.getLogger(__name__)
 
 class MedGemmaService:
@@ -40,8 +42,11 @@ class MedGemmaService:
     def _init_ollama(self):
         """Initialize Ollama client"""
         try:
-            import ollama
-            self.client = ollama.Client(host=self.endpoint)
+            if fake_backend_enabled("medgemma"):
+                self.client = FakeOllamaClient(host=self.endpoint)
+            else:
+                import ollama
+                self.client = ollama.Client(host=self.endpoint)
             
             # Test connection
             try:
@@ -277,6 +282,8 @@ def get_med_gemma_service(deployment_type: str = None) -> MedGemmaService:
     if _med_gemma_service is None:
         if deployment_type is None:
             deployment_type = os.getenv("MED_GEMMA_DEPLOYMENT", "mock")
+            if fake_backend_enabled("medgemma"):
+                deployment_type = "ollama"
         
         _med_gemma_service = MedGemmaService(deployment_type=deployment_type)
     
@@ -3,7 +3,7 @@ Database Models for AyurSutra Backend
 SQLAlchemy models for all entities in the system.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, JSON, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, Float, ForeignKey, JSON, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -42,7 +42,7 @@ class UserRole(enum.Enum):
     PRACTITIONER = "practitioner"
     ADMIN = "admin"
 
-class AppointmentStatus(enum.Enum):
+class AppointmentStatus(str, enum.Enum):
     SCHEDULED = "scheduled"
     CONFIRMED = "confirmed"
     IN_PROGRESS = "in_progress"
@@ -146,7 +146,9 @@ class Appointment(Base):
     therapy_type = Column(String(100), nullable=False)
     scheduled_datetime = Column(DateTime(timezone=True), nullable=False)
     duration_minutes = Column(Integer, default=60)
-    status = Column(Enum(AppointmentStatus), default=AppointmentStatus.SCHEDULED)
+    # Stored by value ("scheduled", ...) to match the string statuses used throughout the API
+    status = Column(Enum(AppointmentStatus, values_callable=lambda statuses: [s.value for s in statuses]),
+                    default=AppointmentStatus.SCHEDULED)
     notes = Column(Text, nullable=True)
     patient_notes = Column(Text, nullable=True)
     practitioner_notes = Column(Text, nullable=True)
@@ -162,6 +164,14 @@ class Appointment(Base):
     therapy_session = relationship("TherapySession", back_populates="appointment", uselist=False)
     feedback = relationship("Feedback", back_populates="appointment", uselist=False)
 
+    __table_args__ = (
+        # Covers the per-practitioner report aggregations without touching the table
+        Index("ix_appointments_practitioner_scheduled", "practitioner_id", "scheduled_datetime", "therapy_type", "status"),
+        # Rollup catch-up scans rows created or updated since its watermark
+        Index("ix_appointments_created_at", "created_at"),
+        Index("ix_appointments_updated_at", "updated_at"),
+    )
+
 class TherapySession(Base):
     __tablename__ = "therapy_sessions"
     
@@ -214,6 +224,13 @@ class Feedback(Base):
     practitioner = relationship("Practitioner", back_populates="feedback")
     appointment = relationship("Appointment", back_populates="feedback")
 
+    __table_args__ = (
+        # Rollup catch-up scans rows created since its watermark
+        Index("ix_feedback_created_at", "created_at"),
+        # Recent feedback of one practitioner in the feedback report
+        Index("ix_feedback_practitioner_created", "practitioner_id", "created_at"),
+    )
+
 class TherapyTemplate(Base):
     __tablename__ = "therapy_templates"
     
@@ -249,6 +266,19 @@ class Notification(Base):
     expires_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class FileUpload(Base):
+    """An uploaded file; content lives in the content-addressed store under sha256"""
+    __tablename__ = "file_uploads"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    filename = Column(String(255), nullable=True)
+    purpose = Column(String(50), default="document") # document, profile_picture
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class SystemSettings(Base):
     __tablename__ = "system_settings"
     
@@ -273,6 +303,15 @@ class AuditLog(Base):
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Keyset pagination on (created_at, id), alone or behind an equality filter.
+    # Monthly partition tables (audit_storage.py) get the same indexes.
+    __table_args__ = (
+        Index("ix_audit_logs_created", "created_at", "id"),
+        Index("ix_audit_logs_user_created", "user_id", "created_at", "id"),
+        Index("ix_audit_logs_action_created", "action", "created_at", "id"),
+        Index("ix_audit_logs_resource_created", "resource_type", "resource_id", "created_at", "id"),
+    )
 
 class PatientHealthLog(Base):
     __tablename__ = "patient_health_logs"
@@ -347,6 +386,13 @@ class ChatMessage(Base):
     content = Column(Text, nullable=False)
     read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Keyset pagination of a conversation on (created_at, id)
+        Index("ix_chat_messages_conversation", "sender_id", "recipient_id", "created_at", "id"),
+        # Unread counts and bulk mark-read
+        Index("ix_chat_messages_unread", "recipient_id", "read", "sender_id"),
+    )
 
 class Reminder(Base):
     """User reminders for health tasks"""
@@ -358,8 +404,65 @@ class Reminder(Base):
     message = Column(String(500), nullable=True)
     frequency = Column(String(50), default="daily") # daily, weekly, once
     time = Column(String(20), nullable=False) # "08:00"
+    timezone = Column(String(64), nullable=True) # IANA name, e.g. "Asia/Kolkata"; None uses SCHEDULE_TIMEZONE
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship
     user = relationship("User", backref="reminders")
+
+# ==================== REPORT ROLLUPS ====================
+# Maintained by report_rollups.py; one row per practitioner, day and therapy type.
+class DailyPractitionerStats(Base):
+    """Appointment counts per practitioner, day (of scheduled_datetime, UTC) and therapy type"""
+    __tablename__ = "daily_practitioner_stats"
+
+    day = Column(Date, primary_key=True)
+    practitioner_id = Column(Integer, primary_key=True)
+    therapy_type = Column(String(100), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    scheduled = Column(Integer, nullable=False, default=0)
+    confirmed = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0)
+    no_show = Column(Integer, nullable=False, default=0)
+    duration_minutes = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_practitioner_stats_practitioner_day", "practitioner_id", "day"),
+    )
+
+class DailyFeedbackStats(Base):
+    """Feedback aggregates per practitioner and day (of created_at, UTC)"""
+    __tablename__ = "daily_feedback_stats"
+
+    day = Column(Date, primary_key=True)
+    practitioner_id = Column(Integer, primary_key=True)
+    reviews = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+    effectiveness_sum = Column(Integer, nullable=False, default=0)
+    effectiveness_count = Column(Integer, nullable=False, default=0)
+    professionalism_sum = Column(Integer, nullable=False, default=0)
+    professionalism_count = Column(Integer, nullable=False, default=0)
+    cleanliness_sum = Column(Integer, nullable=False, default=0)
+    cleanliness_count = Column(Integer, nullable=False, default=0)
+    recommend_yes = Column(Integer, nullable=False, default=0)
+    recommend_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_feedback_stats_practitioner_day", "practitioner_id", "day"),
+    )
+
+class RollupWatermark(Base):
+    """Last source timestamp processed by the rollup catch-up job"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    watermark = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
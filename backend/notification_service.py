@@ -0,0 +1,260 @@
+"""
+Notification Service
+Creates notifications, keeps per-user unread counters in memory and pushes new
+notifications to connected clients over Server-Sent Events.
+A background sweeper deletes notifications past their expires_at.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, AsyncIterator
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models import Notification
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECONDS = int(os.getenv("NOTIFICATION_SWEEP_INTERVAL", "3600"))
+SSE_KEEPALIVE_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def active_filter(now: Optional[datetime] = None):
+    """Notifications that have not expired yet"""
+    now = now or datetime.utcnow()
+    return or_(Notification.expires_at.is_(None), Notification.expires_at > now)
+
+def notification_payload(notification: Notification) -> Dict[str, Any]:
+    return {
+        "id": notification.id,
+        "user_id": notification.user_id,
+        "title": notification.title,
+        "message": notification.message,
+        "type": notification.type,
+        "priority": notification.priority,
+        "is_read": notification.is_read,
+        "action_url": notification.action_url,
+        "expires_at": notification.expires_at.isoformat() if notification.expires_at else None,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None
+    }
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class NotificationService:
+    """
+    Unread counters are loaded lazily with one COUNT per user and then adjusted
+    in place on create/mark-read. Subscribers are asyncio queues per user; events
+    may be published from worker threads and are handed to the event loop safely.
+    """
+
+    def __init__(self):
+        self._unread: Dict[int, int] = {}
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    # ==================== UNREAD COUNTS ====================
+
+    def unread_count(self, db: Session, user_id: int) -> int:
+        with self._lock:
+            if user_id in self._unread:
+                return self._unread[user_id]
+
+        count = db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.is_read == False,
+            active_filter()
+        ).count()
+
+        with self._lock:
+            self._unread[user_id] = count
+        return count
+
+    def _adjust_unread(self, user_id: int, delta: int):
+        with self._lock:
+            if user_id in self._unread:
+                self._unread[user_id] = max(0, self._unread[user_id] + delta)
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Forget cached counts (all users when user_id is None)"""
+        with self._lock:
+            if user_id is None:
+                self._unread.clear()
+            else:
+                self._unread.pop(user_id, None)
+
+    # ==================== WRITES ====================
+
+    def create_notification(self, db: Session, user_id: int, title: str, message: str, type: str = "system",
+                            priority: str = "normal", action_url: Optional[str] = None,
+                            expires_at: Optional[datetime] = None) -> Notification:
+        """Create and push a single notification"""
+        return self.create_notifications(db, [{
+            "user_id": user_id,
+            "title": title,
+            "message": message,
+            "type": type,
+            "priority": priority,
+            "action_url": action_url,
+            "expires_at": expires_at
+        }])[0]
+
+    def create_notifications(self, db: Session, rows: List[Dict[str, Any]]) -> List[Notification]:
+        """Insert notifications in one transaction, then update counters and push them"""
+        notifications = [Notification(is_read=False, **row) for row in rows]
+        db.add_all(notifications)
+        db.commit()
+
+        for notification in notifications:
+            db.refresh(notification)
+            self._adjust_unread(notification.user_id, 1)
+            self.publish(notification.user_id, "notification", notification_payload(notification))
+            self._publish_count(db, notification.user_id)
+        return notifications
+
+    def mark_read(self, db: Session, user_id: int, notification_ids: Optional[List[int]] = None) -> int:
+        """Mark the given (or all) unread notifications read in a single UPDATE"""
+        query = db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.is_read == False
+        )
+        if notification_ids is not None:
+            if not notification_ids:
+                return 0
+            query = query.filter(Notification.id.in_(notification_ids))
+
+        updated = query.update({Notification.is_read: True}, synchronize_session=False)
+        db.commit()
+
+        if updated:
+            if notification_ids is None:
+                with self._lock:
+                    self._unread[user_id] = 0
+            else:
+                self._adjust_unread(user_id, -updated)
+            self._publish_count(db, user_id)
+        return updated
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete notifications past expires_at"""
+        deleted = db.query(Notification).filter(
+            Notification.expires_at.isnot(None),
+            Notification.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        if deleted:
+            self.invalidate()
+            logger.info(f"Purged {deleted} expired notifications")
+        return deleted
+
+    # ==================== PUSH ====================
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id: int, event: str, data: Dict[str, Any]):
+        """Queue an event for the user's open streams; safe to call from any thread"""
+        with self._lock:
+            queues = list(self._subscribers.get(user_id, ()))
+        if not queues or self._loop is None:
+            return
+
+        message = format_sse(event, data)
+        for queue in queues:
+            self._loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: str):
+        # Slow clients drop events rather than growing memory; counts resync on the next event
+        if not queue.full():
+            queue.put_nowait(message)
+
+    def _publish_count(self, db: Session, user_id: int):
+        with self._lock:
+            if user_id not in self._subscribers:
+                return
+        self.publish(user_id, "unread_count", {"unread": self.unread_count(db, user_id)})
+
+    async def event_stream(self, request, user_id: int, initial_unread: int) -> AsyncIterator[str]:
+        """SSE stream for one client: current unread count, then pushed events and keepalives"""
+        queue = self.subscribe(user_id)
+        try:
+            yield format_sse("unread_count", {"unread": initial_unread})
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(user_id, queue)
+
+    # ==================== SWEEPER ====================
+
+    def start_sweeper(self, session_factory):
+        """Start the background task that purges expired notifications"""
+        if self._sweeper is None:
+            self._loop = asyncio.get_running_loop()
+            self._sweeper = asyncio.create_task(self._sweep_forever(session_factory))
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _sweep_forever(self, session_factory):
+        while True:
+            try:
+                await asyncio.to_thread(self._sweep_once, session_factory)
+            except Exception as e:
+                logger.error(f"Notification sweep failed: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+    def _sweep_once(self, session_factory):
+        db = session_factory()
+        try:
+            self.purge_expired(db)
+        finally:
+            db.close()
+
+
+# Singleton instance
+_notification_service = None
+
+def get_notification_service() -> NotificationService:
+    """Get or create notification service singleton"""
+    global _notification_service
+
+    if _notification_service is None:
+        _notification_service = NotificationService()
+
+    return _notification_service
+
+def create_notification(db: Session, user_id: int, title: str, message: str, **kwargs) -> Notification:
+    """Convenience wrapper used by other modules to notify a user"""
+    return get_notification_service().create_notification(db, user_id, title, message, **kwargs)
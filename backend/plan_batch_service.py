@@ -0,0 +1,205 @@
+"""
+Batch Plan Generation Service
+Generates multi-day diet and workout plans for a whole caseload in one pass.
+"""
+
+import os
+import json
+import math
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from datetime import datetime
+
+from enhanced_health_assistant import NutritionalEngine, WorkoutEngine
+
+logger = logging.getLogger(__name__)
+
+# Batches with at least this many patients are fanned out to a process pool
+PROCESS_POOL_THRESHOLD = int(os.getenv("PLAN_BATCH_PROCESS_THRESHOLD", "50"))
+PROCESS_POOL_WORKERS = int(os.getenv("PLAN_BATCH_WORKERS", "0")) or None  # None = cpu count
+CHUNK_SIZE = int(os.getenv("PLAN_BATCH_CHUNK_SIZE", "25"))
+
+SUPPORTED_PLAN_TYPES = ("diet", "workout")
+DEFAULT_DOSHA_ANALYSIS = {"vata": 33, "pitta": 33, "kapha": 34}
+
+
+def build_patient_job(patient, latest_log=None) -> Dict[str, Any]:
+    """
+    Build a batch job (profile + dosha analysis) from a Patient row and its latest health log.
+    Mirrors the profile mapping used by the chat assistant endpoints.
+    """
+    preferences = patient.lifestyle_preferences or {}
+    profile = {
+        "gender": (patient.gender or "female").lower(),
+        "medical_conditions": [c.lower() for c in (patient.medical_history or [])],
+        "dietary_restrictions": [r.lower() for r in preferences.get("dietary_restrictions", [])],
+    }
+    for field in ("activity_level", "dietary_goal", "workout_goal", "equipment_access", "frequency", "height"):
+        if preferences.get(field):
+            profile[field] = preferences[field]
+
+    if patient.date_of_birth:
+        profile["age"] = (datetime.utcnow() - patient.date_of_birth).days // 365
+
+    if latest_log:
+        if latest_log.weight:
+            profile["weight"] = latest_log.weight
+        dosha_analysis = {
+            "vata": latest_log.dosha_vata if latest_log.dosha_vata is not None else 33,
+            "pitta": latest_log.dosha_pitta if latest_log.dosha_pitta is not None else 33,
+            "kapha": latest_log.dosha_kapha if latest_log.dosha_kapha is not None else 34
+        }
+    else:
+        dosha_analysis = preferences.get("dosha_analysis") or dict(DEFAULT_DOSHA_ANALYSIS)
+
+    return {
+        "patient_id": patient.id,
+        "profile": profile,
+        "dosha_analysis": dosha_analysis
+    }
+
+
+def plan_group_key(job: Dict[str, Any]) -> Tuple[str, Tuple[str, ...], Tuple[str, ...]]:
+    """Key under which patients share the same filtered food/exercise sets"""
+    profile = job["profile"]
+    dosha_analysis = job.get("dosha_analysis") or DEFAULT_DOSHA_ANALYSIS
+    dominant_dosha = max(dosha_analysis, key=dosha_analysis.get)
+    return (
+        dominant_dosha,
+        tuple(sorted(profile.get("dietary_restrictions") or [])),
+        tuple(sorted(profile.get("medical_conditions") or []))
+    )
+
+
+class BatchPlanGenerator:
+    """
+    Generates plans for N patients x D days.
+    Patients are grouped by (dosha, restrictions, conditions) so each group's
+    filtered food set is computed once and reused for every patient and day.
+    """
+
+    def __init__(self, nutrition_engine: Optional[NutritionalEngine] = None, workout_engine: Optional[WorkoutEngine] = None):
+        self.nutrition_engine = nutrition_engine or NutritionalEngine()
+        self.workout_engine = workout_engine or WorkoutEngine()
+
+    def generate_plan(self, job: Dict[str, Any], days: int, plan_types: List[str]) -> Dict[str, Any]:
+        """Generate the requested plans for a single patient job"""
+        profile = job["profile"]
+        dominant_dosha = plan_group_key(job)[0]
+        result = {
+            "patient_id": job["patient_id"],
+            "dominant_dosha": dominant_dosha,
+            "days": days
+        }
+
+        try:
+            if "diet" in plan_types:
+                result["diet"] = self.nutrition_engine.generate_multi_day_plan(profile, dominant_dosha, days)
+
+            if "workout" in plan_types:
+                weeks = []
+                for week in range(math.ceil(days / 7)):
+                    seed = self.workout_engine.split_seed(profile, dominant_dosha, week=week)
+                    split = self.workout_engine.generate_split(profile, dominant_dosha, seed=seed)
+                    weeks.append(split["weekly_scedule"])
+                result["workout"] = {
+                    "structure": split["structure"],
+                    "parameters": split["parameters"],
+                    "weeks": weeks
+                }
+        except Exception as e:
+            logger.error(f"Batch plan generation failed for patient {job['patient_id']}: {e}")
+            return {"patient_id": job["patient_id"], "error": str(e)}
+
+        return result
+
+    def generate(self, jobs: List[Dict[str, Any]], days: int = 7, plan_types: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Generate plans in-process, yielding one result per patient"""
+        plan_types = plan_types or list(SUPPORTED_PLAN_TYPES)
+        for job in sorted(jobs, key=plan_group_key):
+            yield self.generate_plan(job, days, plan_types)
+
+
+# Per-process generator used by pool workers (and by in-process batches)
+_worker_generator = None
+
+def _get_worker_generator() -> BatchPlanGenerator:
+    global _worker_generator
+
+    if _worker_generator is None:
+        _worker_generator = BatchPlanGenerator()
+
+    return _worker_generator
+
+def _generate_chunk(jobs: List[Dict[str, Any]], days: int, plan_types: List[str]) -> List[Dict[str, Any]]:
+    """Process pool entry point - must stay module level to be picklable"""
+    return list(_get_worker_generator().generate(jobs, days, plan_types))
+
+
+def chunk_jobs(jobs: List[Dict[str, Any]], chunk_size: int = CHUNK_SIZE) -> List[List[Dict[str, Any]]]:
+    """Split jobs into chunks, keeping patients that share a group key next to each other"""
+    ordered = sorted(jobs, key=plan_group_key)
+    return [ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size)]
+
+
+# Process pool singleton
+_process_pool = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get or create the shared plan generation process pool"""
+    global _process_pool
+
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+
+    return _process_pool
+
+def shutdown_process_pool():
+    """Shut down the process pool (called on application shutdown)"""
+    global _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def generate_batch(jobs: List[Dict[str, Any]], days: int = 7, plan_types: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generate plans for all jobs, yielding results as they become available.
+    Small batches run in-process; large ones are split into chunks on the process pool.
+    """
+    plan_types = plan_types or list(SUPPORTED_PLAN_TYPES)
+
+    if len(jobs) < PROCESS_POOL_THRESHOLD:
+        yield from _get_worker_generator().generate(jobs, days, plan_types)
+        return
+
+    pool = get_process_pool()
+    futures = [pool.submit(_generate_chunk, chunk, days, plan_types) for chunk in chunk_jobs(jobs)]
+    for future in as_completed(futures):
+        yield from future.result()
+
+
+def stream_batch_ndjson(jobs: List[Dict[str, Any]], days: int = 7, plan_types: Optional[List[str]] = None) -> Iterator[str]:
+    """Stream batch results as NDJSON lines, followed by a summary line"""
+    start = time.perf_counter()
+    generated = 0
+    failed = 0
+
+    for result in generate_batch(jobs, days, plan_types):
+        if "error" in result:
+            failed += 1
+        else:
+            generated += 1
+        yield json.dumps({"type": "plan", **result}, default=str) + "\n"
+
+    yield json.dumps({
+        "type": "summary",
+        "patients": len(jobs),
+        "generated": generated,
+        "failed": failed,
+        "days": days,
+        "elapsed_seconds": round(time.perf_counter() - start, 3)
+    }) + "\n"
@@ -0,0 +1,173 @@
+"""
+Plan Cache
+LRU cache of generated diet/workout plans keyed by a canonical profile bucket.
+Plans only depend on a handful of discretized profile features, so patients
+in the same bucket share one pre-rendered plan.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, List
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "2048"))
+
+# Band widths used to discretize continuous metrics (values snap to the nearest band centre)
+WEIGHT_BAND_KG = 5
+AGE_BAND_YEARS = 10
+HEIGHT_BAND_CM = 10
+
+# Engine defaults (see NutritionalEngine.calculate_needs / WorkoutEngine.generate_split)
+DEFAULT_WEIGHT = 70
+DEFAULT_HEIGHT = 170
+DEFAULT_AGE = 30
+
+
+def _band(value: Any, width: int, default: int) -> int:
+    """Snap a metric to the centre of its band, falling back to the engine default"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    return int(round(value / width) * width)
+
+def _normalized_list(values: Any) -> List[str]:
+    if not values:
+        return []
+    if isinstance(values, str):
+        values = [values]
+    return sorted({str(v).strip().lower() for v in values})
+
+def _frequency_days(frequency: Any) -> int:
+    try:
+        return int(str(frequency).split()[0]) if frequency else 3
+    except ValueError:
+        return 3
+
+
+def bucket_profile(plan_type: str, user_profile: Dict[str, Any], dosha_analysis: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Reduce a profile to the discretized features the given plan type depends on.
+    The result doubles as the representative profile used to generate the bucket's plan.
+    """
+    dominant_dosha = max(dosha_analysis, key=dosha_analysis.get)
+
+    if plan_type == 'diet_plan':
+        return {
+            'plan_type': plan_type,
+            'dosha': dominant_dosha,
+            'dietary_goal': (user_profile.get('dietary_goal') or 'maintenance').lower(),
+            'activity_level': (user_profile.get('activity_level') or 'moderately active').lower(),
+            'gender': (user_profile.get('gender') or 'female').lower(),
+            'dietary_restrictions': _normalized_list(user_profile.get('dietary_restrictions')),
+            'medical_conditions': _normalized_list(user_profile.get('medical_conditions')),
+            'weight': _band(user_profile.get('weight'), WEIGHT_BAND_KG, DEFAULT_WEIGHT),
+            'height': _band(user_profile.get('height'), HEIGHT_BAND_CM, DEFAULT_HEIGHT),
+            'age': _band(user_profile.get('age'), AGE_BAND_YEARS, DEFAULT_AGE),
+        }
+
+    if plan_type == 'workout_plan':
+        return {
+            'plan_type': plan_type,
+            'dosha': dominant_dosha,
+            'workout_goal': (user_profile.get('workout_goal') or 'general fitness').lower(),
+            'equipment_access': (user_profile.get('equipment_access') or 'home').lower(),
+            'frequency': f"{_frequency_days(user_profile.get('frequency'))} days",
+            'medical_conditions': _normalized_list(user_profile.get('medical_conditions')),
+        }
+
+    raise ValueError(f"Unknown plan type: {plan_type}")
+
+def bucket_key(bucket: Dict[str, Any]) -> str:
+    """Canonical hash of a profile bucket"""
+    return hashlib.sha256(json.dumps(bucket, sort_keys=True).encode()).hexdigest()
+
+
+class PlanCache:
+    """
+    Thread-safe LRU cache of plans.
+    Entries are dicts of {'data': structured plan, 'text': chat message, 'markdown': ask-ai rendering}
+    and must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_size: int = PLAN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key: str, factory: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the cached entry, building and storing it on a miss"""
+        entry = self.get(key)
+        if entry is None:
+            entry = factory()
+            self.put(key, entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+
+def common_profiles() -> List[Dict[str, Any]]:
+    """Profiles for the most common buckets, used to pre-warm the cache at startup"""
+    profiles = []
+    for goal in ['maintenance', 'weight loss', 'muscle building']:
+        for gender in ['female', 'male']:
+            for weight in [55, 65, 75, 85]:
+                profiles.append({'dietary_goal': goal, 'workout_goal': 'weight loss' if goal == 'weight loss' else 'general fitness',
+                                 'gender': gender, 'weight': weight})
+    for frequency in ['3 days', '4 days', '5 days']:
+        for equipment in ['home', 'gym']:
+            profiles.append({'frequency': frequency, 'equipment_access': equipment})
+    return profiles
+
+
+# Singleton instance
+_plan_cache = None
+
+def get_plan_cache() -> PlanCache:
+    """Get or create plan cache singleton"""
+    global _plan_cache
+
+    if _plan_cache is None:
+        _plan_cache = PlanCache()
+
+    return _plan_cache
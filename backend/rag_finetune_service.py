@@ -18,7 +18,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from fake_ai_backends import fake_backend_enabled, FakeGenerativeModel, FakeSentenceTransformer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,7 +35,10 @@ CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 
 # Initialize Gemini
-if GOOGLE_API_KEY:
+if fake_backend_enabled("gemini"):
+    logger.info("Using the fake Gemini backend (FAKE_AI_BACKENDS)")
+    model = FakeGenerativeModel('gemini-pro')
+elif GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
     model = genai.GenerativeModel('gemini-pro')
 else:
@@ -43,7 +47,11 @@ else:
 
 # Initialize embedding model
 try:
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    if fake_backend_enabled("embeddings"):
+        embedding_model = FakeSentenceTransformer(EMBEDDING_MODEL)
+    else:
+        from sentence_transformers import SentenceTransformer
+        embedding_model = SentenceTransformer(EMBEDDING_MODEL)
     logger.info(f"Loaded embedding model: {EMBEDDING_MODEL}")
 except Exception as e:
     logger.error(f"Error loading embedding model: {e}")
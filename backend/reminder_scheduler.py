@@ -0,0 +1,422 @@
+"""
+Reminder Scheduler
+Fires Reminder rows as Notifications at their next wall-clock time.
+
+Active reminders are held in a min-heap keyed by their next fire time (naive UTC).
+The heap is loaded from the database in id-ordered batches on startup and kept in
+sync by SQLAlchemy session events, so the background task only ever looks at the
+head of the heap instead of polling the reminders table. Reminder times are stored
+in several formats ("08:00", "8:00 AM", "8am"); they are normalised here and
+interpreted in the reminder's time zone (SCHEDULE_TIMEZONE when unset).
+"""
+
+import os
+import heapq
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, time, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import Reminder
+from scheduling_engine import normalize_datetime
+from availability_engine import SCHEDULE_TIMEZONE, parse_schedule_time
+from notification_service import get_notification_service
+
+logger = logging.getLogger(__name__)
+
+UTC = dt_timezone.utc
+
+FREQUENCIES = ("daily", "weekly", "once")
+LOAD_BATCH_SIZE = 1000
+# Upper bound on how long the loop sleeps, so clock jumps are picked up
+MAX_SLEEP_SECONDS = 60
+# Fired reminder notifications are purged by the notification sweeper after this
+NOTIFICATION_TTL = timedelta(hours=int(os.getenv("REMINDER_NOTIFICATION_TTL_HOURS", "24")))
+
+
+def normalize_reminder_time(value: Optional[str]) -> Optional[time]:
+    """Parse "08:00", "8:00 AM", "8am", "8 PM", "0800" or "08.00" into a time"""
+    parsed = parse_schedule_time(value or "")
+    if parsed is not None:
+        return parsed
+
+    cleaned = (value or "").strip().upper().replace(".", ":")
+    for fmt in ("%H:%M", "%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H%M"):
+        try:
+            return datetime.strptime(cleaned, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+def format_reminder_time(value: Optional[str]) -> Optional[str]:
+    """Canonical "HH:MM" form of a reminder time, or None if it cannot be parsed"""
+    parsed = normalize_reminder_time(value)
+    return parsed.strftime("%H:%M") if parsed else None
+
+def resolve_timezone(name: Optional[str]) -> ZoneInfo:
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Unknown reminder time zone {name!r}, using {SCHEDULE_TIMEZONE.key}")
+    return SCHEDULE_TIMEZONE
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def _to_utc(day, at: time, tz: ZoneInfo) -> datetime:
+    local = datetime.combine(day, at).replace(tzinfo=tz)
+    return normalize_datetime(local)
+
+def next_fire_time(frequency: str, at: time, tz: ZoneInfo, after: datetime,
+                   anchor: Optional[datetime] = None) -> datetime:
+    """
+    First fire time (naive UTC) strictly after `after`.
+    Weekly reminders repeat on the weekday of `anchor` (their creation time);
+    "once" reminders fire at the first occurrence after `anchor`, even if that has passed.
+    """
+    after = normalize_datetime(after)
+    anchor = normalize_datetime(anchor) if anchor else after
+    if frequency == "once":
+        after = anchor
+
+    day = after.replace(tzinfo=UTC).astimezone(tz).date()
+    step = timedelta(days=1)
+    if frequency == "weekly":
+        weekday = anchor.replace(tzinfo=UTC).astimezone(tz).weekday()
+        day += timedelta(days=(weekday - day.weekday()) % 7)
+        step = timedelta(days=7)
+
+    candidate = _to_utc(day, at, tz)
+    while candidate <= after:
+        day += step
+        candidate = _to_utc(day, at, tz)
+    return candidate
+
+
+class ReminderEntry:
+    __slots__ = ("reminder_id", "user_id", "title", "message", "frequency", "at", "tz", "anchor", "fire_at")
+
+    def __init__(self, reminder_id: int, user_id: int, title: str, message: Optional[str], frequency: str,
+                 at: time, tz: ZoneInfo, anchor: datetime, fire_at: datetime):
+        self.reminder_id = reminder_id
+        self.user_id = user_id
+        self.title = title
+        self.message = message
+        self.frequency = frequency
+        self.at = at
+        self.tz = tz
+        self.anchor = anchor
+        self.fire_at = fire_at
+
+
+class ReminderScheduler:
+    """
+    Min-heap of (fire_at, reminder_id, version). Updates and removals bump the
+    reminder's version so superseded heap items are skipped when they surface.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, int]] = []
+        self._entries: Dict[int, Tuple[int, ReminderEntry]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.loaded = False
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._fired_total = 0
+        self._batches_total = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._total_lag = 0.0
+        self._last_run: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ==================== INDEX ====================
+
+    def rebuild(self, db: Session, now: Optional[datetime] = None):
+        """Load all active reminders, in id-ordered batches"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._heap = []
+            self._entries = {}
+
+        last_id = 0
+        while True:
+            batch = db.query(Reminder).filter(
+                Reminder.is_active == True,
+                Reminder.id > last_id
+            ).order_by(Reminder.id).limit(LOAD_BATCH_SIZE).all()
+            if not batch:
+                break
+            for reminder in batch:
+                self.schedule(reminder.id, reminder.user_id, reminder.title, reminder.message,
+                              reminder.frequency, reminder.time, reminder.timezone, reminder.created_at, now)
+            last_id = batch[-1].id
+
+        with self._lock:
+            self.loaded = True
+        logger.info(f"Reminder scheduler loaded {len(self._entries)} active reminders")
+
+    def schedule(self, reminder_id: int, user_id: int, title: str, message: Optional[str], frequency: Optional[str],
+                 time_value: str, timezone: Optional[str] = None, created_at: Optional[datetime] = None,
+                 now: Optional[datetime] = None) -> Optional[datetime]:
+        """Insert or replace a reminder; returns its next fire time (None if it cannot be scheduled)"""
+        now = now or datetime.utcnow()
+        at = normalize_reminder_time(time_value)
+        frequency = (frequency or "daily").lower()
+        if at is None or frequency not in FREQUENCIES:
+            logger.warning(f"Skipping reminder {reminder_id}: unsupported time {time_value!r} / frequency {frequency!r}")
+            self.unschedule(reminder_id)
+            return None
+
+        tz = resolve_timezone(timezone)
+        anchor = created_at or now
+        fire_at = next_fire_time(frequency, at, tz, now, anchor)
+        entry = ReminderEntry(reminder_id, user_id, title, message, frequency, at, tz, anchor, fire_at)
+
+        with self._lock:
+            self._version += 1
+            self._entries[reminder_id] = (self._version, entry)
+            heapq.heappush(self._heap, (fire_at, reminder_id, self._version))
+            is_head = self._heap[0][2] == self._version
+
+        if is_head:
+            self._wake()
+        return fire_at
+
+    def unschedule(self, reminder_id: int):
+        with self._lock:
+            self._entries.pop(reminder_id, None)
+
+    def next_fire_at(self) -> Optional[datetime]:
+        with self._lock:
+            self._drop_stale_head()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale_head(self):
+        while self._heap:
+            _, reminder_id, version = self._heap[0]
+            current = self._entries.get(reminder_id)
+            if current is not None and current[0] == version:
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now: datetime) -> List[Tuple[int, ReminderEntry]]:
+        """
+        Pop every reminder due at or before `now` off the heap, as (version, entry).
+        Entries stay registered so fire_due can tell whether they changed meanwhile.
+        """
+        due = []
+        with self._lock:
+            while True:
+                self._drop_stale_head()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, reminder_id, version = heapq.heappop(self._heap)
+                due.append(self._entries[reminder_id])
+        return due
+
+    def _requeue(self, version: int, entry: ReminderEntry):
+        """Push an entry back if it is still the current version of its reminder"""
+        current = self._entries.get(entry.reminder_id)
+        if current is not None and current[0] == version:
+            heapq.heappush(self._heap, (entry.fire_at, entry.reminder_id, version))
+
+    # ==================== FIRING ====================
+
+    def fire_due(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Emit notifications for due reminders in one batch and reschedule recurring ones"""
+        now = now or datetime.utcnow()
+        due = self.pop_due(now)
+        self._last_run = now
+        if not due:
+            return 0
+
+        rows = [{
+            "user_id": entry.user_id,
+            "title": entry.title,
+            "message": entry.message or entry.title,
+            "type": "reminder",
+            "priority": "normal",
+            "action_url": "/reminders",
+            "expires_at": entry.fire_at + NOTIFICATION_TTL
+        } for _, entry in due]
+
+        try:
+            get_notification_service().create_notifications(db, rows)
+        except Exception:
+            db.rollback()
+            # Put the batch back so it is retried on the next tick
+            with self._lock:
+                for version, entry in due:
+                    self._requeue(version, entry)
+            raise
+
+        finished = [entry.reminder_id for _, entry in due if entry.frequency == "once"]
+        if finished:
+            db.query(Reminder).filter(Reminder.id.in_(finished)).update(
+                {Reminder.is_active: False}, synchronize_session=False
+            )
+            db.commit()
+
+        with self._lock:
+            for version, entry in due:
+                lag = (now - entry.fire_at).total_seconds()
+                self._last_lag = lag
+                self._max_lag = max(self._max_lag, lag)
+                self._total_lag += lag
+
+                if entry.frequency == "once":
+                    current = self._entries.get(entry.reminder_id)
+                    if current is not None and current[0] == version:
+                        del self._entries[entry.reminder_id]
+                    continue
+                # Skipped if the reminder was edited or deleted while firing
+                entry.fire_at = next_fire_time(entry.frequency, entry.at, entry.tz, now, entry.anchor)
+                self._requeue(version, entry)
+
+            self._fired_total += len(due)
+            self._batches_total += 1
+
+        logger.info(f"Fired {len(due)} reminders")
+        return len(due)
+
+    def metrics(self) -> Dict[str, object]:
+        with self._lock:
+            self._drop_stale_head()
+            next_fire = self._heap[0][0] if self._heap else None
+            return {
+                "queue_depth": len(self._entries),
+                "heap_size": len(self._heap),
+                "next_fire_at": next_fire,
+                "fired_total": self._fired_total,
+                "batches_total": self._batches_total,
+                "last_lag_seconds": round(self._last_lag, 3),
+                "max_lag_seconds": round(self._max_lag, 3),
+                "avg_lag_seconds": round(self._total_lag / self._fired_total, 3) if self._fired_total else 0.0,
+                "last_run_at": self._last_run,
+                "running": self._task is not None
+            }
+
+    # ==================== BACKGROUND LOOP ====================
+
+    def start(self, session_factory):
+        """Start the background task that sleeps until the next reminder is due"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _wake(self):
+        """Re-evaluate the sleep deadline; callable from any thread"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self, session_factory):
+        while True:
+            try:
+                await asyncio.to_thread(self._fire_once, session_factory)
+            except Exception as e:
+                logger.error(f"Reminder delivery failed: {e}")
+
+            next_fire = self.next_fire_at()
+            delay = MAX_SLEEP_SECONDS
+            if next_fire is not None:
+                delay = min(delay, max(0.0, (next_fire - datetime.utcnow()).total_seconds()))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire_once(self, session_factory):
+        next_fire = self.next_fire_at()
+        if next_fire is None or next_fire > datetime.utcnow():
+            return
+        db = session_factory()
+        try:
+            self.fire_due(db)
+        finally:
+            db.close()
+
+
+# ==================== SESSION EVENT HOOKS ====================
+# Reminder changes are applied to the heap once the transaction commits.
+
+_PENDING_KEY = "reminder_scheduler_pending"
+
+def _record_change(target: Reminder, deleted: bool = False):
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault(_PENDING_KEY, []).append((
+        target.id, target.user_id, target.title, target.message, target.frequency,
+        target.time, target.timezone, target.created_at, bool(target.is_active) and not deleted
+    ))
+
+@event.listens_for(Reminder, "after_insert")
+def _reminder_inserted(mapper, connection, target):
+    _record_change(target)
+
+@event.listens_for(Reminder, "after_update")
+def _reminder_updated(mapper, connection, target):
+    _record_change(target)
+
+@event.listens_for(Reminder, "after_delete")
+def _reminder_deleted(mapper, connection, target):
+    _record_change(target, deleted=True)
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or _reminder_scheduler is None or not _reminder_scheduler.loaded:
+        return
+
+    for reminder_id, user_id, title, message, frequency, time_value, timezone, created_at, active in pending:
+        if active:
+            _reminder_scheduler.schedule(reminder_id, user_id, title, message, frequency,
+                                         time_value, timezone, created_at)
+        else:
+            _reminder_scheduler.unschedule(reminder_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Singleton instance
+_reminder_scheduler = None
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    """Get or create reminder scheduler singleton"""
+    global _reminder_scheduler
+
+    if _reminder_scheduler is None:
+        _reminder_scheduler = ReminderScheduler()
+
+    return _reminder_scheduler
@@ -0,0 +1,262 @@
+"""
+Report Queries
+Aggregations behind the practitioner /reports endpoints.
+
+Each report is computed with a single grouped query using conditional aggregation
+(COUNT plus SUM(CASE ...)) instead of one COUNT per category, and is always scoped
+to the requesting practitioner. Whole-day windows are read from the daily rollup
+tables (report_rollups.py); per-patient reports, and every report when
+ROLLUPS_ENABLED is off, aggregate the raw rows.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import func, case, extract
+from sqlalchemy.orm import Session
+
+from models import Appointment, AppointmentStatus, Feedback, DailyPractitionerStats, DailyFeedbackStats
+
+logger = logging.getLogger(__name__)
+
+
+def month_range(start: datetime, end: datetime) -> List[Tuple[int, int]]:
+    """(year, month) pairs from start's month through end's month, inclusive"""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+def success_rate(completed: int, total: int) -> float:
+    return round(completed / total * 100, 1) if total > 0 else 0.0
+
+
+# ==================== TREATMENTS ====================
+
+def treatment_rows(db: Session, practitioner_id: int, since: datetime,
+                   patient_id: Optional[int] = None) -> List[Tuple[str, int, int, int, int]]:
+    """(therapy_type, year, month, total, completed) for the practitioner's appointments since a date"""
+    year = extract("year", Appointment.scheduled_datetime)
+    month = extract("month", Appointment.scheduled_datetime)
+    query = db.query(
+        Appointment.therapy_type,
+        year,
+        month,
+        func.count(Appointment.id),
+        func.sum(case((Appointment.status == AppointmentStatus.COMPLETED, 1), else_=0))
+    ).filter(
+        Appointment.practitioner_id == practitioner_id,
+        Appointment.scheduled_datetime >= since
+    )
+    if patient_id:
+        query = query.filter(Appointment.patient_id == patient_id)
+    rows = query.group_by(Appointment.therapy_type, year, month).all()
+    return [(therapy_type, int(y), int(m), total, int(completed or 0)) for therapy_type, y, m, total, completed in rows]
+
+
+def summarize_treatments(rows: List[Tuple[str, int, int, int, int]], since: datetime,
+                         until: datetime) -> Dict[str, Any]:
+    """Fold (type, year, month, total, completed) rows into the TreatmentAnalyticsResponse shape"""
+    by_type: Dict[str, List[int]] = {}
+    by_month: Dict[Tuple[int, int], List[int]] = {}
+    for therapy_type, year, month, total, completed in rows:
+        type_totals = by_type.setdefault(therapy_type, [0, 0])
+        type_totals[0] += total
+        type_totals[1] += completed
+        month_totals = by_month.setdefault((year, month), [0, 0])
+        month_totals[0] += total
+        month_totals[1] += completed
+
+    total_treatments = sum(total for total, _ in by_type.values())
+    completed_treatments = sum(completed for _, completed in by_type.values())
+
+    type_distribution = [
+        {"type": therapy_type, "count": total, "success_rate": success_rate(completed, total)}
+        for therapy_type, (total, completed) in sorted(by_type.items())
+    ]
+
+    # Every month in the window, including empty ones, so charts have a continuous axis
+    months = month_range(since, until)
+    for key in by_month:
+        if key not in months:
+            months.append(key)
+    monthly_trends = []
+    for year, month in sorted(months):
+        total, completed = by_month.get((year, month), (0, 0))
+        monthly_trends.append({
+            "month": datetime(year, month, 1).strftime("%b"),
+            "year": year,
+            "count": total,
+            "completed": completed,
+            "success_rate": success_rate(completed, total)
+        })
+
+    return {
+        "total_treatments": total_treatments,
+        "success_rate_overall": success_rate(completed_treatments, total_treatments),
+        "type_distribution": type_distribution,
+        "monthly_trends": monthly_trends
+    }
+
+
+def treatment_rows_from_rollups(db: Session, practitioner_id: int, since: date) -> List[Tuple[str, int, int, int, int]]:
+    """Same rows as treatment_rows(), summed from daily_practitioner_stats"""
+    stats = DailyPractitionerStats
+    year = extract("year", stats.day)
+    month = extract("month", stats.day)
+    rows = db.query(
+        stats.therapy_type, year, month, func.sum(stats.total), func.sum(stats.completed)
+    ).filter(
+        stats.practitioner_id == practitioner_id,
+        stats.day >= since
+    ).group_by(stats.therapy_type, year, month).all()
+    return [(therapy_type, int(y), int(m), int(total), int(completed)) for therapy_type, y, m, total, completed in rows]
+
+
+def treatment_analytics(db: Session, practitioner_id: int, since: datetime,
+                        patient_id: Optional[int] = None, until: Optional[datetime] = None,
+                        use_rollups: bool = True) -> Dict[str, Any]:
+    """Treatment totals, per-type success rates and monthly trends in one grouped query"""
+    if not use_rollups or patient_id or since.time() != datetime.min.time():
+        rows = treatment_rows(db, practitioner_id, since, patient_id)
+    else:
+        rows = treatment_rows_from_rollups(db, practitioner_id, since.date())
+    return summarize_treatments(rows, since, until or datetime.utcnow())
+
+
+# ==================== APPOINTMENT SUMMARY ====================
+
+def appointment_summary_from_rollups(db: Session, practitioner_id: int, since: date,
+                                     until: Optional[date] = None) -> Dict[str, Any]:
+    """Appointment total, per-status counts and therapies by popularity over whole days"""
+    stats = DailyPractitionerStats
+    status_columns = [getattr(stats, status.value) for status in AppointmentStatus]
+    query = db.query(
+        stats.therapy_type, func.sum(stats.total), *[func.sum(column) for column in status_columns]
+    ).filter(
+        stats.practitioner_id == practitioner_id,
+        stats.day >= since
+    )
+    if until is not None:
+        query = query.filter(stats.day < until)
+
+    total = 0
+    status_counts = {status.value: 0 for status in AppointmentStatus}
+    therapies = []
+    for therapy_type, type_total, *by_status in query.group_by(stats.therapy_type).all():
+        total += int(type_total or 0)
+        therapies.append((therapy_type, int(type_total or 0)))
+        for status, count in zip(AppointmentStatus, by_status):
+            status_counts[status.value] += int(count or 0)
+
+    therapies.sort(key=lambda item: (-item[1], item[0]))
+    return {"total": total, "status_counts": status_counts, "therapies": therapies}
+
+
+def appointment_summary(db: Session, practitioner_id: int, since: date,
+                        until: Optional[date] = None) -> Dict[str, Any]:
+    """Same as appointment_summary_from_rollups(), grouped over the raw appointments"""
+    query = db.query(Appointment.therapy_type, Appointment.status, func.count(Appointment.id)).filter(
+        Appointment.practitioner_id == practitioner_id,
+        Appointment.scheduled_datetime >= datetime.combine(since, datetime.min.time())
+    )
+    if until is not None:
+        query = query.filter(Appointment.scheduled_datetime < datetime.combine(until, datetime.min.time()))
+
+    total = 0
+    status_counts = {status.value: 0 for status in AppointmentStatus}
+    by_type: Dict[str, int] = {}
+    for therapy_type, status, count in query.group_by(Appointment.therapy_type, Appointment.status).all():
+        total += count
+        by_type[therapy_type] = by_type.get(therapy_type, 0) + count
+        # Rows without a (known) status count towards the totals only, as in the rollup columns
+        status = getattr(status, "value", status)
+        if status in status_counts:
+            status_counts[status] += count
+
+    therapies = sorted(by_type.items(), key=lambda item: (-item[1], item[0]))
+    return {"total": total, "status_counts": status_counts, "therapies": therapies}
+
+
+def appointment_total_from_rollups(db: Session) -> int:
+    return int(db.query(func.coalesce(func.sum(DailyPractitionerStats.total), 0)).scalar())
+
+
+def appointment_total(db: Session) -> int:
+    return db.query(func.count(Appointment.id)).scalar()
+
+
+# ==================== FEEDBACK ====================
+
+FEEDBACK_DIMENSIONS = ("therapy_effectiveness", "practitioner_professionalism", "facility_cleanliness")
+
+
+def _average(total, count) -> Optional[float]:
+    return round(float(total) / count, 2) if count else None
+
+
+def summarize_feedback(reviews: int, rating_sum: int, distribution: List[int],
+                       dimension_totals: List[Tuple[int, int]], recommend_yes: int,
+                       recommend_count: int) -> Dict[str, Any]:
+    return {
+        "total_reviews": reviews,
+        "average_rating": round(rating_sum / reviews, 1) if reviews else 0.0,
+        "rating_distribution": {rating: count for rating, count in zip(range(1, 6), distribution)},
+        "dimension_averages": {
+            name: _average(total, count) for name, (total, count) in zip(FEEDBACK_DIMENSIONS, dimension_totals)
+        },
+        "would_recommend_ratio": _average(recommend_yes, recommend_count)
+    }
+
+
+def feedback_summary_from_rollups(db: Session, practitioner_id: int, since: Optional[date] = None,
+                                  until: Optional[date] = None) -> Dict[str, Any]:
+    """Review count, rating histogram and per-dimension averages in one query over daily_feedback_stats"""
+    stats = DailyFeedbackStats
+    columns = [stats.reviews, stats.rating_sum, stats.rating_1, stats.rating_2, stats.rating_3, stats.rating_4,
+               stats.rating_5, stats.effectiveness_sum, stats.effectiveness_count, stats.professionalism_sum,
+               stats.professionalism_count, stats.cleanliness_sum, stats.cleanliness_count,
+               stats.recommend_yes, stats.recommend_count]
+    query = db.query(*[func.sum(column) for column in columns]).filter(stats.practitioner_id == practitioner_id)
+    if since is not None:
+        query = query.filter(stats.day >= since)
+    if until is not None:
+        query = query.filter(stats.day <= until)
+
+    values = [int(value or 0) for value in query.one()]
+    return summarize_feedback(values[0], values[1], values[2:7],
+                              [(values[7], values[8]), (values[9], values[10]), (values[11], values[12])],
+                              values[13], values[14])
+
+
+def feedback_summary(db: Session, practitioner_id: int, since: Optional[date] = None,
+                     until: Optional[date] = None) -> Dict[str, Any]:
+    """Same as feedback_summary_from_rollups(), as one conditional-aggregation query over raw feedback"""
+    day = func.date(Feedback.created_at)
+    dimension_columns = []
+    for name in FEEDBACK_DIMENSIONS:
+        column = getattr(Feedback, name)
+        dimension_columns += [func.sum(column), func.count(column)]
+    query = db.query(
+        func.count(Feedback.id),
+        func.sum(Feedback.rating),
+        *[func.sum(case((Feedback.rating == rating, 1), else_=0)) for rating in range(1, 6)],
+        *dimension_columns,
+        func.sum(case((Feedback.would_recommend.is_(True), 1), else_=0)),
+        func.count(Feedback.would_recommend)
+    ).filter(Feedback.practitioner_id == practitioner_id)
+    if since is not None:
+        query = query.filter(day >= since.isoformat())
+    if until is not None:
+        query = query.filter(day <= until.isoformat())
+
+    values = [int(value or 0) for value in query.one()]
+    return summarize_feedback(values[0], values[1], values[2:7],
+                              [(values[7], values[8]), (values[9], values[10]), (values[11], values[12])],
+                              values[13], values[14])
@@ -0,0 +1,411 @@
+"""
+Report Rollups
+Daily aggregate tables behind the report and dashboard endpoints.
+
+daily_practitioner_stats holds appointment counts per practitioner, day and therapy
+type (broken down by status), and daily_feedback_stats holds feedback aggregates
+per practitioner and day. Reports sum a few rows per day instead of scanning the
+raw appointments and feedback tables.
+
+Rollups are kept current in two ways:
+  * on write: a Session after_flush hook recomputes the (practitioner, day) buckets
+    touched by the flushed appointments and feedback, inside the same transaction,
+    so a rollback discards them together with the change itself;
+  * catch-up: a background job recomputes the buckets of rows created or updated
+    since a stored watermark, which covers bulk loads and other writes that bypass
+    the ORM. Without a watermark the job rebuilds everything.
+
+Recomputing whole buckets from the raw rows (rather than applying +1/-1 deltas)
+keeps both paths idempotent. check_consistency() compares rollups against raw
+aggregates and can repair any bucket that drifted, e.g. after raw SQL deletes.
+
+Practitioner.rating and total_reviews are updated with a single relative UPDATE
+whenever feedback is inserted, and recomputed from scratch by rebuild().
+"""
+
+import os
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select, delete, update, func, case, or_, inspect
+from sqlalchemy.orm import Session
+
+from database import engine
+from models import (
+    Appointment, AppointmentStatus, Feedback, Practitioner, DailyPractitionerStats, DailyFeedbackStats, RollupWatermark
+)
+from scheduling_engine import normalize_datetime
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() in ("1", "true", "yes")
+CATCHUP_INTERVAL_SECONDS = int(os.getenv("ROLLUP_CATCHUP_INTERVAL", "300"))
+# Re-scan this far behind the watermark to cover in-flight transactions and clock skew
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+APPOINTMENTS = Appointment.__table__
+FEEDBACK = Feedback.__table__
+PRACTITIONERS = Practitioner.__table__
+APPOINTMENT_STATS = DailyPractitionerStats.__table__
+FEEDBACK_STATS = DailyFeedbackStats.__table__
+
+STATUS_COLUMNS = [status.value for status in AppointmentStatus]
+APPOINTMENT_STATS_COLUMNS = ["day", "practitioner_id", "therapy_type", "total"] + STATUS_COLUMNS + ["duration_minutes"]
+FEEDBACK_STATS_COLUMNS = [
+    "day", "practitioner_id", "reviews", "rating_sum", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5",
+    "effectiveness_sum", "effectiveness_count", "professionalism_sum", "professionalism_count",
+    "cleanliness_sum", "cleanliness_count", "recommend_yes", "recommend_count"
+]
+
+# Attributes whose change moves an appointment or feedback row between buckets or counters
+APPOINTMENT_FIELDS = ("practitioner_id", "scheduled_datetime", "therapy_type", "status", "duration_minutes")
+FEEDBACK_FIELDS = ("practitioner_id", "created_at", "rating", "therapy_effectiveness",
+                   "practitioner_professionalism", "facility_cleanliness", "would_recommend")
+
+Bucket = Tuple[int, date]
+
+
+def day_of(value: Any) -> Optional[date]:
+    """UTC calendar day of a datetime (or a stored 'YYYY-MM-DD...' string)"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return normalize_datetime(value).date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+# ==================== AGGREGATE QUERIES ====================
+
+def _sum_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def appointment_rollup_select(*conditions):
+    """Raw appointments grouped into daily_practitioner_stats rows"""
+    a = APPOINTMENTS.c
+    day = func.date(a.scheduled_datetime)
+    columns = [day, a.practitioner_id, a.therapy_type, func.count()]
+    columns += [_sum_if(a.status == status) for status in STATUS_COLUMNS]
+    columns.append(func.coalesce(func.sum(func.coalesce(a.duration_minutes, 0)), 0))
+    return select(*columns).where(*conditions).group_by(day, a.practitioner_id, a.therapy_type)
+
+def feedback_rollup_select(*conditions):
+    """Raw feedback grouped into daily_feedback_stats rows"""
+    f = FEEDBACK.c
+    day = func.date(f.created_at)
+    columns = [day, f.practitioner_id, func.count(), func.coalesce(func.sum(f.rating), 0)]
+    columns += [_sum_if(f.rating == rating) for rating in range(1, 6)]
+    for column in (f.therapy_effectiveness, f.practitioner_professionalism, f.facility_cleanliness):
+        columns += [func.coalesce(func.sum(column), 0), func.count(column)]
+    columns += [_sum_if(f.would_recommend.is_(True)), func.count(f.would_recommend)]
+    return select(*columns).where(*conditions).group_by(day, f.practitioner_id)
+
+
+def recompute_appointment_buckets(connection, buckets: Iterable[Bucket]):
+    for practitioner_id, day in buckets:
+        start, end = _day_bounds(day)
+        connection.execute(delete(APPOINTMENT_STATS).where(
+            APPOINTMENT_STATS.c.practitioner_id == practitioner_id, APPOINTMENT_STATS.c.day == day
+        ))
+        connection.execute(APPOINTMENT_STATS.insert().from_select(APPOINTMENT_STATS_COLUMNS, appointment_rollup_select(
+            APPOINTMENTS.c.practitioner_id == practitioner_id,
+            APPOINTMENTS.c.scheduled_datetime >= start,
+            APPOINTMENTS.c.scheduled_datetime < end
+        )))
+
+def recompute_feedback_buckets(connection, buckets: Iterable[Bucket]):
+    for practitioner_id, day in buckets:
+        connection.execute(delete(FEEDBACK_STATS).where(
+            FEEDBACK_STATS.c.practitioner_id == practitioner_id, FEEDBACK_STATS.c.day == day
+        ))
+        # created_at may be a server default stored without microseconds, so match on the
+        # calendar day rather than a datetime range
+        connection.execute(FEEDBACK_STATS.insert().from_select(FEEDBACK_STATS_COLUMNS, feedback_rollup_select(
+            FEEDBACK.c.practitioner_id == practitioner_id,
+            func.date(FEEDBACK.c.created_at) == day.isoformat()
+        )))
+
+
+def add_practitioner_review(connection, practitioner_id: int, rating: int):
+    """Fold one new rating into the practitioner's running average (SET reads the pre-update values)"""
+    reviews = func.coalesce(PRACTITIONERS.c.total_reviews, 0)
+    connection.execute(update(PRACTITIONERS).where(PRACTITIONERS.c.id == practitioner_id).values(
+        total_reviews=reviews + 1,
+        rating=(func.coalesce(PRACTITIONERS.c.rating, 0.0) * reviews + rating) / (reviews + 1.0)
+    ))
+
+def recompute_practitioner_ratings(connection):
+    """Set every practitioner's rating and total_reviews from the feedback table"""
+    f = FEEDBACK.c
+    mine = f.practitioner_id == PRACTITIONERS.c.id
+    connection.execute(update(PRACTITIONERS).values(
+        total_reviews=select(func.count()).where(mine).scalar_subquery(),
+        rating=func.coalesce(select(func.avg(f.rating)).where(mine).scalar_subquery(), 0.0)
+    ))
+
+
+class ReportRollups:
+    """Catch-up, rebuild and consistency checks for the rollup tables"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    # ==================== CATCH-UP ====================
+
+    def rebuild(self) -> Dict[str, int]:
+        """Recompute both rollup tables from scratch"""
+        now = datetime.utcnow()
+        with engine.begin() as connection:
+            counts = {
+                "appointments": self._rebuild_table(connection, APPOINTMENT_STATS, APPOINTMENT_STATS_COLUMNS,
+                                                    appointment_rollup_select()),
+                "feedback": self._rebuild_table(connection, FEEDBACK_STATS, FEEDBACK_STATS_COLUMNS,
+                                                feedback_rollup_select())
+            }
+            self._set_watermark(connection, "appointments", now)
+            self._set_watermark(connection, "feedback", now)
+            recompute_practitioner_ratings(connection)
+        logger.info(f"Rebuilt report rollups: {counts}")
+        return counts
+
+    @staticmethod
+    def _rebuild_table(connection, table, columns, source) -> int:
+        connection.execute(delete(table))
+        connection.execute(table.insert().from_select(columns, source))
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+    def catch_up(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Recompute the buckets of rows changed since the watermarks; returns buckets recomputed per table"""
+        now = now or datetime.utcnow()
+        with engine.connect() as connection:
+            watermarks = dict(connection.execute(select(RollupWatermark.name, RollupWatermark.watermark)).all())
+        if "appointments" not in watermarks or "feedback" not in watermarks:
+            return self.rebuild()
+
+        a, f = APPOINTMENTS.c, FEEDBACK.c
+        result = {}
+        with engine.begin() as connection:
+            since = watermarks["appointments"] - WATERMARK_OVERLAP
+            buckets = self._changed_buckets(connection, select(a.practitioner_id, func.date(a.scheduled_datetime))
+                                            .where(or_(a.created_at >= since, a.updated_at >= since)).distinct())
+            recompute_appointment_buckets(connection, buckets)
+            self._set_watermark(connection, "appointments", now)
+            result["appointments"] = len(buckets)
+
+            since = watermarks["feedback"] - WATERMARK_OVERLAP
+            buckets = self._changed_buckets(connection, select(f.practitioner_id, func.date(f.created_at))
+                                            .where(f.created_at >= since).distinct())
+            recompute_feedback_buckets(connection, buckets)
+            self._set_watermark(connection, "feedback", now)
+            result["feedback"] = len(buckets)
+
+        if any(result.values()):
+            logger.info(f"Rollup catch-up recomputed {result}")
+        return result
+
+    @staticmethod
+    def _changed_buckets(connection, statement) -> Set[Bucket]:
+        return {(practitioner_id, day_of(day)) for practitioner_id, day in connection.execute(statement)
+                if practitioner_id is not None and day is not None}
+
+    @staticmethod
+    def _set_watermark(connection, name: str, watermark: datetime):
+        table = RollupWatermark.__table__
+        connection.execute(delete(table).where(table.c.name == name))
+        connection.execute(table.insert().values(name=name, watermark=watermark, updated_at=datetime.utcnow()))
+
+    def watermarks(self) -> Dict[str, datetime]:
+        with engine.connect() as connection:
+            return dict(connection.execute(select(RollupWatermark.name, RollupWatermark.watermark)).all())
+
+    # ==================== CONSISTENCY ====================
+
+    def check_consistency(self, since: Optional[date] = None, repair: bool = False) -> Dict[str, Any]:
+        """Compare per-bucket totals in the rollups with raw aggregates, optionally repairing mismatches"""
+        a, f = APPOINTMENTS.c, FEEDBACK.c
+        s, fs = APPOINTMENT_STATS.c, FEEDBACK_STATS.c
+        completed = _sum_if(a.status == AppointmentStatus.COMPLETED.value)
+
+        raw_appointments = select(a.practitioner_id, func.date(a.scheduled_datetime), func.count(), completed)
+        rolled_appointments = select(s.practitioner_id, s.day, func.sum(s.total), func.sum(s.completed))
+        raw_feedback = select(f.practitioner_id, func.date(f.created_at), func.count(), func.coalesce(func.sum(f.rating), 0))
+        rolled_feedback = select(fs.practitioner_id, fs.day, func.sum(fs.reviews), func.sum(fs.rating_sum))
+        if since is not None:
+            raw_appointments = raw_appointments.where(a.scheduled_datetime >= datetime.combine(since, time.min))
+            rolled_appointments = rolled_appointments.where(s.day >= since)
+            raw_feedback = raw_feedback.where(func.date(f.created_at) >= since.isoformat())
+            rolled_feedback = rolled_feedback.where(fs.day >= since)
+
+        with engine.connect() as connection:
+            appointment_mismatches = self._compare(
+                connection,
+                raw_appointments.group_by(a.practitioner_id, func.date(a.scheduled_datetime)),
+                rolled_appointments.group_by(s.practitioner_id, s.day)
+            )
+            feedback_mismatches = self._compare(
+                connection,
+                raw_feedback.group_by(f.practitioner_id, func.date(f.created_at)),
+                rolled_feedback.group_by(fs.practitioner_id, fs.day)
+            )
+
+        if repair and (appointment_mismatches or feedback_mismatches):
+            with engine.begin() as connection:
+                recompute_appointment_buckets(connection, [m[0] for m in appointment_mismatches])
+                recompute_feedback_buckets(connection, [m[0] for m in feedback_mismatches])
+            logger.warning(f"Repaired {len(appointment_mismatches)} appointment and "
+                           f"{len(feedback_mismatches)} feedback rollup buckets")
+
+        def describe(table: str, mismatches):
+            return [{"table": table, "practitioner_id": practitioner_id, "day": day,
+                     "expected": list(expected) if expected else [0, 0],
+                     "actual": list(actual) if actual else [0, 0]}
+                    for (practitioner_id, day), expected, actual in mismatches]
+
+        return {
+            "consistent": not appointment_mismatches and not feedback_mismatches,
+            "mismatches": describe(APPOINTMENT_STATS.name, appointment_mismatches)
+                          + describe(FEEDBACK_STATS.name, feedback_mismatches),
+            "repaired": bool(repair and (appointment_mismatches or feedback_mismatches))
+        }
+
+    @staticmethod
+    def _compare(connection, raw_statement, rolled_statement):
+        def load(statement):
+            return {(practitioner_id, day_of(day)): (int(first or 0), int(second or 0))
+                    for practitioner_id, day, first, second in connection.execute(statement)
+                    if practitioner_id is not None and day is not None}
+
+        raw, rolled = load(raw_statement), load(rolled_statement)
+        mismatches = []
+        for bucket in sorted(set(raw) | set(rolled)):
+            expected, actual = raw.get(bucket), rolled.get(bucket)
+            if (expected or (0, 0)) != (actual or (0, 0)):
+                mismatches.append((bucket, expected, actual))
+        return mismatches
+
+    # ==================== BACKGROUND ====================
+
+    def start(self):
+        """Run the catch-up job now and then every ROLLUP_CATCHUP_INTERVAL seconds"""
+        if ROLLUPS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._catch_up_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _catch_up_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.catch_up)
+            except Exception as e:
+                logger.error(f"Rollup catch-up failed: {e}")
+            await asyncio.sleep(CATCHUP_INTERVAL_SECONDS)
+
+
+# ==================== SESSION HOOKS ====================
+# Buckets touched by a flush are recomputed on the flush's own connection, so the
+# rollups commit or roll back atomically with the rows they summarize. The buckets
+# updated and deleted rows are leaving are read from the database before the flush,
+# since their previous values are usually expired after an earlier commit.
+
+_PREVIOUS_KEY = "report_rollups_previous"
+
+def _changed(target, fields: Tuple[str, ...]) -> bool:
+    state = inspect(target)
+    return state.deleted or any(state.attrs[name].history.has_changes() for name in fields)
+
+def _current_bucket(target, date_field: str, new: bool) -> Optional[Bucket]:
+    values = inspect(target).dict
+    practitioner_id, value = values.get("practitioner_id"), values.get(date_field)
+    if practitioner_id is None:
+        return None
+    if value is None:
+        # New rows relying on a server default timestamp are stamped "now"; an unloaded
+        # date on an existing row was captured before the flush
+        return (practitioner_id, datetime.utcnow().date()) if new else None
+    return practitioner_id, day_of(value)
+
+def _stored_buckets(connection, table, date_column, ids: List[int]) -> Set[Bucket]:
+    if not ids:
+        return set()
+    statement = select(table.c.practitioner_id, func.date(date_column)).where(table.c.id.in_(ids))
+    return {(practitioner_id, day_of(day)) for practitioner_id, day in connection.execute(statement)
+            if practitioner_id is not None and day is not None}
+
+@event.listens_for(Session, "before_flush")
+def _capture_previous_buckets(session, flush_context, instances):
+    if not ROLLUPS_ENABLED:
+        return
+
+    appointment_ids, feedback_ids = [], []
+    for target in list(session.dirty) + list(session.deleted):
+        state = inspect(target)
+        if state.key is None:
+            continue
+        if isinstance(target, Appointment) and (target in session.deleted or _changed(target, APPOINTMENT_FIELDS)):
+            appointment_ids.append(state.key[1][0])
+        elif isinstance(target, Feedback) and (target in session.deleted or _changed(target, FEEDBACK_FIELDS)):
+            feedback_ids.append(state.key[1][0])
+
+    if appointment_ids or feedback_ids:
+        connection = session.connection()
+        previous = session.info.setdefault(_PREVIOUS_KEY, (set(), set()))
+        previous[0].update(_stored_buckets(connection, APPOINTMENTS, APPOINTMENTS.c.scheduled_datetime, appointment_ids))
+        previous[1].update(_stored_buckets(connection, FEEDBACK, FEEDBACK.c.created_at, feedback_ids))
+
+@event.listens_for(Session, "after_flush")
+def _recompute_flushed_buckets(session, flush_context):
+    if not ROLLUPS_ENABLED:
+        return
+
+    appointment_buckets, feedback_buckets = session.info.pop(_PREVIOUS_KEY, (set(), set()))
+    for targets, new in ((session.new, True), (session.dirty, False)):
+        for target in targets:
+            if isinstance(target, Appointment) and (new or _changed(target, APPOINTMENT_FIELDS)):
+                bucket = _current_bucket(target, "scheduled_datetime", new)
+                if bucket:
+                    appointment_buckets.add(bucket)
+            elif isinstance(target, Feedback) and (new or _changed(target, FEEDBACK_FIELDS)):
+                bucket = _current_bucket(target, "created_at", new)
+                if bucket:
+                    feedback_buckets.add(bucket)
+
+    if appointment_buckets or feedback_buckets:
+        connection = session.connection()
+        recompute_appointment_buckets(connection, appointment_buckets)
+        recompute_feedback_buckets(connection, feedback_buckets)
+
+@event.listens_for(Feedback, "after_insert")
+def _feedback_inserted(mapper, connection, target):
+    if target.practitioner_id is not None and target.rating is not None:
+        add_practitioner_review(connection, target.practitioner_id, target.rating)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_previous_buckets(session):
+    session.info.pop(_PREVIOUS_KEY, None)
+
+
+# Singleton instance
+_report_rollups = None
+
+def get_report_rollups() -> ReportRollups:
+    """Get or create report rollups singleton"""
+    global _report_rollups
+
+    if _report_rollups is None:
+        _report_rollups = ReportRollups()
+
+    return _report_rollups
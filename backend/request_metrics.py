@@ -0,0 +1,400 @@
+"""
+Request Metrics
+Per-route latency histograms, database and AI call accounting, and on-demand profiling.
+
+RequestMetricsMiddleware times every HTTP request and records it under the route
+template (e.g. /appointments/{appointment_id}), so path parameters do not explode the
+number of series. Latencies go into fixed log-spaced buckets, which makes recording a
+single bisect and keeps memory constant per route.
+
+Within a request, SQLAlchemy cursor events count queries and their time, and
+track_ai_call() measures outbound LLM / RAG calls. Both attribute to the current
+request through a context variable, so they work in async endpoints and in sync
+endpoints run on the threadpool.
+
+render_prometheus() serves everything in the Prometheus text exposition format.
+
+With REQUEST_PROFILING=1, adding ?profile=1 or an X-Profile: 1 header to a request
+returns a profiler report (pyinstrument when installed, otherwise cProfile) instead
+of the normal response body. Profiled requests are left out of the metrics (including
+the in-flight gauge), since profiler overhead would skew the latency histograms.
+"""
+
+import io
+import os
+import time
+import bisect
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "false").lower() in ("1", "true", "yes")
+# Requests slower than this are logged with their DB / AI breakdown
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+# Upper bounds in seconds: 1 ms doubling up to ~65 s, plus +Inf
+LATENCY_BUCKETS: Tuple[float, ...] = tuple(0.001 * 2 ** i for i in range(17))
+# Queries per request: 0, 1, 2, 4, ... 256
+QUERY_COUNT_BUCKETS: Tuple[float, ...] = (0,) + tuple(float(2 ** i) for i in range(9))
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    """Work attributed to the request being handled"""
+    __slots__ = ("db_queries", "db_seconds", "ai_calls", "ai_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.ai_calls = 0
+        self.ai_seconds = 0.0
+
+
+_current_stats: contextvars.ContextVar = contextvars.ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram (non-cumulative counts; cumulated when rendered)"""
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "db_queries", "db_seconds", "ai_calls", "ai_seconds")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = 0.0
+        self.ai_calls = 0
+        self.ai_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Process-wide metrics keyed by (method, route, status)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str, int], RouteMetrics] = {}
+        self._ai: Dict[Tuple[str, str], Histogram] = {}
+        self._in_flight = 0
+        self.started_at = time.time()
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            self._in_flight -= 1
+            key = (method, route, status)
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.db_queries.observe(stats.db_queries)
+            metrics.db_seconds += stats.db_seconds
+            metrics.ai_calls += stats.ai_calls
+            metrics.ai_seconds += stats.ai_seconds
+
+    def record_ai_call(self, provider: str, outcome: str, seconds: float):
+        with self._lock:
+            histogram = self._ai.get((provider, outcome))
+            if histogram is None:
+                histogram = self._ai[(provider, outcome)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    def summary(self) -> List[Dict[str, object]]:
+        """Per-route p50/p95/p99 (bucket upper bounds) for quick inspection"""
+        with self._lock:
+            return [{
+                "method": method, "route": route, "status": status,
+                "count": metrics.latency.count,
+                "p50_ms": metrics.latency.quantile(0.50) * 1000,
+                "p95_ms": metrics.latency.quantile(0.95) * 1000,
+                "p99_ms": metrics.latency.quantile(0.99) * 1000,
+                "avg_db_queries": (round(metrics.db_queries.total / metrics.db_queries.count, 2)
+                                   if metrics.db_queries.count else 0.0),
+            } for (method, route, status), metrics in sorted(self._routes.items())]
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def histogram_lines(name: str, labels: str, histogram: Histogram):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        with self._lock:
+            routes = sorted(self._routes.items())
+            ai = sorted(self._ai.items())
+            in_flight = self._in_flight
+
+        lines.append("# HELP http_request_duration_seconds HTTP request latency by route template")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route, status), metrics in routes:
+            histogram_lines("http_request_duration_seconds", _labels(method, route, status), metrics.latency)
+
+        lines.append("# HELP http_request_db_queries Database queries issued per request")
+        lines.append("# TYPE http_request_db_queries histogram")
+        for (method, route, status), metrics in routes:
+            histogram_lines("http_request_db_queries", _labels(method, route, status), metrics.db_queries)
+
+        lines.append("# HELP http_request_db_seconds_total Time spent in database queries")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for (method, route, status), metrics in routes:
+            lines.append(f"http_request_db_seconds_total{{{_labels(method, route, status)}}} {metrics.db_seconds:.6f}")
+
+        lines.append("# HELP http_request_ai_seconds_total Time spent waiting on AI services")
+        lines.append("# TYPE http_request_ai_seconds_total counter")
+        for (method, route, status), metrics in routes:
+            if metrics.ai_calls:
+                lines.append(f"http_request_ai_seconds_total{{{_labels(method, route, status)}}} {metrics.ai_seconds:.6f}")
+
+        lines.append("# HELP ai_call_duration_seconds Outbound AI call latency by provider")
+        lines.append("# TYPE ai_call_duration_seconds histogram")
+        for (provider, outcome), histogram in ai:
+            histogram_lines("ai_call_duration_seconds", f'provider="{_escape(provider)}",outcome="{outcome}"', histogram)
+
+        lines.append("# HELP http_requests_in_flight Requests currently being handled")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {in_flight}")
+        lines.append("# HELP process_start_time_seconds Start time of the process")
+        lines.append("# TYPE process_start_time_seconds gauge")
+        lines.append(f"process_start_time_seconds {self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._ai.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(method: str, route: str, status: int) -> str:
+    return f'method="{method}",route="{_escape(route)}",status="{status}"'
+
+
+# ==================== DB / AI INSTRUMENTATION ====================
+
+def instrument_engine(engine: Engine):
+    """Attribute query count and time to the current request"""
+    if getattr(engine, "_request_metrics_instrumented", False):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_stats.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        starts = conn.info.get("query_start")
+        if stats is not None and starts:
+            stats.db_queries += 1
+            stats.db_seconds += time.perf_counter() - starts.pop()
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+    engine._request_metrics_instrumented = True
+
+
+@contextmanager
+def track_ai_call(provider: str):
+    """Time an outbound AI call: with track_ai_call("gemini"): ..."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.ai_calls += 1
+            stats.ai_seconds += elapsed
+        get_metrics_registry().record_ai_call(provider, outcome, elapsed)
+
+
+# ==================== MIDDLEWARE ====================
+
+def _route_template(app, scope) -> str:
+    """Path template of the matched route (the router stores the endpoint in the scope)"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    templates = getattr(app, "_metrics_route_templates", None)
+    if templates is None:
+        templates = {}
+        for route in getattr(app, "routes", []):
+            route_endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+            if route_endpoint is not None and hasattr(route, "path"):
+                templates.setdefault(route_endpoint, route.path)
+        app._metrics_route_templates = templates
+    return templates.get(endpoint, UNMATCHED_ROUTE)
+
+
+def _profiling_requested(scope) -> bool:
+    for key, value in scope.get("headers") or []:
+        if key == b"x-profile":
+            return value.strip() in (b"1", b"true")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0] in ("1", "true")
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing each HTTP request and recording it per route template"""
+
+    def __init__(self, app, routes_app=None):
+        self.app = app
+        # The FastAPI application, for resolving route templates
+        self.routes_app = routes_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if REQUEST_PROFILING and _profiling_requested(scope):
+            await self._profile(scope, receive, send)
+            return
+
+        registry = get_metrics_registry()
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status_holder = {"status": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        registry.request_started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_stats.reset(token)
+            route = _route_template(self.routes_app, scope) if self.routes_app is not None else UNMATCHED_ROUTE
+            registry.record_request(scope["method"], route, status_holder["status"], elapsed, stats)
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning(
+                    "Slow request %s %s: %.0f ms (db %d queries / %.0f ms, ai %d calls / %.0f ms)",
+                    scope["method"], route, elapsed * 1000, stats.db_queries, stats.db_seconds * 1000,
+                    stats.ai_calls, stats.ai_seconds * 1000
+                )
+
+    async def _profile(self, scope, receive, send):
+        """Run the request under a profiler and respond with the report instead of the body (not recorded)"""
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status_holder = {"status": 500}
+
+        async def discard_body(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+
+        started = time.perf_counter()
+        try:
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                Profiler = None
+
+            if Profiler is not None:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    await self.app(scope, receive, discard_body)
+                finally:
+                    profiler.stop()
+                report = profiler.output_text(unicode=True, color=False)
+            else:
+                # cProfile only sees this thread; sync endpoints on the threadpool appear as waits
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, discard_body)
+                finally:
+                    profiler.disable()
+                buffer = io.StringIO()
+                pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(60)
+                report = buffer.getvalue()
+        finally:
+            _current_stats.reset(token)
+        elapsed = time.perf_counter() - started
+
+        header = (
+            f"{scope['method']} {scope['path']} -> {status_holder['status']} in {elapsed * 1000:.1f} ms\n"
+            f"db: {stats.db_queries} queries, {stats.db_seconds * 1000:.1f} ms; "
+            f"ai: {stats.ai_calls} calls, {stats.ai_seconds * 1000:.1f} ms\n\n"
+        )
+        body = (header + report).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status_holder["status"]).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Singleton instance
+_metrics_registry = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get or create metrics registry singleton"""
+    global _metrics_registry
+
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+
+    return _metrics_registry
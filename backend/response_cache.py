@@ -0,0 +1,324 @@
+"""
+Response Cache
+ETag revalidation and a short-lived payload cache for read-heavy GET endpoints.
+
+Every table has an in-process version counter that is bumped by SQLAlchemy session
+events once a transaction touching it commits. A cached endpoint declares the tables
+it reads; its cache key is (endpoint, user or role, path and query, those versions),
+so any committed write to a dependency immediately moves polls onto a fresh key.
+
+Entries hold the serialized JSON body and a strong ETag (hash of the body). A request
+whose If-None-Match matches a live entry is answered 304 from the JWT claims alone,
+before the user is loaded or any report query runs. Misses are computed once per key:
+concurrent requests for the same key wait for the first one (single-flight).
+
+Versions are per process, like the scheduling and geo indexes; writes made by other
+processes or through raw SQL only become visible when entries expire (RESPONSE_CACHE_TTL).
+"""
+
+import os
+import asyncio
+import hashlib
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from auth import security, verify_token
+from fast_json import dump_json
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+
+# Column updates that do not change any cached payload (e.g. every login stamps users.last_login)
+IGNORED_COLUMNS = {
+    "users": {"last_login", "updated_at"},
+}
+
+CACHE_CONTROL = "private, no-cache"
+
+
+# ==================== RESOURCE VERSIONS ====================
+
+class ResourceVersions:
+    """Monotonic per-table change counters"""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, tables: Iterable[str]):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def snapshot(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def all(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._versions)
+
+
+# ==================== PAYLOAD CACHE ====================
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+def _etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 7232 prescribes for If-None-Match"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache of serialized responses with single-flight misses.
+    Keys already include the resource versions, so entries never need explicit invalidation.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_size: int = RESPONSE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.versions = ResourceVersions()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def serialize(self, model: Any, payload: Any) -> bytes:
+        """Validate and dump the payload the way FastAPI renders the endpoint's response_model"""
+        return dump_json(model, payload)
+
+    async def get_or_compute(self, key: str, model: Any, compute: Callable[[], Any]) -> CacheEntry:
+        """Return the live entry for key, computing it once even when many requests miss together"""
+        entry = self.get(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            with self._lock:
+                self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        with self._lock:
+            self.misses += 1
+        try:
+            payload = compute()
+            if inspect.isawaitable(payload):
+                payload = await payload
+            body = self.serialize(model, payload)
+            entry = CacheEntry(body=body, etag=_etag_for(body), expires_at=time.monotonic() + self.ttl)
+            self.put(key, entry)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so a miss nobody else waited on does not log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                "versions": self.versions.all()
+            }
+
+
+# ==================== ENDPOINT DEPENDENCY ====================
+
+class CachedResponse:
+    """Per-request handle returned by the cached_response() dependency"""
+
+    def __init__(self, cache: ResponseCache, key: str, if_none_match: Optional[str]):
+        self.cache = cache
+        self.key = key
+        self.if_none_match = if_none_match
+
+    def _headers(self, etag: str) -> Dict[str, str]:
+        return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    def _not_modified(self, entry: CacheEntry) -> Response:
+        with self.cache._lock:
+            self.cache.not_modified += 1
+        return Response(status_code=304, headers=self._headers(entry.etag))
+
+    def revalidate(self) -> Optional[Response]:
+        """304 when the client already holds the live entry for this key, else None"""
+        if not RESPONSE_CACHE_ENABLED or not self.if_none_match:
+            return None
+        entry = self.cache.get(self.key)
+        if entry is None or not etag_matches(self.if_none_match, entry.etag):
+            return None
+        return self._not_modified(entry)
+
+    async def respond(self, model: Any, compute: Callable[[], Any]) -> Response:
+        """Serve the cached payload (or compute it) as JSON with an ETag; 304 if the client has it"""
+        if not RESPONSE_CACHE_ENABLED:
+            body = self.cache.serialize(model, await _resolve(compute()))
+            return Response(content=body, media_type="application/json")
+
+        entry = await self.cache.get_or_compute(self.key, model, compute)
+        if etag_matches(self.if_none_match, entry.etag):
+            return self._not_modified(entry)
+        return Response(content=entry.body, media_type="application/json", headers=self._headers(entry.etag))
+
+
+async def _resolve(value: Any) -> Any:
+    return await value if inspect.isawaitable(value) else value
+
+
+def cached_response(name: str, tables: Tuple[str, ...], per_user: bool = True, short_circuit: bool = True):
+    """
+    Dependency factory for a cached GET endpoint reading the given tables.
+    List it before the auth dependency: with short_circuit, a matching If-None-Match is
+    answered 304 here, using only the token claims. Payloads are keyed per user by default,
+    or per role for responses that do not depend on who is asking.
+    """
+    tables = tuple(sorted(tables))
+
+    def dependency(
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Depends(security)
+    ) -> CachedResponse:
+        claims = verify_token(credentials.credentials)
+        cache = get_response_cache()
+        audience = f"user:{claims['email']}" if per_user else f"role:{claims['role']}"
+        versions = ",".join(map(str, cache.versions.snapshot(tables)))
+        key = f"{name}|{audience}|{request.url.path}?{request.url.query}|{versions}"
+        cached = CachedResponse(cache, key, request.headers.get("if-none-match"))
+        if short_circuit:
+            not_modified = cached.revalidate()
+            if not_modified is not None:
+                # FastAPI renders body-less statuses from HTTPException as a bare response
+                raise HTTPException(status_code=304, headers=dict(not_modified.headers))
+        return cached
+
+    return dependency
+
+
+# ==================== SESSION EVENT HOOKS ====================
+# Tables written in a transaction are collected per flush and bumped once it commits.
+
+_PENDING_KEY = "response_cache_pending"
+
+def _changed_table(obj) -> Optional[str]:
+    """Table of a dirty object, unless nothing (or only ignored columns) actually changed"""
+    table = getattr(obj, "__tablename__", None)
+    if table is None:
+        return None
+    changed = {attr.key for attr in sa_inspect(obj).attrs if attr.history.has_changes()}
+    return table if changed - IGNORED_COLUMNS.get(table, set()) else None
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    tables = {obj.__tablename__ for obj in list(session.new) + list(session.deleted)
+              if hasattr(obj, "__tablename__")}
+    tables.update(filter(None, (_changed_table(obj) for obj in session.dirty)))
+    if tables:
+        session.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_statement(orm_execute_state):
+    # query.update() / query.delete() and ORM-enabled update()/delete() bypass the flush
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, set()).add(
+            orm_execute_state.bind_mapper.local_table.name
+        )
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        get_response_cache().versions.bump(tables)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_tables(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Singleton instance
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """Get or create response cache singleton"""
+    global _response_cache
+
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+
+    return _response_cache
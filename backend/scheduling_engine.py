@@ -0,0 +1,236 @@
+"""
+Scheduling Engine
+Per-practitioner interval index of active appointments for duration-aware conflict detection.
+
+The index lives in memory, is rebuilt from the appointments table on startup and is kept
+in sync by SQLAlchemy session events whenever an appointment is committed. It assumes a
+single API process owns bookings (the default uvicorn setup).
+"""
+
+import logging
+import threading
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import Appointment
+
+logger = logging.getLogger(__name__)
+
+# Appointments in these states block the practitioner's time
+ACTIVE_STATUSES = ("scheduled", "confirmed", "in_progress")
+DEFAULT_DURATION_MINUTES = 60
+
+
+def normalize_datetime(value: datetime) -> datetime:
+    """Convert to naive UTC so client-supplied and stored datetimes compare consistently"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _status_value(status: Any) -> Optional[str]:
+    return getattr(status, "value", status)
+
+
+class PractitionerSchedule:
+    """
+    Intervals of one practitioner, kept sorted by start time.
+    Overlap queries bisect the start list: only intervals starting within
+    (query_start - longest_duration, query_end) can overlap, so a lookup is
+    O(log n + k) where k is the number of appointments in that window.
+    """
+
+    def __init__(self):
+        self._starts: List[Tuple[datetime, int]] = []
+        self._intervals: Dict[int, Tuple[datetime, datetime]] = {}
+        self._max_duration = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def add(self, appointment_id: int, start: datetime, end: datetime):
+        self.remove(appointment_id)
+        insort(self._starts, (start, appointment_id))
+        self._intervals[appointment_id] = (start, end)
+        self._max_duration = max(self._max_duration, end - start)
+
+    def remove(self, appointment_id: int):
+        interval = self._intervals.pop(appointment_id, None)
+        if interval is None:
+            return
+        position = bisect_left(self._starts, (interval[0], appointment_id))
+        del self._starts[position]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Tuple[int, datetime, datetime]]:
+        """Intervals overlapping [start, end) - touching intervals do not conflict"""
+        low = bisect_left(self._starts, (start - self._max_duration,))
+        high = bisect_left(self._starts, (end,))
+
+        overlaps = []
+        for interval_start, appointment_id in self._starts[low:high]:
+            interval_end = self._intervals[appointment_id][1]
+            if interval_end > start:
+                overlaps.append((appointment_id, interval_start, interval_end))
+        return overlaps
+
+
+class SchedulingEngine:
+    """
+    Holds one PractitionerSchedule per practitioner and a lock per practitioner
+    so that conflict check, insert and commit happen atomically for bookings.
+    """
+
+    def __init__(self):
+        self._schedules: Dict[int, PractitionerSchedule] = {}
+        self._owners: Dict[int, int] = {}  # appointment_id -> practitioner_id
+        self._practitioner_locks: Dict[int, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def rebuild(self, db: Session):
+        """Reload the index from all active appointments"""
+        rows = db.query(
+            Appointment.id,
+            Appointment.practitioner_id,
+            Appointment.scheduled_datetime,
+            Appointment.duration_minutes
+        ).filter(Appointment.status.in_(ACTIVE_STATUSES)).all()
+
+        schedules: Dict[int, PractitionerSchedule] = {}
+        owners: Dict[int, int] = {}
+        for appointment_id, practitioner_id, scheduled_datetime, duration_minutes in rows:
+            start, end = self._interval(scheduled_datetime, duration_minutes)
+            schedules.setdefault(practitioner_id, PractitionerSchedule()).add(appointment_id, start, end)
+            owners[appointment_id] = practitioner_id
+
+        with self._lock:
+            self._schedules = schedules
+            self._owners = owners
+            self.loaded = True
+
+        logger.info(f"Scheduling index rebuilt: {len(rows)} active appointments across {len(schedules)} practitioners")
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            self.rebuild(db)
+
+    @contextmanager
+    def practitioner_lock(self, practitioner_id: int):
+        """Serialize check-then-book for a practitioner"""
+        with self._lock:
+            lock = self._practitioner_locks.setdefault(practitioner_id, threading.RLock())
+        with lock:
+            yield
+
+    def booked_intervals(self, practitioner_id: int, start: datetime, end: datetime) -> List[Tuple[int, datetime, datetime]]:
+        """(appointment_id, start, end) of active appointments overlapping [start, end), sorted by start"""
+        schedule = self._schedules.get(practitioner_id)
+        if schedule is None:
+            return []
+        return schedule.overlapping(normalize_datetime(start), normalize_datetime(end))
+
+    def find_conflicts(self, practitioner_id: int, start: datetime, duration_minutes: Optional[int] = None,
+                       exclude_appointment_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Active appointments of the practitioner overlapping the proposed slot"""
+        start, end = self._interval(start, duration_minutes)
+
+        return [
+            {
+                "appointment_id": appointment_id,
+                "start": interval_start,
+                "end": interval_end
+            }
+            for appointment_id, interval_start, interval_end in self.booked_intervals(practitioner_id, start, end)
+            if appointment_id != exclude_appointment_id
+        ]
+
+    def sync_appointment(self, appointment_id: int, practitioner_id: int, scheduled_datetime: datetime,
+                         duration_minutes: Optional[int], status: Optional[str]):
+        """Apply a committed appointment row to the index"""
+        with self._lock:
+            # Drop the previous interval, which may belong to another practitioner if reassigned
+            self._remove(appointment_id)
+
+            if status in ACTIVE_STATUSES or status is None:
+                start, end = self._interval(scheduled_datetime, duration_minutes)
+                self._schedules.setdefault(practitioner_id, PractitionerSchedule()).add(appointment_id, start, end)
+                self._owners[appointment_id] = practitioner_id
+
+    def remove_appointment(self, appointment_id: int):
+        with self._lock:
+            self._remove(appointment_id)
+
+    def _remove(self, appointment_id: int):
+        practitioner_id = self._owners.pop(appointment_id, None)
+        if practitioner_id is not None:
+            self._schedules[practitioner_id].remove(appointment_id)
+
+    @staticmethod
+    def _interval(start: datetime, duration_minutes: Optional[int]) -> Tuple[datetime, datetime]:
+        start = normalize_datetime(start)
+        return start, start + timedelta(minutes=duration_minutes or DEFAULT_DURATION_MINUTES)
+
+
+# ==================== SESSION EVENT HOOKS ====================
+# Appointment writes are recorded at flush time and applied to the index only once
+# the transaction commits, so rolled back bookings never reach the index.
+
+_PENDING_KEY = "scheduling_engine_pending"
+
+def _record_change(target: Appointment, deleted: bool = False):
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault(_PENDING_KEY, []).append((
+        target.id,
+        target.practitioner_id,
+        target.scheduled_datetime,
+        target.duration_minutes,
+        _status_value(target.status) if target.status is not None else None,
+        deleted
+    ))
+
+@event.listens_for(Appointment, "after_insert")
+def _appointment_inserted(mapper, connection, target):
+    _record_change(target)
+
+@event.listens_for(Appointment, "after_update")
+def _appointment_updated(mapper, connection, target):
+    _record_change(target)
+
+@event.listens_for(Appointment, "after_delete")
+def _appointment_deleted(mapper, connection, target):
+    _record_change(target, deleted=True)
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or _scheduling_engine is None or not _scheduling_engine.loaded:
+        return
+
+    for appointment_id, practitioner_id, scheduled_datetime, duration_minutes, status, deleted in pending:
+        if deleted:
+            _scheduling_engine.remove_appointment(appointment_id)
+        else:
+            _scheduling_engine.sync_appointment(appointment_id, practitioner_id, scheduled_datetime, duration_minutes, status)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Singleton instance
+_scheduling_engine = None
+
+def get_scheduling_engine() -> SchedulingEngine:
+    """Get or create scheduling engine singleton"""
+    global _scheduling_engine
+
+    if _scheduling_engine is None:
+        _scheduling_engine = SchedulingEngine()
+
+    return _scheduling_engine
@@ -4,7 +4,7 @@ Request and response models for API endpoints.
 """
 
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, EmailStr, Field
 
 class BaseSchema(BaseModel):
@@ -166,6 +166,9 @@ class PractitionerResponse(BaseSchema):
     user: Optional['UserShort'] = None
     created_at: datetime
 
+class NearbyPractitionerResponse(PractitionerResponse):
+    distance_km: float
+
 class AdminBase(BaseModel):
     admin_level: Optional[str] = "standard"
     permissions: Optional[List[str]] = []
@@ -199,8 +202,39 @@ class AuditLogResponse(BaseSchema):
     resource_type: str
     resource_id: Optional[int]
     ip_address: Optional[str]
+    user_agent: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
     created_at: datetime
 
+class AuditLogPage(BaseModel):
+    items: List[AuditLogResponse]
+    next_cursor: Optional[str] = None
+
+class AuditPipelineStats(BaseModel):
+    queue_depth: int
+    queue_capacity: int
+    max_queue_depth: int
+    enqueued: int
+    written: int
+    dropped: int
+    failed: int
+    flushes: int
+    avg_batch_size: float
+    last_flush_at: Optional[datetime] = None
+    running: bool
+
+class RollupMismatch(BaseModel):
+    table: str
+    practitioner_id: int
+    day: date
+    expected: List[int]  # [count, completed] or [reviews, rating_sum] from raw rows
+    actual: List[int]
+
+class RollupConsistencyReport(BaseModel):
+    consistent: bool
+    mismatches: List[RollupMismatch]
+    repaired: bool
+
 class SystemSettingsResponse(BaseSchema):
     key: str
     value: Dict[str, Any]
@@ -261,6 +295,27 @@ class AppointmentResponse(BaseSchema):
     created_at: datetime
     updated_at: Optional[datetime]
 
+class AppointmentConflict(BaseModel):
+    appointment_id: int
+    start: datetime
+    end: datetime
+
+class AppointmentConflictCheck(BaseModel):
+    practitioner_id: int
+    start: datetime
+    end: datetime
+    available: bool
+    conflicts: List[AppointmentConflict] = []
+
+class AvailableSlot(BaseModel):
+    practitioner_id: int
+    practitioner_name: Optional[str] = None
+    clinic_name: Optional[str] = None
+    consultation_fee: float = 0.0
+    specializations: List[str] = []
+    start: datetime
+    end: datetime
+
 class TherapySessionBase(BaseModel):
     therapy_type: str
     pre_session_notes: Optional[str] = None
@@ -309,6 +364,11 @@ class FeedbackBase(BaseModel):
     rating: int = Field(..., ge=1, le=5)
     satisfaction_level: Optional[str] = None
     comments: Optional[str] = None
+    therapy_effectiveness: Optional[int] = Field(None, ge=1, le=5)
+    practitioner_professionalism: Optional[int] = Field(None, ge=1, le=5)
+    facility_cleanliness: Optional[int] = Field(None, ge=1, le=5)
+    would_recommend: Optional[bool] = None
+    suggestions: Optional[str] = None
 
 class FeedbackCreate(FeedbackBase):
     pass
@@ -397,6 +457,16 @@ class NotificationResponse(BaseSchema):
     expires_at: Optional[datetime]
     created_at: datetime
 
+class NotificationMarkRead(BaseModel):
+    ids: Optional[List[int]] = None  # None marks every unread notification
+
+class NotificationReadResult(BaseModel):
+    updated: int
+    unread: int
+
+class NotificationUnreadCount(BaseModel):
+    unread: int
+
 # ==================== THERAPY TEMPLATE SCHEMAS ====================
 class TherapyTemplateBase(BaseModel):
     name: str
@@ -457,6 +527,7 @@ class HealthLogResponse(HealthLogBase):
     
     class Config:
         orm_mode = True
+        from_attributes = True
 
 
 # ==================== HEALTH SUPPORT SCHEMAS ====================
@@ -511,6 +582,28 @@ class ChatMessageResponse(BaseSchema):
     read: bool
     created_at: datetime
 
+class ChatUnreadCount(BaseModel):
+    sender_id: int
+    unread: int
+    last_message_at: Optional[datetime] = None
+
+class ChatUnreadCounts(BaseModel):
+    total: int
+    conversations: List[ChatUnreadCount] = []
+
+# ==================== FILE UPLOAD SCHEMAS ====================
+class FileUploadResponse(BaseModel):
+    id: int
+    sha256: str
+    filename: Optional[str]
+    size: int
+    content_type: str
+    purpose: str
+    url: str
+    thumbnail_url: Optional[str] = None
+    deduplicated: bool = False
+    message: str = "File uploaded successfully"
+
 class PractitionerAvailability(BaseModel):
     id: int
     name: str
@@ -536,6 +629,7 @@ class ReminderBase(BaseModel):
     message: Optional[str] = None
     frequency: str = "daily"
     time: str
+    timezone: Optional[str] = None
 
 class ReminderCreate(ReminderBase):
     pass
@@ -549,6 +643,18 @@ class ReminderResponse(ReminderBase):
     class Config:
         orm_mode = True
 
+class ReminderSchedulerMetrics(BaseModel):
+    queue_depth: int
+    heap_size: int
+    next_fire_at: Optional[datetime] = None
+    fired_total: int
+    batches_total: int
+    last_lag_seconds: float
+    max_lag_seconds: float
+    avg_lag_seconds: float
+    last_run_at: Optional[datetime] = None
+    running: bool
+
 # ==================== AGENT SCHEMAS ====================
 class AgentAction(BaseModel):
     type: str # "create_reminder", "book_appointment", "show_resource"
@@ -600,6 +706,12 @@ class MonthlySummaryResponse(BaseModel):
     popular_therapies: List[str]
     appointment_status_counts: Dict[str, int]
 
+# ==================== BATCH PLAN SCHEMAS ====================
+class BatchPlanRequest(BaseModel):
+    patient_ids: Optional[List[int]] = None  # Defaults to the practitioner's whole caseload
+    days: int = Field(7, ge=1, le=28)
+    plan_types: List[str] = ["diet", "workout"]
+
 # ==================== SUBSCRIPTION SCHEMAS ====================
 class SubscriptionBase(BaseModel):
     plan_type: str
@@ -627,6 +739,10 @@ class FeedbackSummary(BaseModel):
     average_rating: float
     total_reviews: int
     rating_distribution: Dict[int, int] # 5 stars: 10, 4 stars: 5...
+    dimension_averages: Dict[str, Optional[float]] = {}  # therapy_effectiveness, practitioner_professionalism, facility_cleanliness
+    would_recommend_ratio: Optional[float] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
     recent_feedback: List[FeedbackResponse]
 
 class FeedbackReportResponse(BaseModel):
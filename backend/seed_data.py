@@ -0,0 +1,502 @@
+"""
+Seed Data Generator
+Builds production-scale, statistically plausible datasets for load tests:
+practitioners clustered around Indian cities with skewed popularity, patients
+with a primary practitioner in their city, appointment histories, feedback on
+completed sessions, health-log time series and patient/practitioner chats.
+
+Rows are generated as tuples and written with DBAPI executemany in large batches,
+one transaction per run, with the secondary indexes of the loaded tables dropped
+during the load and rebuilt (then ANALYZEd) at the end. Output is deterministic
+for a given --seed and --anchor on an empty database; ids continue after existing
+rows, so seeding an existing database appends. Every seeded user can log in with
+SEED_PASSWORD.
+
+Usage:
+    python seed_data.py --patients 100000 --practitioners 1000 --seed 42
+    python seed_data.py --patients 2000 --appointments-per-patient 4 --database-url sqlite:///./load.db
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import bisect
+import itertools
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+DEFAULT_SEED = 42
+DEFAULT_ANCHOR = "2026-01-15"
+SEED_PASSWORD = "seedpass123"
+SEED_EMAIL_DOMAIN = "seed.ayursutra.example"  # reserved TLD, but accepted by EmailStr (".test" is not)
+BATCH_SIZE = 20000
+
+HISTORY_DAYS = 730
+FUTURE_DAYS = 60
+
+# (city, lat, lng, share of practitioners/patients)
+CITIES = [
+    ("Bengaluru", 12.9716, 77.5946, 16), ("Mumbai", 19.0760, 72.8777, 15), ("Delhi", 28.6139, 77.2090, 15),
+    ("Chennai", 13.0827, 80.2707, 10), ("Hyderabad", 17.3850, 78.4867, 10), ("Pune", 18.5204, 73.8567, 8),
+    ("Kochi", 9.9312, 76.2673, 9), ("Kolkata", 22.5726, 88.3639, 7), ("Jaipur", 26.9124, 75.7873, 5),
+    ("Mysuru", 12.2958, 76.6394, 5),
+]
+THERAPIES = [
+    ("Abhyanga", 22), ("Shirodhara", 14), ("Panchakarma", 12), ("Basti", 8), ("Nasya", 8), ("Virechana", 6),
+    ("Udvartana", 6), ("Pizhichil", 5), ("Kati Basti", 7), ("Marma Therapy", 5), ("Swedana", 5),
+    ("Raktamokshana", 2),
+]
+PRAKRITI = [("Vata", 30), ("Pitta", 28), ("Kapha", 20), ("Vata-Pitta", 10), ("Pitta-Kapha", 7), ("Vata-Kapha", 5)]
+CONDITIONS = ["hypertension", "type 2 diabetes", "arthritis", "insomnia", "migraine", "acid reflux",
+              "anxiety", "obesity", "psoriasis", "asthma", "hypothyroidism", "back pain"]
+MEDICATIONS = ["metformin", "amlodipine", "levothyroxine", "omeprazole", "triphala", "ashwagandha"]
+ALLERGIES = ["peanuts", "dust", "pollen", "lactose", "shellfish", "sesame"]
+QUALIFICATIONS = ["BAMS", "BAMS, MD (Ayurveda)", "BAMS, MS (Ayurveda)", "MD (Panchakarma)"]
+FIRST_NAMES = ["Aarav", "Ananya", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Nikhil", "Priya", "Rahul",
+               "Riya", "Rohan", "Saanvi", "Sneha", "Tanvi", "Varun", "Vikram", "Zara", "Lakshmi", "Suresh"]
+LAST_NAMES = ["Sharma", "Iyer", "Nair", "Reddy", "Patel", "Gupta", "Menon", "Das", "Kulkarni", "Rao",
+              "Singh", "Joshi", "Pillai", "Bose", "Mehta"]
+STRESS_LEVELS = ["Low", "Medium", "Medium", "High"]
+PATIENT_MESSAGES = ["Is it okay to take the herbal tea after dinner?", "My sleep has improved this week.",
+                    "Can we move the next session to the evening?", "I felt some soreness after the massage.",
+                    "Should I continue the diet plan during travel?", "Thank you, the headaches are less frequent."]
+PRACTITIONER_MESSAGES = ["Yes, take it warm about an hour after dinner.", "Glad to hear that, keep the routine.",
+                         "Please avoid cold and raw foods for the next few days.",
+                         "Mild soreness is normal; apply warm sesame oil.", "Let's review your progress next visit.",
+                         "Keep hydrating and continue the pranayama practice."]
+FEEDBACK_COMMENTS = [None, None, "Very relaxing session.", "Helpful advice on diet.", "Clinic was very clean.",
+                     "Session started late.", "Noticeable improvement in sleep.", "Would like longer sessions."]
+
+WEEKLY_SCHEDULE = json.dumps({
+    day: [{"start_time": "09:00", "end_time": "13:00", "location": "Main Clinic"},
+          {"start_time": "14:00", "end_time": "18:00", "location": "Main Clinic"}]
+    for day in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+} | {"sunday": []})
+
+
+def _cumulative(weights: Sequence[float]) -> List[float]:
+    return list(itertools.accumulate(weights))
+
+
+def _noise(random) -> float:
+    """Cheap bell-shaped noise in [-1.5, 1.5] (sd 0.5); rng.gauss is several times slower per row"""
+    return random() + random() + random() - 1.5
+
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+def _count(rng: random.Random, mean: float) -> int:
+    """Per-patient row count: exponential around the mean, so a few patients are very active"""
+    return int(rng.expovariate(1 / mean) + 0.5) if mean > 0 else 0
+
+
+class Clock:
+    """Minute offsets from the start of the history window, rendered as SQLite DATETIME text"""
+
+    def __init__(self, anchor: datetime):
+        self.anchor = anchor
+        self.start = anchor - timedelta(days=HISTORY_DAYS)
+        self.now = HISTORY_DAYS * 1440
+        self.end = (HISTORY_DAYS + FUTURE_DAYS) * 1440
+        self._days = [(self.start + timedelta(days=day)).strftime("%Y-%m-%d")
+                      for day in range(HISTORY_DAYS + FUTURE_DAYS + 1)]
+        self._weekdays = [(self.start + timedelta(days=day)).weekday() for day in range(len(self._days))]
+
+    def text(self, minute: int) -> str:
+        return f"{self._days[minute // 1440]} {minute % 1440 // 60:02d}:{minute % 60:02d}:00.000000"
+
+    def weekday(self, minute: int) -> int:
+        return self._weekdays[minute // 1440]
+
+
+class TableLoader:
+    """Buffers rows for one table and writes them with executemany every batch_size rows"""
+
+    def __init__(self, connection, table, columns: Sequence[str], batch_size: int):
+        placeholder = {"qmark": "?", "numeric": "?", "format": "%s", "pyformat": "%s"}.get(
+            connection.dialect.paramstyle, "?")
+        self.connection = connection
+        self.sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"
+        self.batch_size = batch_size
+        self.rows: List[Tuple] = []
+        self.count = 0
+
+    def add(self, row: Tuple):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.connection.exec_driver_sql(self.sql, self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+
+class SeedGenerator:
+    def __init__(self, connection, seed: int, anchor: datetime, batch_size: int = BATCH_SIZE):
+        from models import User, Patient, Practitioner, Appointment, Feedback, PatientHealthLog, ChatMessage
+        self.user_table = User.__table__
+        self.patient_table = Patient.__table__
+        self.practitioner_table = Practitioner.__table__
+        self.appointment_table = Appointment.__table__
+        self.feedback_table = Feedback.__table__
+        self.health_log_table = PatientHealthLog.__table__
+        self.chat_table = ChatMessage.__table__
+        self.connection = connection
+        self.rng = random.Random(seed)
+        self.clock = Clock(anchor)
+        self.batch_size = batch_size
+        self.loaders: Dict[str, TableLoader] = {}
+        self.next_ids: Dict[str, int] = {}
+
+    def loader(self, table, columns: Sequence[str]) -> TableLoader:
+        if table.name not in self.loaders:
+            self.loaders[table.name] = TableLoader(self.connection, table, columns, self.batch_size)
+            last_id = self.connection.exec_driver_sql(f"SELECT MAX(id) FROM {table.name}").scalar()
+            self.next_ids[table.name] = (last_id or 0) + 1
+        return self.loaders[table.name]
+
+    def next_id(self, table) -> int:
+        value = self.next_ids[table.name]
+        self.next_ids[table.name] = value + 1
+        return value
+
+    def flush(self):
+        for loader in self.loaders.values():
+            loader.flush()
+
+    def counts(self) -> Dict[str, int]:
+        return {name: loader.count for name, loader in self.loaders.items()}
+
+    # ==================== PEOPLE ====================
+
+    def _name(self) -> str:
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def _user(self, users: TableLoader, role: str, password_hash: str, created: int) -> int:
+        user_id = self.next_id(self.user_table)
+        last_login = self.clock.text(min(self.clock.now - 1, created + int(self.rng.expovariate(1 / 20000))))
+        users.add((user_id, f"{role.lower()}{user_id}@{SEED_EMAIL_DOMAIN}", self._name(), password_hash, role,
+                   f"+91{self.rng.randrange(7000000000, 9999999999)}", 1, 1, self.clock.text(created), last_login))
+        return user_id
+
+    def practitioners(self, count: int, password_hash: str) -> List[Tuple[int, int, int, float, float]]:
+        """Insert practitioners; returns (practitioner_id, user_id, city, fee, quality) per practitioner"""
+        rng = self.rng
+        users = self.loader(self.user_table, USER_COLUMNS)
+        rows = self.loader(self.practitioner_table, PRACTITIONER_COLUMNS)
+        city_weights = _cumulative([share for *_, share in CITIES])
+        therapy_names = [name for name, _ in THERAPIES]
+        practitioners = []
+        for _ in range(count):
+            city = bisect.bisect(city_weights, rng.random() * city_weights[-1])
+            name, lat, lng, _ = CITIES[city]
+            created = rng.randrange(0, self.clock.now // 2)
+            user_id = self._user(users, "PRACTITIONER", password_hash, created)
+            practitioner_id = self.next_id(self.practitioner_table)
+            fee = round(rng.lognormvariate(7.0, 0.35), -1)
+            quality = min(4.9, max(2.5, rng.gauss(4.2, 0.4)))
+            rows.add((
+                practitioner_id, user_id, f"AYU-{practitioner_id:07d}",
+                json.dumps(rng.sample(therapy_names, rng.randint(1, 3))),
+                min(40, int(rng.gammavariate(2.0, 5.0))), rng.choice(QUALIFICATIONS),
+                f"{rng.choice(LAST_NAMES)} Ayurveda Centre", f"{rng.randint(1, 400)} Main Road, {name}",
+                round(lat + rng.gauss(0, 0.06), 6), round(lng + rng.gauss(0, 0.06), 6), fee, WEEKLY_SCHEDULE,
+                "Ayurvedic physician focused on classical Panchakarma therapies.", 0.0, 0,
+                1 if rng.random() < 0.7 else 0, self.clock.text(created)
+            ))
+            practitioners.append((practitioner_id, user_id, city, fee, quality))
+        return practitioners
+
+    def patients(self, count: int, password_hash: str, practitioners) -> List[Tuple[int, int, int, int, str]]:
+        """Insert patients; returns (patient_id, user_id, primary practitioner index, created minute, prakriti)"""
+        rng = self.rng
+        users = self.loader(self.user_table, USER_COLUMNS)
+        rows = self.loader(self.patient_table, PATIENT_COLUMNS)
+        city_weights = _cumulative([share for *_, share in CITIES])
+        prakriti_weights = _cumulative([share for _, share in PRAKRITI])
+
+        # Popularity is heavy-tailed: a few practitioners in each city see most patients
+        by_city: Dict[int, Tuple[List[int], List[float]]] = {}
+        for index, (_, _, city, _, _) in enumerate(practitioners):
+            members, weights = by_city.setdefault(city, ([], []))
+            members.append(index)
+            weights.append(rng.paretovariate(1.3))
+        by_city = {city: (members, _cumulative(weights)) for city, (members, weights) in by_city.items()}
+
+        patients = []
+        for _ in range(count):
+            city = bisect.bisect(city_weights, rng.random() * city_weights[-1])
+            if city not in by_city:
+                city = rng.choice(list(by_city))
+            members, weights = by_city[city]
+            primary = members[bisect.bisect(weights, rng.random() * weights[-1])]
+            created = rng.randrange(0, self.clock.now)
+            user_id = self._user(users, "PATIENT", password_hash, created)
+            patient_id = self.next_id(self.patient_table)
+            prakriti = PRAKRITI[bisect.bisect(prakriti_weights, rng.random() * prakriti_weights[-1])][0]
+            age = min(90, max(18, int(rng.gauss(42, 14))))
+            rows.add((
+                patient_id, user_id,
+                f"{self.clock.anchor.year - age}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00.000000",
+                "female" if rng.random() < 0.52 else "male", f"{rng.randint(1, 900)} Cross Street, {CITIES[city][0]}",
+                f"+91{rng.randrange(7000000000, 9999999999)}",
+                json.dumps([c for c in CONDITIONS if rng.random() < 0.08]),
+                json.dumps([m for m in MEDICATIONS if rng.random() < 0.06]),
+                json.dumps([a for a in ALLERGIES if rng.random() < 0.05]),
+                prakriti, "{}", self.clock.text(created)
+            ))
+            patients.append((patient_id, user_id, primary, created, prakriti))
+        return patients
+
+    # ==================== ACTIVITY ====================
+
+    def appointments(self, patients, practitioners, per_patient: float, feedback_rate: float):
+        rng = self.rng
+        random = rng.random
+        clock = self.clock
+        text = clock.text
+        add_appointment = self.loader(self.appointment_table, APPOINTMENT_COLUMNS).add
+        add_feedback = self.loader(self.feedback_table, FEEDBACK_COLUMNS).add
+        therapy_weights = _cumulative([share for _, share in THERAPIES])
+        therapy_total = therapy_weights[-1]
+        durations = (45, 60, 60, 60, 90)
+        practitioner_count = len(practitioners)
+        last_day = clock.end // 1440 - 1
+
+        for patient_id, _, primary, created, _ in patients:
+            visits = _count(rng, per_patient)
+            if not visits:
+                continue
+            course = THERAPIES[bisect.bisect(therapy_weights, random() * therapy_total)][0]
+            first_day = created // 1440
+            day_span = last_day - first_day + 1
+            for _ in range(visits):
+                index = primary if random() < 0.85 else int(random() * practitioner_count)
+                practitioner_id, _, _, fee, quality = practitioners[index]
+                therapy = course if random() < 0.6 else THERAPIES[
+                    bisect.bisect(therapy_weights, random() * therapy_total)][0]
+                # 09:00-18:00 in 30 minute slots
+                scheduled = (first_day + int(random() * day_span)) * 1440 + 540 + 30 * int(random() * 18)
+                if clock.weekday(scheduled) == 6:
+                    scheduled -= 1440  # clinics are closed on Sundays
+                if scheduled >= clock.now:
+                    status = "scheduled" if random() < 0.7 else "confirmed"
+                else:
+                    roll = random()
+                    status = "completed" if roll < 0.78 else "cancelled" if roll < 0.90 else "no_show"
+                booked = max(created, scheduled - (1 + int(random() * 21)) * 1440 - int(random() * 600))
+                appointment_id = self.next_id(self.appointment_table)
+                add_appointment((
+                    appointment_id, patient_id, practitioner_id, therapy, text(scheduled),
+                    durations[int(random() * 5)], status, fee,
+                    "paid" if status == "completed" and random() < 0.9 else "pending", text(booked)
+                ))
+                if status == "completed" and random() < feedback_rate:
+                    rating = _clamp(round(quality + 1.6 * _noise(random)), 1, 5)
+                    add_feedback((
+                        self.next_id(self.feedback_table), patient_id, practitioner_id, appointment_id, rating,
+                        _clamp(rating + (-1, 0, 0, 1)[int(random() * 4)], 1, 5),
+                        _clamp(round(quality + 1.2 * _noise(random)), 1, 5),
+                        _clamp(round(4.3 + 1.2 * _noise(random)), 1, 5),
+                        1 if rating >= 4 else 0, FEEDBACK_COMMENTS[int(random() * len(FEEDBACK_COMMENTS))],
+                        text(min(clock.now - 1, scheduled + 1440 + int(random() * 2880)))
+                    ))
+
+    def health_logs(self, patients, practitioners, per_patient: float):
+        rng = self.rng
+        random = rng.random
+        clock = self.clock
+        add_log = self.loader(self.health_log_table, HEALTH_LOG_COLUMNS).add
+        baselines = {"Vata": (70, 45, 35), "Pitta": (40, 70, 35), "Kapha": (35, 40, 70)}
+
+        for patient_id, _, primary, created, prakriti in patients:
+            count = _count(rng, per_patient)
+            if not count:
+                continue
+            # Dosha scores and weight drift as random walks from the patient's constitution
+            vata, pitta, kapha = baselines.get(prakriti.split("-")[0], (50, 50, 50))
+            weight = rng.gauss(68, 12)
+            practitioner_id = practitioners[primary][0]
+            minute = created
+            step = max(1440, (clock.now - created) // (count + 1))
+            for _ in range(count):
+                minute += step + int(random() * 1440) - 720
+                if minute >= clock.now:
+                    break
+                vata = _clamp(vata + int(random() * 13) - 6, 0, 100)
+                pitta = _clamp(pitta + int(random() * 13) - 6, 0, 100)
+                kapha = _clamp(kapha + int(random() * 13) - 6, 0, 100)
+                weight += 0.8 * _noise(random) - 0.05
+                stamp = clock.text(minute)
+                add_log((
+                    self.next_id(self.health_log_table), patient_id, practitioner_id, stamp, vata, pitta, kapha,
+                    _clamp(int(68 + 28 * _noise(random)), 0, 100), STRESS_LEVELS[int(random() * 4)],
+                    round(max(0.5, 2.2 + 1.2 * _noise(random)), 1), round(weight, 1),
+                    f"{int(122 + 24 * _noise(random))}/{int(80 + 16 * _noise(random))}", stamp
+                ))
+
+    def chat_messages(self, patients, practitioners, per_patient: float):
+        rng = self.rng
+        random = rng.random
+        clock = self.clock
+        add_message = self.loader(self.chat_table, CHAT_COLUMNS).add
+
+        for _, patient_user_id, primary, created, _ in patients:
+            count = _count(rng, per_patient)
+            if not count:
+                continue
+            practitioner_user_id = practitioners[primary][1]
+            minute = created + int(random() * (clock.now - created))
+            from_patient = True
+            for position in range(count):
+                minute += 1 + int(random() * 600)
+                if minute >= clock.now:
+                    break
+                if from_patient:
+                    row = (patient_user_id, "patient", practitioner_user_id, "practitioner",
+                           PATIENT_MESSAGES[int(random() * len(PATIENT_MESSAGES))])
+                else:
+                    row = (practitioner_user_id, "practitioner", patient_user_id, "patient",
+                           PRACTITIONER_MESSAGES[int(random() * len(PRACTITIONER_MESSAGES))])
+                # The tail of a conversation is usually still unread
+                read = 0 if position >= count - 2 and random() < 0.5 else 1
+                add_message((self.next_id(self.chat_table), *row, read, clock.text(minute)))
+                if random() < 0.8:
+                    from_patient = not from_patient
+
+
+USER_COLUMNS = ("id", "email", "full_name", "hashed_password", "role", "phone", "is_active", "is_verified",
+                "created_at", "last_login")
+PRACTITIONER_COLUMNS = ("id", "user_id", "license_number", "specializations", "experience_years", "qualification",
+                        "clinic_name", "clinic_address", "latitude", "longitude", "consultation_fee",
+                        "availability_schedule", "bio", "rating", "total_reviews", "is_verified", "created_at")
+PATIENT_COLUMNS = ("id", "user_id", "date_of_birth", "gender", "address", "emergency_contact", "medical_history",
+                   "current_medications", "allergies", "prakriti_type", "lifestyle_preferences", "created_at")
+APPOINTMENT_COLUMNS = ("id", "patient_id", "practitioner_id", "therapy_type", "scheduled_datetime",
+                       "duration_minutes", "status", "fee", "payment_status", "created_at")
+FEEDBACK_COLUMNS = ("id", "patient_id", "practitioner_id", "appointment_id", "rating", "therapy_effectiveness",
+                    "practitioner_professionalism", "facility_cleanliness", "would_recommend", "comments",
+                    "created_at")
+HEALTH_LOG_COLUMNS = ("id", "patient_id", "practitioner_id", "date", "dosha_vata", "dosha_pitta", "dosha_kapha",
+                      "sleep_score", "stress_level", "hydration", "weight", "blood_pressure", "created_at")
+CHAT_COLUMNS = ("id", "sender_id", "sender_type", "recipient_id", "recipient_type", "content", "read", "created_at")
+
+
+def seed(patients: int = 2000, practitioners: int = 50, appointments_per_patient: float = 10.0,
+         health_logs_per_patient: float = 12.0, messages_per_patient: float = 6.0, feedback_rate: float = 0.3,
+         seed_value: int = DEFAULT_SEED, anchor: datetime = datetime.fromisoformat(DEFAULT_ANCHOR),
+         batch_size: int = BATCH_SIZE, rebuild_rollups: bool = True, verbose: bool = True) -> Dict[str, Any]:
+    """Generate and load a dataset into DATABASE_URL; returns per-table row counts and timings"""
+    from database import engine
+    from models import Base, User, Patient, Practitioner, Appointment, Feedback, PatientHealthLog, ChatMessage
+    from auth import get_password_hash
+    from report_rollups import ReportRollups, recompute_practitioner_ratings
+
+    def log(message: str):
+        if verbose:
+            print(message, file=sys.stderr)
+
+    Base.metadata.create_all(bind=engine)
+    tables = [User.__table__, Patient.__table__, Practitioner.__table__, Appointment.__table__,
+              Feedback.__table__, PatientHealthLog.__table__, ChatMessage.__table__]
+    # One bcrypt hash shared by every seeded user; hashing per row would dominate the load
+    password_hash = get_password_hash(SEED_PASSWORD)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+            connection.exec_driver_sql("PRAGMA cache_size = -131072")
+        indexes = [index for table in tables for index in table.indexes]
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+
+        generator = SeedGenerator(connection, seed_value, anchor, batch_size)
+        stage = time.perf_counter()
+        practitioner_rows = generator.practitioners(practitioners, password_hash)
+        patient_rows = generator.patients(patients, password_hash, practitioner_rows)
+        generator.appointments(patient_rows, practitioner_rows, appointments_per_patient, feedback_rate)
+        generator.health_logs(patient_rows, practitioner_rows, health_logs_per_patient)
+        generator.chat_messages(patient_rows, practitioner_rows, messages_per_patient)
+        generator.flush()
+        load_seconds = time.perf_counter() - stage
+        counts = generator.counts()
+        total = sum(counts.values())
+        log(f"Loaded {total:,} rows in {load_seconds:.1f}s ({total / load_seconds:,.0f} rows/sec)")
+
+        stage = time.perf_counter()
+        for index in indexes:
+            index.create(connection)
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("ANALYZE")
+        elif engine.dialect.name == "postgresql":
+            # Ids were assigned explicitly, so move the serial sequences past them
+            for table in tables:
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1)) FROM {table.name}")
+        recompute_practitioner_ratings(connection)
+        index_seconds = time.perf_counter() - stage
+        log(f"Rebuilt {len(indexes)} indexes in {index_seconds:.1f}s")
+
+    rollup_counts = None
+    if rebuild_rollups:
+        # Seeded rows are older than any rollup watermark, so catch-up would never see them
+        stage = time.perf_counter()
+        rollup_counts = ReportRollups().rebuild()
+        log(f"Rebuilt report rollups in {time.perf_counter() - stage:.1f}s: {rollup_counts}")
+
+    return {
+        "rows": counts,
+        "total_rows": total,
+        "load_seconds": round(load_seconds, 3),
+        "rows_per_second": round(total / load_seconds) if load_seconds else None,
+        "index_seconds": round(index_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "rollups": rollup_counts,
+        "password": SEED_PASSWORD
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic load-test dataset")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--practitioners", type=int, default=50)
+    parser.add_argument("--appointments-per-patient", type=float, default=10.0, help="mean, exponential")
+    parser.add_argument("--health-logs-per-patient", type=float, default=12.0, help="mean, exponential")
+    parser.add_argument("--messages-per-patient", type=float, default=6.0, help="mean, exponential")
+    parser.add_argument("--feedback-rate", type=float, default=0.3, help="share of completed sessions reviewed")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--anchor", default=DEFAULT_ANCHOR,
+                        help="'now' of the dataset: history ends and future bookings start here (ISO date or 'today')")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--database-url", help="target database (default: DATABASE_URL or ./ayursutra.db)")
+    parser.add_argument("--no-rollups", action="store_true", help="skip rebuilding the report rollup tables")
+    args = parser.parse_args()
+
+    if args.practitioners < 1:
+        parser.error("--practitioners must be at least 1")
+    if args.database_url:
+        # database.py reads this at import time
+        os.environ["DATABASE_URL"] = args.database_url
+    if args.anchor == "today":
+        anchor = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    else:
+        anchor = datetime.fromisoformat(args.anchor)
+
+    result = seed(args.patients, args.practitioners, args.appointments_per_patient, args.health_logs_per_patient,
+                  args.messages_per_patient, args.feedback_rate, args.seed, anchor, args.batch_size,
+                  rebuild_rollups=not args.no_rollups)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    # Add backend to path
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
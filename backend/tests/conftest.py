@@ -0,0 +1,70 @@
+"""
+Shared fixtures. The suite runs fully offline: the app is driven in-process against a
+scratch SQLite database filled by seed_data.py, uploads go to a scratch directory and
+every AI backend is replaced by the fakes in fake_ai_backends.py.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+# Must be configured before any backend module is imported
+_scratch_dir = tempfile.mkdtemp(prefix="ayursutra_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch_dir, 'test.db')}"
+os.environ["UPLOAD_STORAGE_DIR"] = os.path.join(_scratch_dir, "uploads")
+os.environ["AUDIT_ARCHIVE_DIR"] = os.path.join(_scratch_dir, "audit_archive")
+os.environ["LOG_FILE"] = ""
+os.environ["LOG_LEVEL"] = "WARNING"
+# Empty keys keep .env from enabling real Gemini calls (load_dotenv does not override)
+os.environ["GEMINI_API_KEY"] = os.environ["GOOGLE_API_KEY"] = ""
+os.environ["FAKE_AI_BACKENDS"] = "all"
+os.environ["FAKE_AI_LATENCY"] = "fixed:0"
+os.environ["FAKE_AI_TOKENS_PER_SEC"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+# Seeded history ends around today, so "this month" reports have data
+SEED_ANCHOR = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+@pytest.fixture(scope="session")
+def accounts():
+    """Seeded accounts by role (see load_test.Account), after seeding the scratch database"""
+    from seed_data import seed
+    from load_test import load_accounts
+
+    seed(60, 12, seed_value=7, anchor=SEED_ANCHOR, verbose=False)
+    return load_accounts(100)
+
+
+@pytest.fixture(scope="session")
+def client(accounts):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(accounts):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    """Bearer headers for an account, without going through (bcrypt) login"""
+    from auth import create_access_token
+
+    def headers(account) -> dict:
+        return {"Authorization": f"Bearer {create_access_token({'sub': account.email, 'role': account.role})}"}
+    return headers
@@ -0,0 +1,88 @@
+"""Chat history keyset pagination on (created_at, id) and bulk mark-read"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ChatMessage
+
+
+@pytest.fixture(scope="module")
+def conversation(accounts):
+    """25 more messages in a patient/practitioner thread, several sharing a timestamp, inserted out of time order"""
+    from database import SessionLocal
+
+    patient, practitioner = accounts["patient"][5], accounts["practitioner"][9]
+    base = datetime(2031, 5, 1, 10, 0)
+    # Offsets in seconds; the repeats exercise the id tiebreak
+    offsets = [40, 0, 10, 10, 10, 20, 5, 30, 30, 50, 60, 60, 70, 15, 80, 90, 90, 90, 100, 110, 25, 120, 130, 140, 140]
+    db = SessionLocal()
+    try:
+        for index, offset in enumerate(offsets):
+            from_patient = index % 2 == 0
+            db.add(ChatMessage(
+                sender_id=patient.user_id if from_patient else practitioner.user_id,
+                sender_type="patient" if from_patient else "practitioner",
+                recipient_id=practitioner.user_id if from_patient else patient.user_id,
+                recipient_type="practitioner" if from_patient else "patient",
+                content=f"message {index}", read=False, created_at=base + timedelta(seconds=offset)
+            ))
+        db.commit()
+        expected = [message.id for message in db.query(ChatMessage).filter(
+            ChatMessage.sender_id.in_([patient.user_id, practitioner.user_id]),
+            ChatMessage.recipient_id.in_([patient.user_id, practitioner.user_id])
+        ).order_by(ChatMessage.created_at, ChatMessage.id)]
+    finally:
+        db.close()
+    return patient, practitioner, expected
+
+
+def test_paging_back_and_forward(client, auth_headers, conversation):
+    patient, practitioner, expected = conversation
+    headers = auth_headers(practitioner)
+
+    def page(**params):
+        response = client.get("/chat/messages", headers=headers,
+                              params={"recipient_id": patient.user_id, "limit": 4, **params})
+        assert response.status_code == 200
+        return [message["id"] for message in response.json()]
+
+    latest = page()
+    assert latest == expected[-4:]
+
+    seen = latest
+    while True:
+        older = page(before=seen[0])
+        if not older:
+            break
+        seen = older + seen
+    assert seen == expected
+
+    forward = page(after=expected[0])
+    collected = [expected[0]] + forward
+    while forward:
+        forward = page(after=collected[-1])
+        collected += forward
+    assert collected == expected
+
+
+def test_history_marks_received_messages_read(client, db, auth_headers, conversation):
+    patient, practitioner, expected = conversation
+    response = client.get("/chat/messages", headers=auth_headers(patient),
+                          params={"recipient_id": practitioner.user_id, "limit": 200})
+    assert response.status_code == 200
+    received = [m for m in response.json() if m["recipient_id"] == patient.user_id]
+    assert received and all(m["read"] for m in received)
+    unread = db.query(ChatMessage).filter(ChatMessage.id.in_(expected), ChatMessage.recipient_id == patient.user_id,
+                                          ChatMessage.read == False).count()  # noqa: E712
+    assert unread == 0
+
+
+def test_cursor_errors(client, accounts, auth_headers, conversation):
+    patient, practitioner, expected = conversation
+    headers = auth_headers(practitioner)
+    both = client.get("/chat/messages", headers=headers,
+                      params={"recipient_id": patient.user_id, "before": expected[5], "after": expected[1]})
+    assert both.status_code == 400
+    missing = client.get("/chat/messages", headers=headers, params={"recipient_id": patient.user_id, "before": 10 ** 9})
+    assert missing.status_code == 404
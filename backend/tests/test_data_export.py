@@ -0,0 +1,83 @@
+"""Data export: practitioner scoping, formats and batching"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_export import stream_export
+from database import SessionLocal
+from models import Appointment, Feedback, PatientHealthLog
+
+
+def csv_rows(body: bytes):
+    return list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+
+
+def ndjson_rows(body: bytes):
+    return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+def caseload(db, practitioner_id: int) -> set:
+    return {patient_id for (patient_id,) in db.query(Appointment.patient_id).filter(
+        Appointment.practitioner_id == practitioner_id).distinct()}
+
+
+def test_practitioner_export_is_scoped_to_own_rows(client, db, accounts, auth_headers):
+    practitioner = accounts["practitioner"][0]
+    other = accounts["practitioner"][1]
+    # A practitioner_id in the query is ignored for practitioners
+    response = client.get(f"/export/appointments?practitioner_id={other.profile_id}",
+                          headers=auth_headers(practitioner))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = csv_rows(response.content)
+    expected = db.query(Appointment.id).filter(Appointment.practitioner_id == practitioner.profile_id).count()
+    assert len(rows) == expected > 0
+    assert {int(row["practitioner_id"]) for row in rows} == {practitioner.profile_id}
+    assert [int(row["id"]) for row in rows] == sorted(int(row["id"]) for row in rows)
+
+
+def test_caseload_export_covers_patients_with_appointments(client, db, accounts, auth_headers):
+    practitioner = accounts["practitioner"][2]
+    response = client.get("/export/health_logs?format=ndjson&gzip=true", headers=auth_headers(practitioner))
+    assert response.status_code == 200
+
+    rows = ndjson_rows(gzip.decompress(response.content))
+    patients = caseload(db, practitioner.profile_id)
+    expected = db.query(PatientHealthLog.id).filter(PatientHealthLog.patient_id.in_(patients)).count()
+    assert len(rows) == expected > 0
+    assert {row["patient_id"] for row in rows} <= patients
+
+
+def test_admin_export_with_time_window(client, db, accounts, auth_headers):
+    until = datetime.utcnow()
+    since = until - timedelta(days=60)
+    response = client.get("/export/feedback?format=ndjson", headers=auth_headers(accounts["admin"][0]),
+                          params={"since": since.isoformat(), "until": until.isoformat()})
+    assert response.status_code == 200
+    expected = db.query(Feedback.id).filter(Feedback.created_at >= since, Feedback.created_at < until).count()
+    assert len(ndjson_rows(response.content)) == expected
+
+
+def test_export_access_and_validation(client, accounts, auth_headers):
+    assert client.get("/export/appointments", headers=auth_headers(accounts["patient"][0])).status_code == 403
+    admin = auth_headers(accounts["admin"][0])
+    assert client.get("/export/users", headers=admin).status_code == 400
+    assert client.get("/export/appointments?format=xml", headers=admin).status_code == 400
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100000])
+def test_output_is_independent_of_batch_size(accounts, batch_size):
+    practitioner_id = accounts["practitioner"][3].profile_id
+    whole = b"".join(stream_export(SessionLocal, "appointments", "csv", practitioner_id=practitioner_id))
+    batched = b"".join(stream_export(SessionLocal, "appointments", "csv", practitioner_id=practitioner_id,
+                                     batch_size=batch_size))
+    assert batched == whole
+    compressed = b"".join(stream_export(SessionLocal, "appointments", "csv", compress=True,
+                                        practitioner_id=practitioner_id, batch_size=batch_size))
+    assert gzip.decompress(compressed) == whole
@@ -0,0 +1,165 @@
+"""
+Micro-benchmarks for the engines that run on every AI turn
+Times the pure-Python hot paths behind /chat/ai-assistant and /health/ask-ai with fixed
+seeds and representative inputs: query classification, profile extraction, the
+clarification check, food filtering, day plans, workout splits, knowledge-base answers
+and plan markdown rendering. The sizes of the keyword tables and food/exercise
+databases are saved with each result, since growth there explains slower timings.
+
+The benchmarks are marked `benchmark` and deselected by default (see pytest.ini).
+Saved runs are machine-specific: compare runs made on the same, otherwise idle, box.
+
+Usage:
+    pytest -m benchmark                                   # run and print
+    pytest -m benchmark --benchmark-autosave              # record a run under .benchmarks/
+    pytest -m benchmark --benchmark-compare --benchmark-compare-fail=min:25%
+    pytest -m benchmark -k "classify or split"            # only matching benchmarks
+"""
+
+import random
+from itertools import count
+from typing import Any, Dict, List
+
+import pytest
+
+from query_classifier import QueryClassifier
+from enhanced_health_assistant import (
+    health_assistant, FoodDatabase, NutritionalEngine, WorkoutEngine, render_plan_markdown
+)
+
+try:
+    from rag_finetune_service import generate_knowledge_based_response, AYURVEDA_KNOWLEDGE
+except ImportError:  # chromadb / sentence-transformers are only installed for the RAG service
+    generate_knowledge_based_response = None
+    AYURVEDA_KNOWLEDGE = []
+
+SEED = 42
+
+QUERIES = [
+    "I have diabetes and high blood pressure, what should I eat?",
+    "How can I balance my vata dosha with yoga and pranayama?",
+    "I'm 28 years old, 82kg, 178cm, male, desk job. Create a diet plan for weight loss, vegetarian please.",
+    "Give me a workout plan for muscle gain, I go to the gym 4 days a week",
+    "I've had a headache and mild fever since yesterday, should I see a doctor?",
+    "What is Abhyanga and how long does a session take?",
+    "hello",
+    "I am 45, female, hypothyroid with joint pain. I need a meal plan that is gluten free and low carb.",
+    "Can turmeric and ginger help with inflammation from arthritis?",
+    "Tips for better sleep and stress management during exams",
+]
+PROFILES = [
+    {'age': 28, 'weight': 82, 'height': 178, 'gender': 'male', 'activity_level': 'sedentary',
+     'dietary_goal': 'weight loss', 'dietary_restrictions': ['vegetarian'], 'medical_conditions': [],
+     'frequency': '3 days', 'workout_goal': 'weight loss', 'equipment_access': 'home'},
+    {'age': 45, 'weight': 64, 'height': 160, 'gender': 'female', 'activity_level': 'lightly active',
+     'dietary_goal': 'maintenance', 'dietary_restrictions': ['gluten-free', 'keto'],
+     'medical_conditions': ['thyroid', 'arthritis'],
+     'frequency': '4 days', 'workout_goal': 'general fitness', 'equipment_access': 'home'},
+    {'age': 31, 'weight': 70, 'height': 172, 'gender': 'male', 'activity_level': 'very active',
+     'dietary_goal': 'muscle building', 'dietary_restrictions': [], 'medical_conditions': ['diabetes'],
+     'frequency': '5 days', 'workout_goal': 'strength', 'equipment_access': 'gym'},
+    {'age': 60, 'weight': 75, 'height': 165, 'gender': 'female', 'activity_level': 'moderately active',
+     'dietary_goal': 'weight loss', 'dietary_restrictions': ['vegan'], 'medical_conditions': ['hypertension'],
+     'frequency': '3 days', 'workout_goal': 'weight loss', 'equipment_access': 'home'},
+]
+DOSHAS = ['vata', 'pitta', 'kapha']
+DOSHA_ANALYSES = [{'vata': 50, 'pitta': 30, 'kapha': 20}, {'vata': 20, 'pitta': 55, 'kapha': 25},
+                  {'vata': 25, 'pitta': 25, 'kapha': 50}]
+FILTER_CASES = [
+    (dosha, restrictions, conditions)
+    for dosha in DOSHAS
+    for restrictions in ([], ['vegetarian'], ['vegan', 'gluten-free'], ['keto'])
+    for conditions in ([], ['diabetes'], ['thyroid', 'hypertension'])
+]
+
+BENCHMARKS = [
+    "query_classifier.classify",
+    "extract_profile_info",
+    "needs_clarification",
+    "food_database.filter_foods",
+    "nutritional_engine.generate_day_plan",
+    "workout_engine.generate_split",
+    "render_plan_markdown.diet",
+    "render_plan_markdown.workout",
+    pytest.param("generate_knowledge_based_response", marks=pytest.mark.skipif(
+        generate_knowledge_based_response is None or not AYURVEDA_KNOWLEDGE,
+        reason="rag_finetune_service not importable (chromadb/sentence-transformers missing)")),
+]
+
+
+def knowledge_context() -> List[List[Dict[str, Any]]]:
+    """Retrieval results shaped like query_knowledge_base() output (content + flattened metadata)"""
+    documents = []
+    for item in AYURVEDA_KNOWLEDGE:
+        metadata = {"title": item["title"], "category": item["category"]}
+        for key, value in item.get("metadata", {}).items():
+            metadata[key] = ", ".join(map(str, value)) if isinstance(value, list) else value
+        documents.append({"content": f"{item['title']}: {item['content']}", "metadata": metadata})
+    rng = random.Random(SEED)
+    return [rng.sample(documents, min(3, len(documents))) for _ in range(10)] if documents else []
+
+
+def table_sizes() -> Dict[str, int]:
+    """Sizes of the tables the benchmarks scan"""
+    return {
+        "medical_keywords": len(QueryClassifier.MEDICAL_KEYWORDS),
+        "ayurvedic_keywords": len(QueryClassifier.AYURVEDIC_KEYWORDS),
+        "foods": len(FoodDatabase().db),
+        "exercises": len(WorkoutEngine().ex_db.db),
+        "knowledge_documents": len(AYURVEDA_KNOWLEDGE),
+    }
+
+
+@pytest.fixture(scope="module")
+def cases():
+    """Benchmark name -> fn(i); inputs cycle with i so every round sees the same mix"""
+    classifier = QueryClassifier()
+    food_db = FoodDatabase()
+    nutrition = NutritionalEngine()
+    workouts = WorkoutEngine()
+    plan_rng = random.Random(SEED)
+
+    diet_plans = [health_assistant._build_diet_plan(profile, analysis, rng=random.Random(SEED))
+                  for profile in PROFILES for analysis in DOSHA_ANALYSES]
+    workout_plans = [health_assistant._build_workout_plan(profile, analysis)
+                     for profile in PROFILES for analysis in DOSHA_ANALYSES]
+    contexts = knowledge_context()
+
+    return {
+        "query_classifier.classify": lambda i: classifier.classify(QUERIES[i % len(QUERIES)]),
+        "extract_profile_info": lambda i: health_assistant.extract_profile_info(QUERIES[i % len(QUERIES)]),
+        "needs_clarification": lambda i: health_assistant.needs_clarification(
+            QUERIES[i % len(QUERIES)], PROFILES[i % len(PROFILES)] if i % 2 else {}),
+        "food_database.filter_foods": lambda i: food_db.filter_foods(*FILTER_CASES[i % len(FILTER_CASES)]),
+        "nutritional_engine.generate_day_plan": lambda i: nutrition.generate_day_plan(
+            PROFILES[i % len(PROFILES)], DOSHAS[i % len(DOSHAS)], rng=plan_rng),
+        "workout_engine.generate_split": lambda i: workouts.generate_split(
+            PROFILES[i % len(PROFILES)], DOSHAS[i % len(DOSHAS)], seed=SEED + i % 7),
+        "render_plan_markdown.diet": lambda i: render_plan_markdown('diet_plan', diet_plans[i % len(diet_plans)]),
+        "render_plan_markdown.workout": lambda i: render_plan_markdown(
+            'workout_plan', workout_plans[i % len(workout_plans)]),
+        "generate_knowledge_based_response": lambda i: generate_knowledge_based_response(
+            QUERIES[i % len(QUERIES)], contexts[i % len(contexts)]),
+    }
+
+
+def test_seeded_plans_are_reproducible():
+    """Fixed seeds must reproduce identical plans, or timings are not comparable across runs"""
+    nutrition = NutritionalEngine()
+    workouts = WorkoutEngine()
+    for profile in PROFILES:
+        for dosha in DOSHAS:
+            assert (nutrition.generate_day_plan(profile, dosha, rng=random.Random(SEED))
+                    == nutrition.generate_day_plan(dict(profile), dosha, rng=random.Random(SEED)))
+            assert workouts.generate_split(profile, dosha, seed=SEED) == workouts.generate_split(
+                dict(profile), dosha, seed=SEED)
+
+
+# Like timeit: no collector pauses inside the timed rounds
+@pytest.mark.benchmark(group="engines", disable_gc=True)
+@pytest.mark.parametrize("name", BENCHMARKS)
+def test_engine_hot_path(benchmark, cases, name):
+    fn = cases[name]
+    calls = count()
+    benchmark.extra_info.update(seed=SEED, sizes=table_sizes())
+    benchmark(lambda: fn(next(calls)))
@@ -0,0 +1,138 @@
+"""Uploads: magic-byte sniffing, Range parsing, Content-Disposition and download access"""
+
+import os
+
+import pytest
+
+from file_storage import _parse_range, sniff_content_type, content_disposition
+
+PDF = b"%PDF-1.4\n" + os.urandom(4096) + b"\n%%EOF\n"
+DEVANAGARI_NAME = "रिपोर्ट scan.pdf"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=0-9, 20-29", (0, 9)),
+    ("bytes=9-2", None),
+    ("bytes=a-b", None),
+    ("items=0-9", None),
+    ("bytes=", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("head, expected", [
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR", "image/png"),
+    (b"\xff\xd8\xff\xe0\0\x10JFIF", "image/jpeg"),
+    (b"GIF89a\x01\0", "image/gif"),
+    (b"RIFF\0\0\0\0WEBPVP8 ", "image/webp"),
+    (b"XXXX\0\0\0\0WEBPVP8 ", None),
+    (b"<html><script>", None),
+])
+def test_sniff_content_type(head, expected):
+    assert sniff_content_type(head) == expected
+
+
+def test_content_disposition_is_latin1_safe():
+    header = content_disposition('रिपोर्ट "x"\r\n.pdf')
+    header.encode("latin-1")
+    assert "\r" not in header and "\n" not in header
+    fallback = header.split('filename="')[1].split('"')[0]
+    assert fallback == "_______ _x___.pdf"
+    assert header.endswith("filename*=UTF-8''%E0%A4%B0%E0%A4%BF%E0%A4%AA%E0%A5%8B%E0%A4%B0%E0%A5%8D%E0%A4%9F%20%22x%22%0D%0A.pdf")
+
+
+# ==================== UPLOAD / DOWNLOAD ====================
+
+@pytest.fixture(scope="module")
+def uploaded(client, accounts, auth_headers):
+    """A PDF with a non-latin-1 name uploaded by the first seeded patient"""
+    patient = accounts["patient"][0]
+    response = client.post("/upload", headers=auth_headers(patient),
+                           files={"file": (DEVANAGARI_NAME, PDF, "application/octet-stream")})
+    assert response.status_code == 200, response.text
+    return patient, response.json()
+
+
+def test_upload_sniffs_type_and_deduplicates(client, auth_headers, uploaded):
+    patient, body = uploaded
+    assert body["content_type"] == "application/pdf"
+    assert body["size"] == len(PDF)
+    assert body["filename"] == DEVANAGARI_NAME
+    assert body["deduplicated"] is False
+
+    again = client.post("/upload", headers=auth_headers(patient), files={"file": ("copy.pdf", PDF, "application/pdf")})
+    assert again.status_code == 200
+    assert again.json()["sha256"] == body["sha256"]
+    assert again.json()["deduplicated"] is True
+
+
+def test_upload_rejects_disguised_file(client, accounts, auth_headers):
+    response = client.post("/upload", headers=auth_headers(accounts["patient"][0]),
+                           files={"file": ("report.pdf", b"<html>not a pdf</html>", "application/pdf")})
+    assert response.status_code == 400
+
+    pdf_as_picture = client.post("/upload?purpose=profile_picture", headers=auth_headers(accounts["patient"][0]),
+                                 files={"file": ("me.png", PDF, "image/png")})
+    assert pdf_as_picture.status_code == 400
+
+
+def test_download_whole_file(client, auth_headers, uploaded):
+    patient, body = uploaded
+    response = client.get(body["url"], headers=auth_headers(patient))
+    assert response.status_code == 200
+    assert response.content == PDF
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "filename*=UTF-8''%E0%A4%B0" in response.headers["content-disposition"]
+
+
+def test_download_range(client, auth_headers, uploaded):
+    patient, body = uploaded
+    response = client.get(body["url"], headers={**auth_headers(patient), "Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == PDF[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(PDF)}"
+
+    suffix = client.get(body["url"], headers={**auth_headers(patient), "Range": "bytes=-7"})
+    assert suffix.status_code == 206
+    assert suffix.content == PDF[-7:]
+
+    beyond = client.get(body["url"], headers={**auth_headers(patient), "Range": f"bytes={len(PDF)}-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(PDF)}"
+
+
+def test_download_access(client, db, accounts, auth_headers, uploaded):
+    from models import Appointment
+
+    patient, body = uploaded
+    treating = {practitioner_id for (practitioner_id,) in db.query(Appointment.practitioner_id).filter(
+        Appointment.patient_id == patient.profile_id).distinct()}
+    practitioners = accounts["practitioner"]
+    own_practitioner = next(p for p in practitioners if p.profile_id in treating)
+    other_patient = next(p for p in accounts["patient"] if p.user_id != patient.user_id)
+
+    def status(account):
+        return client.get(body["url"], headers=auth_headers(account)).status_code
+
+    assert status(own_practitioner) == 200
+    assert status(accounts["admin"][0]) == 200
+    assert status(other_patient) == 404
+
+    stranger = next(p for p in practitioners if p.profile_id not in treating)
+    assert status(stranger) == 404
+
+    thumbnail = client.get(f"{body['url']}/thumbnail", headers=auth_headers(other_patient))
+    assert thumbnail.status_code == 404
+
+
+def test_download_unknown_hash(client, accounts, auth_headers):
+    response = client.get("/files/" + "0" * 64, headers=auth_headers(accounts["admin"][0]))
+    assert response.status_code == 404
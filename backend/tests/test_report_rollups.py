@@ -0,0 +1,147 @@
+"""Daily report rollups: equivalence with the raw-row aggregations, write-path upkeep and repair"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, text
+
+import main
+from models import Appointment, AppointmentStatus, Feedback, Practitioner
+from report_queries import (
+    treatment_analytics, appointment_summary, appointment_summary_from_rollups, appointment_total,
+    appointment_total_from_rollups, feedback_summary, feedback_summary_from_rollups
+)
+from report_rollups import get_report_rollups
+
+TODAY = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def assert_reports_match(db, practitioner_ids):
+    for practitioner_id in practitioner_ids:
+        for days in (30, 400):
+            since = TODAY - timedelta(days=days)
+            assert treatment_analytics(db, practitioner_id, since, until=TODAY, use_rollups=True) == \
+                treatment_analytics(db, practitioner_id, since, until=TODAY, use_rollups=False)
+            assert appointment_summary_from_rollups(db, practitioner_id, since.date()) == \
+                appointment_summary(db, practitioner_id, since.date())
+            assert appointment_summary_from_rollups(db, practitioner_id, since.date(), TODAY.date()) == \
+                appointment_summary(db, practitioner_id, since.date(), TODAY.date())
+        for since, until in ((None, None), (TODAY.date() - timedelta(days=90), TODAY.date() - timedelta(days=10))):
+            assert feedback_summary_from_rollups(db, practitioner_id, since, until) == \
+                feedback_summary(db, practitioner_id, since, until)
+    assert appointment_total_from_rollups(db) == appointment_total(db)
+
+
+def assert_ratings_match(db):
+    averages = dict(db.query(Feedback.practitioner_id, func.avg(Feedback.rating)).group_by(Feedback.practitioner_id).all())
+    counts = dict(db.query(Feedback.practitioner_id, func.count(Feedback.id)).group_by(Feedback.practitioner_id).all())
+    for practitioner in db.query(Practitioner).all():
+        assert (practitioner.total_reviews or 0) == counts.get(practitioner.id, 0)
+        assert practitioner.rating == pytest.approx(averages.get(practitioner.id, 0.0))
+
+
+@pytest.fixture
+def practitioner_ids(accounts):
+    return [account.profile_id for account in accounts["practitioner"]]
+
+
+def test_seeded_rollups_match_raw(db, practitioner_ids):
+    assert get_report_rollups().check_consistency()["consistent"]
+    assert_reports_match(db, practitioner_ids)
+    assert_ratings_match(db)
+
+
+def test_orm_writes_keep_rollups_current(db, accounts, practitioner_ids):
+    patient = accounts["patient"][2]
+    practitioner_id, other_practitioner_id = practitioner_ids[:2]
+    appointments = db.query(Appointment).filter(Appointment.practitioner_id == practitioner_id).order_by(
+        Appointment.id).limit(3).all()
+    assert len(appointments) == 3
+
+    # Status change, move to another day and practitioner, delete
+    appointments[0].status = AppointmentStatus.CANCELLED
+    appointments[1].scheduled_datetime = appointments[1].scheduled_datetime - timedelta(days=3)
+    appointments[1].practitioner_id = other_practitioner_id
+    db.delete(appointments[2])
+    db.add(Appointment(patient_id=patient.profile_id, practitioner_id=practitioner_id, therapy_type="Nasya",
+                       scheduled_datetime=TODAY - timedelta(days=2, hours=-10), duration_minutes=45,
+                       status=AppointmentStatus.COMPLETED))
+    db.add(Feedback(patient_id=patient.profile_id, practitioner_id=practitioner_id, rating=2,
+                    therapy_effectiveness=3, would_recommend=False, created_at=TODAY - timedelta(days=20)))
+    db.commit()
+
+    assert get_report_rollups().check_consistency()["consistent"]
+    assert_reports_match(db, [practitioner_id, other_practitioner_id])
+    assert_ratings_match(db)
+
+
+def test_rolled_back_writes_leave_rollups_alone(db, practitioner_ids):
+    before = appointment_summary_from_rollups(db, practitioner_ids[3], date(2000, 1, 1))
+    appointment = db.query(Appointment).filter(Appointment.practitioner_id == practitioner_ids[3]).first()
+    appointment.status = AppointmentStatus.NO_SHOW
+    db.flush()
+    db.rollback()
+    assert appointment_summary_from_rollups(db, practitioner_ids[3], date(2000, 1, 1)) == before
+    assert get_report_rollups().check_consistency()["consistent"]
+
+
+def test_raw_sql_drift_is_detected_and_repaired(db, practitioner_ids):
+    rollups = get_report_rollups()
+    victim = db.query(Appointment.id).filter(Appointment.practitioner_id == practitioner_ids[4]).first()[0]
+    # Bypasses the ORM, so no flush hook sees it
+    db.execute(text("DELETE FROM appointments WHERE id = :id"), {"id": victim})
+    db.commit()
+
+    report = rollups.check_consistency()
+    assert not report["consistent"]
+    assert [m["practitioner_id"] for m in report["mismatches"]] == [practitioner_ids[4]]
+
+    assert rollups.check_consistency(repair=True)["repaired"]
+    assert rollups.check_consistency()["consistent"]
+    assert_reports_match(db, [practitioner_ids[4]])
+
+
+def test_rebuild_matches_raw(db, practitioner_ids):
+    counts = get_report_rollups().rebuild()
+    assert counts["appointments"] > 0 and counts["feedback"] > 0
+    assert_reports_match(db, practitioner_ids)
+    assert_ratings_match(db)
+
+
+@pytest.mark.parametrize("path", ["/reports/monthly-summary", "/reports/treatments?days=120"])
+def test_report_endpoints_without_rollups(client, accounts, auth_headers, monkeypatch, path):
+    practitioner = accounts["practitioner"][5]
+    with_rollups = client.get(path, headers=auth_headers(practitioner))
+    assert with_rollups.status_code == 200
+
+    monkeypatch.setattr(main, "ROLLUPS_ENABLED", False)
+    without_rollups = client.get(path, headers=auth_headers(practitioner))
+    assert without_rollups.status_code == 200
+    assert without_rollups.json() == with_rollups.json()
+
+
+def test_null_status_counts_towards_totals_only(client, db, accounts, auth_headers, monkeypatch):
+    practitioner = accounts["practitioner"][6]
+    appointment = Appointment(patient_id=accounts["patient"][3].profile_id, practitioner_id=practitioner.profile_id,
+                              therapy_type="Basti", scheduled_datetime=TODAY + timedelta(hours=11),
+                              duration_minutes=60)
+    db.add(appointment)
+    db.commit()
+    # Appointment.status is nullable; seed scripts and raw SQL can leave it empty
+    db.execute(text("UPDATE appointments SET status = NULL WHERE id = :id"), {"id": appointment.id})
+    db.commit()
+    db.expire_all()
+    try:
+        get_report_rollups().rebuild()
+        assert_reports_match(db, [practitioner.profile_id])
+        summary = appointment_summary(db, practitioner.profile_id, TODAY.date())
+        assert summary["total"] == sum(summary["status_counts"].values()) + 1
+
+        with_rollups = client.get("/reports/monthly-summary", headers=auth_headers(practitioner))
+        monkeypatch.setattr(main, "ROLLUPS_ENABLED", False)
+        without_rollups = client.get("/reports/monthly-summary", headers=auth_headers(practitioner))
+        assert without_rollups.status_code == with_rollups.status_code == 200
+        assert without_rollups.json() == with_rollups.json()
+    finally:
+        db.delete(appointment)
+        db.commit()
@@ -0,0 +1,71 @@
+"""Response cache: ETag matching, TTL/LRU expiry and invalidation by committed writes"""
+
+import time
+from datetime import datetime
+
+from models import Appointment, AppointmentStatus, User
+from response_cache import CacheEntry, ResponseCache, etag_matches, get_response_cache
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache(ttl=30, max_size=2)
+    cache.put("expired", CacheEntry(b"{}", '"e"', time.monotonic() - 1))
+    assert cache.get("expired") is None
+
+    live = time.monotonic() + 30
+    cache.put("a", CacheEntry(b"1", '"a"', live))
+    cache.put("b", CacheEntry(b"2", '"b"', live))
+    cache.get("a")
+    cache.put("c", CacheEntry(b"3", '"c"', live))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_etag_revalidation_and_invalidation(client, db, accounts, auth_headers):
+    practitioner = accounts["practitioner"][6]
+    headers = auth_headers(practitioner)
+
+    first = client.get("/practitioner/dashboard", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    revalidate = {**headers, "If-None-Match": etag}
+    assert client.get("/practitioner/dashboard", headers=revalidate).status_code == 304
+
+    # Rolled back writes and ignored columns do not invalidate
+    appointment = db.query(Appointment).filter(Appointment.practitioner_id == practitioner.profile_id).first()
+    appointment.status = AppointmentStatus.NO_SHOW
+    db.flush()
+    db.rollback()
+    user = db.query(User).filter(User.id == practitioner.user_id).one()
+    user.last_login = datetime.utcnow()
+    db.commit()
+    assert client.get("/practitioner/dashboard", headers=revalidate).status_code == 304
+
+    versions = get_response_cache().versions.snapshot(("appointments",))
+    appointment.notes = "rescheduled by phone"
+    db.commit()
+    assert get_response_cache().versions.snapshot(("appointments",)) == (versions[0] + 1,)
+
+    # The key moved on: recomputed, and the payload is unchanged so the ETag is too
+    refreshed = client.get("/practitioner/dashboard", headers=revalidate)
+    assert refreshed.status_code == 304
+    assert refreshed.headers["etag"] == etag
+
+    # Moves active_treatments by one either way
+    appointment.status = AppointmentStatus.IN_PROGRESS if appointment.status != AppointmentStatus.IN_PROGRESS \
+        else AppointmentStatus.COMPLETED
+    db.commit()
+    changed = client.get("/practitioner/dashboard", headers=revalidate)
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
@@ -0,0 +1,171 @@
+"""Appointment conflict index: overlap rules, commit/rollback sync and agreement with the database"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import Appointment, AppointmentStatus
+from scheduling_engine import PractitionerSchedule, SchedulingEngine, get_scheduling_engine, ACTIVE_STATUSES
+
+T0 = datetime(2030, 3, 4, 9, 0)
+
+
+def minutes(n: int) -> timedelta:
+    return timedelta(minutes=n)
+
+
+def test_touching_intervals_do_not_overlap():
+    schedule = PractitionerSchedule()
+    schedule.add(1, T0, T0 + minutes(60))
+    assert schedule.overlapping(T0 + minutes(60), T0 + minutes(120)) == []
+    assert schedule.overlapping(T0 - minutes(30), T0) == []
+    assert [a for a, _, _ in schedule.overlapping(T0 + minutes(59), T0 + minutes(90))] == [1]
+
+
+def test_long_earlier_appointment_is_found():
+    schedule = PractitionerSchedule()
+    schedule.add(1, T0, T0 + minutes(240))
+    schedule.add(2, T0 + minutes(250), T0 + minutes(280))
+    assert [a for a, _, _ in schedule.overlapping(T0 + minutes(200), T0 + minutes(210))] == [1]
+    assert [a for a, _, _ in schedule.overlapping(T0 + minutes(230), T0 + minutes(260))] == [1, 2]
+
+
+def test_readd_and_remove():
+    schedule = PractitionerSchedule()
+    schedule.add(1, T0, T0 + minutes(60))
+    schedule.add(1, T0 + minutes(120), T0 + minutes(180))
+    assert len(schedule) == 1
+    assert schedule.overlapping(T0, T0 + minutes(60)) == []
+    schedule.remove(1)
+    schedule.remove(1)
+    assert schedule.overlapping(T0, T0 + minutes(600)) == []
+
+
+def test_engine_sync_status_reassign_and_exclude():
+    engine = SchedulingEngine()
+    engine.sync_appointment(7, 1, T0, 60, "scheduled")
+    assert [c["appointment_id"] for c in engine.find_conflicts(1, T0 + minutes(30), 30)] == [7]
+    assert engine.find_conflicts(1, T0 + minutes(30), 30, exclude_appointment_id=7) == []
+
+    # Aware datetimes are compared in UTC
+    aware = (T0 + minutes(30)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=5, minutes=30)))
+    assert len(engine.find_conflicts(1, aware, 15)) == 1
+
+    engine.sync_appointment(7, 2, T0, 60, "scheduled")
+    assert engine.find_conflicts(1, T0, 60) == []
+    assert len(engine.find_conflicts(2, T0, 60)) == 1
+
+    engine.sync_appointment(7, 2, T0, 60, "cancelled")
+    assert engine.find_conflicts(2, T0, 60) == []
+
+
+# ==================== DATABASE SYNC ====================
+
+def _book(db, practitioner_id: int, patient_id: int, start: datetime, duration: int = 60,
+          status: AppointmentStatus = AppointmentStatus.SCHEDULED) -> Appointment:
+    appointment = Appointment(patient_id=patient_id, practitioner_id=practitioner_id, therapy_type="Abhyanga",
+                              scheduled_datetime=start, duration_minutes=duration, status=status)
+    db.add(appointment)
+    return appointment
+
+
+@pytest.fixture
+def engine(db):
+    engine = get_scheduling_engine()
+    engine.rebuild(db)
+    return engine
+
+
+def test_commit_rollback_and_status_change(db, accounts, engine):
+    patient = accounts["patient"][0]
+    practitioner = accounts["practitioner"][0]
+    start = T0 + timedelta(days=30)
+
+    _book(db, practitioner.profile_id, patient.profile_id, start)
+    db.flush()
+    assert engine.find_conflicts(practitioner.profile_id, start, 60) == []
+    db.rollback()
+    assert engine.find_conflicts(practitioner.profile_id, start, 60) == []
+
+    appointment = _book(db, practitioner.profile_id, patient.profile_id, start, 90)
+    db.commit()
+    assert [c["appointment_id"] for c in engine.find_conflicts(practitioner.profile_id, start + minutes(80), 30)] \
+        == [appointment.id]
+
+    appointment.scheduled_datetime = start + timedelta(days=1)
+    db.commit()
+    assert engine.find_conflicts(practitioner.profile_id, start, 60) == []
+    assert len(engine.find_conflicts(practitioner.profile_id, start + timedelta(days=1), 60)) == 1
+
+    appointment.status = AppointmentStatus.CANCELLED
+    db.commit()
+    assert engine.find_conflicts(practitioner.profile_id, start + timedelta(days=1), 60) == []
+
+    db.delete(appointment)
+    db.commit()
+
+
+def test_status_is_stored_by_value(db, accounts):
+    from sqlalchemy import text
+
+    patient = accounts["patient"][0]
+    appointment = _book(db, accounts["practitioner"][0].profile_id, patient.profile_id,
+                        T0 + timedelta(days=60), status=AppointmentStatus.NO_SHOW)
+    db.commit()
+    stored = db.execute(text("SELECT status FROM appointments WHERE id = :id"), {"id": appointment.id}).scalar()
+    assert stored == "no_show"
+    db.delete(appointment)
+    db.commit()
+
+
+def test_index_agrees_with_database(db, accounts, engine):
+    """Random probes over the seeded appointments: index answer == brute-force overlap scan"""
+    rows = db.query(Appointment.id, Appointment.practitioner_id, Appointment.scheduled_datetime,
+                    Appointment.duration_minutes, Appointment.status).all()
+    active = [(appointment_id, practitioner_id, start, start + minutes(duration or 60))
+              for appointment_id, practitioner_id, start, duration, status in rows
+              if status.value in ACTIVE_STATUSES]
+    assert active, "seed data has no active appointments"
+
+    rng = random.Random(3)
+    practitioner_ids = sorted({row[1] for row in active})
+    earliest = min(row[2] for row in active)
+    span = (max(row[3] for row in active) - earliest).total_seconds() / 60
+    probes = [(rng.choice(practitioner_ids), earliest + minutes(int(rng.random() * span)), rng.choice([15, 60, 240]))
+              for _ in range(300)]
+    # Probes starting exactly on existing appointments
+    probes += [(practitioner_id, start, 30) for _, practitioner_id, start, _ in active[:100]]
+
+    hits = 0
+    for practitioner_id, start, duration in probes:
+        end = start + minutes(duration)
+        expected = sorted(appointment_id for appointment_id, owner, a_start, a_end in active
+                          if owner == practitioner_id and a_start < end and a_end > start)
+        found = sorted(c["appointment_id"] for c in engine.find_conflicts(practitioner_id, start, duration))
+        assert found == expected, (practitioner_id, start, duration)
+        hits += bool(expected)
+    assert hits >= 100
+
+
+def test_booking_endpoint_rejects_overlap(client, accounts, auth_headers):
+    patient = accounts["patient"][1]
+    practitioner = accounts["practitioner"][1]
+    start = T0 + timedelta(days=90)
+    payload = {"patient_id": patient.profile_id, "practitioner_id": practitioner.profile_id,
+               "therapy_type": "Shirodhara", "scheduled_datetime": start.isoformat(), "duration_minutes": 90}
+
+    first = client.post("/appointments", json=payload, headers=auth_headers(patient))
+    assert first.status_code == 200, first.text
+
+    overlapping = dict(payload, scheduled_datetime=(start + minutes(60)).isoformat(), duration_minutes=30)
+    assert client.post("/appointments", json=overlapping, headers=auth_headers(patient)).status_code == 400
+
+    adjacent = dict(payload, scheduled_datetime=(start + minutes(90)).isoformat(), duration_minutes=30)
+    assert client.post("/appointments", json=adjacent, headers=auth_headers(patient)).status_code == 200
+
+    check = client.get("/appointments/conflicts", headers=auth_headers(patient), params={
+        "practitioner_id": practitioner.profile_id, "start": (start + minutes(30)).isoformat(), "duration_minutes": 30})
+    assert check.status_code == 200
+    assert check.json()["available"] is False
+    assert [c["appointment_id"] for c in check.json()["conflicts"]] == [first.json()["id"]]
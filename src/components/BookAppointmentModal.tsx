@@ -23,6 +23,7 @@ const BookAppointmentModal: React.FC<BookAppointmentModalProps> = ({ isOpen, onC
     const [date, setDate] = useState('');
     const [time, setTime] = useState('');
     const [notes, setNotes] = useState('');
+    const [slotTaken, setSlotTaken] = useState(false);
 
     useEffect(() => {
         if (isOpen) {
@@ -31,6 +32,18 @@ const BookAppointmentModal: React.FC<BookAppointmentModalProps> = ({ isOpen, onC
         }
     }, [isOpen]);
 
+    // Warn as soon as the chosen slot overlaps an existing booking
+    useEffect(() => {
+        if (!selectedPractitionerId || !date || !time) {
+            setSlotTaken(false);
+            return;
+        }
+        const start = new Date(`${date}T${time}:00`).toISOString();
+        appointmentService.checkConflicts(selectedPractitionerId, start, 60)
+            .then(result => setSlotTaken(!result.available))
+            .catch(() => setSlotTaken(false));
+    }, [selectedPractitionerId, date, time]);
+
     const loadPractitioners = async () => {
         try {
             const data = await appointmentService.getAllPractitioners();
@@ -250,6 +263,11 @@ const BookAppointmentModal: React.FC<BookAppointmentModalProps> = ({ isOpen, onC
                                             </div>
                                         </div>
                                     </div>
+                                    {slotTaken && (
+                                        <p className="text-sm text-red-600">
+                                            This time overlaps an existing appointment. Please choose another slot.
+                                        </p>
+                                    )}
 
                                     {/* Notes */}
                                     <div>
@@ -116,7 +116,7 @@ const AdminConsole = () => {
       });
       if (response.ok) {
         const data = await response.json();
-        setLogs(data);
+        setLogs(data.items);
       }
     } catch (error) {
       console.error("Error fetching logs:", error);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../hooks/useAuth';
 import { useSubscription } from '../contexts/SubscriptionContext';
 import { useNavigate } from 'react-router-dom';
@@ -23,6 +23,7 @@ import {
 } from 'lucide-react';
 import Sidebar from '../components/Sidebar';
 import api from '../services/api';
+import chatSocketService, { ChatSocketEvent } from '../services/chatSocket.service';
 import toast, { Toaster } from 'react-hot-toast';
 import NotificationDropdown, { Notification } from '../components/NotificationDropdown';
 
@@ -54,6 +55,7 @@ const ChatSupport = () => {
     const [practitioners, setPractitioners] = useState<Practitioner[]>([]);
     const [selectedPractitioner, setSelectedPractitioner] = useState<Practitioner | null>(null);
     const [messages, setMessages] = useState<ChatMessage[]>([]);
+    const [unreadCounts, setUnreadCounts] = useState<Record<number, number>>({});
     const [messageInput, setMessageInput] = useState('');
     const [loading, setLoading] = useState(false);
     const [chatMode, setChatMode] = useState<'practitioner' | 'ai'>('practitioner');
@@ -222,12 +224,42 @@ const ChatSupport = () => {
         fetchPractitioners();
     }, []);
 
-    // Poll for new messages when a practitioner is selected
+    // Live messages and read receipts over the chat socket
+    const selectedPractitionerRef = useRef<Practitioner | null>(null);
+    selectedPractitionerRef.current = selectedPractitioner;
+    const userIdRef = useRef<number | undefined>(user?.id);
+    userIdRef.current = user?.id;
+
+    useEffect(() => {
+        chatSocketService.connect();
+        const unsubscribe = chatSocketService.subscribe((event: ChatSocketEvent) => {
+            const current = selectedPractitionerRef.current;
+            if (event.type === 'message' && event.message.recipient_id === userIdRef.current && event.message.sender_id !== current?.id) {
+                const senderId = event.message.sender_id;
+                setUnreadCounts(prev => ({ ...prev, [senderId]: (prev[senderId] || 0) + 1 }));
+            }
+            if (event.type === 'message' && current) {
+                const message: ChatMessage = event.message;
+                if (message.sender_id !== current.id && message.recipient_id !== current.id) return;
+                setMessages(prev => prev.some(m => m.id === message.id) ? prev : [...prev, message]);
+                if (message.sender_id === current.id) chatSocketService.markRead(current.id);
+            } else if (event.type === 'read_receipt') {
+                setMessages(prev => prev.map(m => m.recipient_id === event.reader_id ? { ...m, read: true } : m));
+            }
+        });
+
+        return () => {
+            unsubscribe();
+            chatSocketService.disconnect();
+        };
+    }, []);
+
+    // Load history when a practitioner is selected; poll only while the socket is down
     useEffect(() => {
         if (selectedPractitioner && chatMode === 'practitioner') {
             fetchMessages(selectedPractitioner.id);
             const interval = setInterval(() => {
-                fetchMessages(selectedPractitioner.id);
+                if (!chatSocketService.isConnected()) fetchMessages(selectedPractitioner.id);
             }, 5000); // Poll every 5 seconds
 
             return () => clearInterval(interval);
@@ -236,8 +268,16 @@ const ChatSupport = () => {
 
     const fetchPractitioners = async () => {
         try {
-            const response = await api.get('/chat/practitioners');
+            const [response, unread] = await Promise.all([
+                api.get('/chat/practitioners'),
+                api.get('/chat/unread-counts')
+            ]);
             setPractitioners(response.data);
+            const counts: Record<number, number> = {};
+            unread.data.conversations.forEach((c: { sender_id: number; unread: number }) => {
+                counts[c.sender_id] = c.unread;
+            });
+            setUnreadCounts(counts);
         } catch (error) {
             console.error('Failed to fetch practitioners:', error);
         }
@@ -247,6 +287,7 @@ const ChatSupport = () => {
         try {
             const response = await api.get(`/chat/messages?recipient_id=${practitionerId}`);
             setMessages(response.data);
+            setUnreadCounts(prev => ({ ...prev, [practitionerId]: 0 }));
         } catch (error) {
             console.error('Failed to fetch messages:', error);
         }
@@ -259,14 +300,17 @@ const ChatSupport = () => {
         setLoading(true);
 
         try {
-            await api.post('/chat/send', {
-                recipient_id: selectedPractitioner.id,
-                recipient_type: 'practitioner',
-                content: messageInput
-            });
+            // The socket echoes the stored message back, which appends it to the thread
+            if (!chatSocketService.sendMessage(selectedPractitioner.id, 'practitioner', messageInput)) {
+                await api.post('/chat/send', {
+                    recipient_id: selectedPractitioner.id,
+                    recipient_type: 'practitioner',
+                    content: messageInput
+                });
+                fetchMessages(selectedPractitioner.id);
+            }
 
             setMessageInput('');
-            fetchMessages(selectedPractitioner.id);
         } catch (error) {
             console.error('Failed to send message:', error);
         } finally {
@@ -388,6 +432,11 @@ const ChatSupport = () => {
                                             <p className="text-xs text-gray-500 dark:text-gray-400 truncate">{prac.specialization}</p>
                                         )}
                                     </div>
+                                    {unreadCounts[prac.id] > 0 && (
+                                        <span className="min-w-[1.25rem] h-5 px-1.5 rounded-full bg-primary-600 text-white text-xs font-semibold flex items-center justify-center">
+                                            {unreadCounts[prac.id]}
+                                        </span>
+                                    )}
                                 </div>
                             </div>
                         ))
@@ -18,13 +18,15 @@ const ClinicMap: React.FC = () => {
     const [practitioners, setPractitioners] = useState<Practitioner[]>([]);
     const [loading, setLoading] = useState(true);
 
+    // Default center (e.g. New Delhi or user location)
+    const position: [number, number] = [28.6139, 77.2090];
+
     useEffect(() => {
         const fetchClinics = async () => {
             try {
-                const data = await patientService.getAllPractitioners();
-                // Filter practitioners with location data
-                const validPractitioners = data.filter(p => p.latitude && p.longitude);
-                setPractitioners(validPractitioners);
+                // Server returns only located practitioners around the map centre
+                const data = await patientService.getNearbyPractitioners(position[0], position[1], 50);
+                setPractitioners(data);
             } catch (error) {
                 console.error("Failed to load clinics", error);
             } finally {
@@ -34,9 +36,6 @@ const ClinicMap: React.FC = () => {
         fetchClinics();
     }, []);
 
-    // Default center (e.g. New Delhi or user location)
-    const position: [number, number] = [28.6139, 77.2090];
-
     return (
         <div className="flex flex-col h-screen bg-gray-50 dark:bg-gray-900">
             <header className="bg-white dark:bg-gray-800 shadow-sm border-b dark:border-gray-700 p-4 z-10">
@@ -223,7 +223,8 @@ const HealthSupport = () => {
                         title: action.data.title,
                         message: action.data.message,
                         frequency: action.data.frequency || 'daily',
-                        time: time
+                        time: time,
+                        timezone: Intl.DateTimeFormat().resolvedOptions().timeZone
                     })
                 );
 
@@ -18,6 +18,7 @@ export interface Reminder {
     message?: string;
     frequency: string;
     time: string;
+    timezone?: string | null;
     is_active: boolean;
 }
 
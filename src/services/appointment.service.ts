@@ -1,6 +1,6 @@
 
 import apiClient from './api';
-import { AppointmentCreate, AppointmentResponse, Practitioner } from '../types/api.types';
+import { AppointmentCreate, AppointmentResponse, AppointmentConflictCheck, Practitioner } from '../types/api.types';
 
 export type { Practitioner };
 
@@ -15,6 +15,13 @@ const appointmentService = {
         return response.data;
     },
 
+    checkConflicts: async (practitionerId: number, start: string, durationMinutes: number = 60): Promise<AppointmentConflictCheck> => {
+        const response = await apiClient.get<AppointmentConflictCheck>('/appointments/conflicts', {
+            params: { practitioner_id: practitionerId, start, duration_minutes: durationMinutes }
+        });
+        return response.data;
+    },
+
     getMyAppointments: async (status?: string): Promise<AppointmentResponse[]> => {
         const params = status ? { status } : {};
         const response = await apiClient.get<AppointmentResponse[]>('/appointments', { params });
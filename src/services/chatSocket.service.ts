@@ -0,0 +1,94 @@
+/**
+ * Chat Socket Service
+ * Real-time chat over WebSocket with automatic reconnect
+ */
+
+export interface ChatSocketEvent {
+    type: 'message' | 'read_receipt' | 'pong' | 'error';
+    [key: string]: any;
+}
+
+type ChatSocketListener = (event: ChatSocketEvent) => void;
+
+const MAX_RECONNECT_DELAY_MS = 30000;
+
+class ChatSocketService {
+    private socket: WebSocket | null = null;
+    private listeners = new Set<ChatSocketListener>();
+    private reconnectDelay = 1000;
+    private reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+    private shouldReconnect = false;
+
+    /**
+     * Open the socket (no-op if already open) and keep it open until disconnect()
+     */
+    connect(): void {
+        const token = localStorage.getItem('access_token');
+        if (!token || this.socket) return;
+
+        this.shouldReconnect = true;
+        const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${protocol}://${window.location.host}/chat/ws?token=${encodeURIComponent(token)}`);
+
+        socket.onopen = () => {
+            this.reconnectDelay = 1000;
+        };
+        socket.onmessage = (message) => {
+            try {
+                const event: ChatSocketEvent = JSON.parse(message.data);
+                this.listeners.forEach(listener => listener(event));
+            } catch (error) {
+                console.error('Invalid chat socket event', error);
+            }
+        };
+        socket.onclose = () => {
+            this.socket = null;
+            if (this.shouldReconnect) {
+                this.reconnectTimer = setTimeout(() => this.connect(), this.reconnectDelay);
+                this.reconnectDelay = Math.min(this.reconnectDelay * 2, MAX_RECONNECT_DELAY_MS);
+            }
+        };
+
+        this.socket = socket;
+    }
+
+    disconnect(): void {
+        this.shouldReconnect = false;
+        if (this.reconnectTimer) clearTimeout(this.reconnectTimer);
+        this.socket?.close();
+        this.socket = null;
+    }
+
+    isConnected(): boolean {
+        return this.socket?.readyState === WebSocket.OPEN;
+    }
+
+    /**
+     * Subscribe to socket events; returns an unsubscribe function
+     */
+    subscribe(listener: ChatSocketListener): () => void {
+        this.listeners.add(listener);
+        return () => {
+            this.listeners.delete(listener);
+        };
+    }
+
+    /**
+     * Send a message; returns false when the socket is not open so callers can fall back to REST
+     */
+    sendMessage(recipientId: number, recipientType: string, content: string): boolean {
+        return this.send({ type: 'message', recipient_id: recipientId, recipient_type: recipientType, content });
+    }
+
+    markRead(senderId: number): boolean {
+        return this.send({ type: 'read', sender_id: senderId });
+    }
+
+    private send(event: Record<string, any>): boolean {
+        if (!this.isConnected()) return false;
+        this.socket!.send(JSON.stringify(event));
+        return true;
+    }
+}
+
+export default new ChatSocketService();
@@ -4,7 +4,7 @@
  */
 
 import apiClient from './api';
-import { DashboardStats, Appointment } from '../types/api.types';
+import { DashboardStats, Appointment, NearbyPractitioner } from '../types/api.types';
 
 class PatientService {
     /**
@@ -31,6 +31,16 @@ class PatientService {
         const response = await apiClient.get<any[]>('/practitioners');
         return response.data;
     }
+
+    /**
+     * Get practitioners near a location, nearest first (for map)
+     */
+    async getNearbyPractitioners(lat: number, lng: number, radiusKm: number = 50, limit: number = 200): Promise<NearbyPractitioner[]> {
+        const response = await apiClient.get<NearbyPractitioner[]>('/practitioners/nearby', {
+            params: { lat, lng, radius_km: radiusKm, limit }
+        });
+        return response.data;
+    }
 }
 
 export default new PatientService();
@@ -55,6 +55,42 @@ class PractitionerService {
         await apiClient.patch(`/notifications/${id}/read`);
     }
 
+    /**
+     * Mark several (or, without ids, all) notifications as read
+     */
+    async markNotificationsAsRead(ids?: number[]): Promise<{ updated: number; unread: number }> {
+        const response = await apiClient.patch('/notifications/read', { ids: ids ?? null });
+        return response.data;
+    }
+
+    /**
+     * Get the unread notification count
+     */
+    async getUnreadNotificationCount(): Promise<number> {
+        const response = await apiClient.get<{ unread: number }>('/notifications/unread-count');
+        return response.data.unread;
+    }
+
+    /**
+     * Subscribe to pushed notifications; returns a function that closes the stream
+     */
+    subscribeToNotifications(
+        onNotification: (notification: Notification) => void,
+        onUnreadCount?: (unread: number) => void
+    ): () => void {
+        const token = localStorage.getItem('access_token');
+        if (!token) return () => {};
+
+        const source = new EventSource(`/notifications/stream?token=${encodeURIComponent(token)}`);
+        source.addEventListener('notification', (event) => {
+            onNotification(JSON.parse((event as MessageEvent).data));
+        });
+        source.addEventListener('unread_count', (event) => {
+            onUnreadCount?.(JSON.parse((event as MessageEvent).data).unread);
+        });
+        return () => source.close();
+    }
+
     /**
      * Get practitioner profile
      */
@@ -111,6 +111,10 @@ export interface Practitioner {
     user?: PractitionerUser;
 }
 
+export interface NearbyPractitioner extends Practitioner {
+    distance_km: number;
+}
+
 // ==================== APPOINTMENT TYPES ====================
 export interface AppointmentResponse {
     id: number;
@@ -140,6 +144,20 @@ export interface AppointmentCreate {
     notes?: string;
 }
 
+export interface AppointmentConflict {
+    appointment_id: number;
+    start: string;
+    end: string;
+}
+
+export interface AppointmentConflictCheck {
+    practitioner_id: number;
+    start: string;
+    end: string;
+    available: boolean;
+    conflicts: AppointmentConflict[];
+}
+
 // ==================== FEEDBACK TYPES ====================
 export interface Feedback {
     id: number;